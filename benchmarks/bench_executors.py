@@ -0,0 +1,342 @@
+"""
+Executor Benchmark Suite - ComfyKit's own overhead against a fake ComfyUI
+
+Starts benchmarks/fake_comfyui.py in a separate process and runs the same
+workload through HttpExecutor and WebSocketExecutor: each job uploads an
+input image, executes a prompt and (in the throughput scenario) downloads
+the output images.
+
+Metrics per executor:
+- submit: time from execute_workflow() to ComfyUI receiving the prompt
+  (workflow loading, parameters, upload), sequential jobs
+- overhead: execute_workflow() time minus the time the prompt executed on
+  the server (submission, completion detection, result building)
+- throughput: jobs per second at --concurrency jobs in flight, the server
+  executing as many prompts at once
+- memory: client memory per in-flight job (tracemalloc, --memory-jobs jobs)
+- requests: HTTP requests per job by route, counted by the server
+
+Results are compared with benchmarks/baseline.json: metrics worse than
+--tolerance (relative) and than a per-metric noise floor (absolute) are
+reported as regressions. Baselines are only meaningful on the machine that
+recorded them, record one before comparing changes.
+
+Usage:
+    python benchmarks/bench_executors.py
+    python benchmarks/bench_executors.py --check           # exit 1 on regression
+    python benchmarks/bench_executors.py --save-baseline   # record a new baseline
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from comfykit.comfyui.http_executor import HttpExecutor  # noqa: E402
+from comfykit.comfyui.websocket_executor import WebSocketExecutor  # noqa: E402
+from comfykit.utils import json_util  # noqa: E402
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+BASELINE_FILE = BENCHMARKS_DIR / "baseline.json"
+
+EXECUTORS = {"http": HttpExecutor, "websocket": WebSocketExecutor}
+
+# Metric name -> (higher is better, smallest change reported as a regression, below it is noise)
+METRICS = {
+    "submit_ms_p50": (False, 2.0),
+    "submit_ms_p95": (False, 10.0),
+    "overhead_ms_p50": (False, 5.0),
+    "overhead_ms_p95": (False, 20.0),
+    "throughput_jobs_per_s": (True, 0.0),
+    "memory_kb_per_job": (False, 2.0),
+    "requests_per_job": (False, 0.25),
+}
+
+WORKFLOW = {
+    "1": {"class_type": "LoadImage", "inputs": {"image": ""}, "_meta": {"title": "$~image!"}},
+    "6": {"class_type": "CLIPTextEncode", "inputs": {"text": ""}, "_meta": {"title": "$prompt.text!"}},
+    "9": {"class_type": "SaveImage", "inputs": {"images": ["6", 0]}, "_meta": {"title": "$output.images"}},
+}
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class FakeServerProcess:
+    """fake_comfyui.py running in a subprocess, so it does not share the client's CPU and memory"""
+
+    def __init__(self):
+        self.port = free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.process: Optional[subprocess.Popen] = None
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self):
+        self.process = subprocess.Popen([sys.executable, str(BENCHMARKS_DIR / "fake_comfyui.py"), "--port", str(self.port)])
+        self.session = aiohttp.ClientSession()
+        for _ in range(100):
+            try:
+                async with self.session.get(f"{self.base_url}/queue") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.1)
+        raise Exception("Fake ComfyUI server did not start")
+
+    async def stop(self):
+        if self.session is not None:
+            await self.session.close()
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait()
+
+    async def configure(self, **settings):
+        async with self.session.post(f"{self.base_url}/bench/config", json=settings) as response:
+            response.raise_for_status()
+
+    async def reset(self):
+        async with self.session.post(f"{self.base_url}/bench/reset") as response:
+            response.raise_for_status()
+
+    async def stats(self) -> Dict[str, Any]:
+        async with self.session.get(f"{self.base_url}/bench/stats") as response:
+            return await response.json()
+
+
+class Suite:
+    def __init__(self, args: argparse.Namespace, server: FakeServerProcess, workdir: str):
+        self.args = args
+        self.server = server
+        self.workdir = workdir
+        self.workflow_file = os.path.join(workdir, "bench_workflow.json")
+        json_util.dump_file(WORKFLOW, self.workflow_file)
+        self.input_file = os.path.join(workdir, "input.png")
+        with open(self.input_file, "wb") as f:
+            f.write(os.urandom(args.input_bytes))
+
+    def params(self, index: int) -> Dict[str, Any]:
+        return {"prompt": f"benchmark job {index}", "image": self.input_file}
+
+    async def run_job(self, executor, index: int, download: bool) -> Dict[str, Any]:
+        started = time.time()
+        result = await executor.execute_workflow(self.workflow_file, self.params(index))
+        if result.status != "completed":
+            raise Exception(f"Job {index} failed: {result.status} {result.msg}")
+        finished = time.time()
+        if download:
+            await result.save_all(os.path.join(self.workdir, "outputs", str(index)))
+        return {"prompt_id": result.prompt_id, "started": started, "finished": finished}
+
+    async def measure_latency(self, executor) -> Dict[str, float]:
+        """Sequential jobs: submission latency and overhead"""
+        await self.server.configure(latency=self.args.latency, workers=1)
+        await self.server.reset()
+        jobs = [await self.run_job(executor, index, download=False) for index in range(self.args.jobs)]
+        timings = (await self.server.stats())["timings"]
+
+        submit, overhead = [], []
+        for job in jobs:
+            timing = timings[job["prompt_id"]]
+            submit.append((timing["received_at"] - job["started"]) * 1000)
+            executed = timing["finished_at"] - timing["started_at"]
+            overhead.append((job["finished"] - job["started"] - executed) * 1000)
+        return {
+            "submit_ms_p50": percentile(submit, 0.5),
+            "submit_ms_p95": percentile(submit, 0.95),
+            "overhead_ms_p50": percentile(overhead, 0.5),
+            "overhead_ms_p95": percentile(overhead, 0.95),
+        }
+
+    async def measure_throughput(self, executor) -> Dict[str, Any]:
+        """Concurrent jobs with downloads: jobs per second and requests per job"""
+        await self.server.configure(latency=self.args.latency, workers=self.args.concurrency)
+        await self.server.reset()
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+
+        async def job(index: int):
+            async with semaphore:
+                return await self.run_job(executor, index, download=True)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(job(index) for index in range(self.args.throughput_jobs)))
+        elapsed = time.perf_counter() - started
+
+        counts = (await self.server.stats())["counts"]
+        requests = {route: count / self.args.throughput_jobs for route, count in sorted(counts.items())}
+        return {
+            "throughput_jobs_per_s": self.args.throughput_jobs / elapsed,
+            "requests_per_job": sum(requests.values()),
+            "requests_by_route": requests,
+        }
+
+    async def measure_memory(self, executor) -> Dict[str, float]:
+        """Client memory per job while --memory-jobs jobs are in flight"""
+        jobs_count = self.args.memory_jobs
+        # Long enough to sample while every job is executing
+        await self.server.configure(latency=max(self.args.latency, 2.0), workers=jobs_count)
+        await self.server.reset()
+
+        tracemalloc.start()
+        try:
+            baseline, _ = tracemalloc.get_traced_memory()
+            tasks = [asyncio.ensure_future(self.run_job(executor, index, download=False)) for index in range(jobs_count)]
+            in_flight = baseline
+            while not all(task.done() for task in tasks):
+                timings = (await self.server.stats())["timings"]
+                if sum(1 for timing in timings.values() if "started_at" in timing and "finished_at" not in timing) >= jobs_count:
+                    in_flight, _ = tracemalloc.get_traced_memory()
+                    break
+                await asyncio.sleep(0.05)
+            await asyncio.gather(*tasks)
+        finally:
+            tracemalloc.stop()
+        return {"memory_kb_per_job": (in_flight - baseline) / jobs_count / 1024}
+
+    async def run(self, executor_type: str) -> Dict[str, Any]:
+        executor = EXECUTORS[executor_type](self.server.base_url)
+        try:
+            # Warm up: session, WebSocket connection, workflow metadata cache
+            await self.server.configure(latency=0.0, workers=1)
+            await self.run_job(executor, -1, download=True)
+
+            results = {}
+            results.update(await self.measure_latency(executor))
+            results.update(await self.measure_throughput(executor))
+            results.update(await self.measure_memory(executor))
+            return results
+        finally:
+            await executor.close()
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    """Regressions of results against a baseline"""
+    regressions = []
+    for executor_type, metrics in results.items():
+        for name, (higher_is_better, noise) in METRICS.items():
+            value = metrics.get(name)
+            reference = baseline.get(executor_type, {}).get(name)
+            if value is None or not reference:
+                continue
+            if higher_is_better:
+                regressed = value < reference * (1 - tolerance) and reference - value > noise
+            else:
+                regressed = value > reference * (1 + tolerance) and value - reference > noise
+            if regressed:
+                regressions.append(f"{executor_type} {name}: {value:.2f} (baseline {reference:.2f})")
+    return regressions
+
+
+def print_results(results: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Dict[str, Any]]]):
+    executor_types = list(results)
+    print(f"\n{'metric':<24}" + "".join(f"{executor_type:>22}" for executor_type in executor_types))
+    for name in METRICS:
+        row = f"{name:<24}"
+        for executor_type in executor_types:
+            value = results[executor_type][name]
+            reference = (baseline or {}).get(executor_type, {}).get(name)
+            change = f" ({(value / reference - 1):+.0%})" if reference else ""
+            row += f"{value:>14.2f}{change:>8}"
+        print(row)
+
+    print("\nrequests per job by route")
+    routes = sorted({route for metrics in results.values() for route in metrics["requests_by_route"]})
+    for route in routes:
+        print(f"  {route:<22}" + "".join(f"{results[executor_type]['requests_by_route'].get(route, 0):>22.2f}"
+                                         for executor_type in executor_types))
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    server = FakeServerProcess()
+    await server.start()
+    try:
+        await server.configure(output_images=args.output_images, output_bytes=args.output_bytes,
+                               progress_steps=args.progress_steps)
+        with tempfile.TemporaryDirectory() as workdir:
+            suite = Suite(args, server, workdir)
+            results = {}
+            for executor_type in args.executors.split(","):
+                print(f"Benchmarking {executor_type} executor...")
+                results[executor_type] = await suite.run(executor_type)
+            return results
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--executors", default="http,websocket", help="Comma separated: http, websocket")
+    parser.add_argument("--jobs", type=int, default=30, help="Sequential jobs of the latency scenario")
+    parser.add_argument("--throughput-jobs", type=int, default=200, help="Jobs of the throughput scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="Jobs in flight in the throughput scenario")
+    parser.add_argument("--memory-jobs", type=int, default=50, help="Jobs in flight in the memory scenario")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds a prompt executes on the fake server")
+    parser.add_argument("--output-images", type=int, default=2, help="Output images per prompt")
+    parser.add_argument("--output-bytes", type=int, default=256 * 1024, help="Size of each output image")
+    parser.add_argument("--input-bytes", type=int, default=64 * 1024, help="Size of the uploaded input image")
+    parser.add_argument("--progress-steps", type=int, default=10, help="Progress messages per prompt")
+    parser.add_argument("--baseline", default=str(BASELINE_FILE), help="Baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Allowed relative regression")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 on regression")
+    parser.add_argument("--verbose", action="store_true", help="Keep ComfyKit INFO logs")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger("PM").setLevel(logging.WARNING)
+
+    results = asyncio.run(run(args))
+    config = {name: getattr(args, name) for name in (
+        "jobs", "throughput_jobs", "concurrency", "memory_jobs", "latency",
+        "output_images", "output_bytes", "input_bytes", "progress_steps",
+    )}
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        stored = json_util.load_file(args.baseline)
+        baseline = stored.get("results")
+        if stored.get("config") != config:
+            print(f"\nWarning: the baseline was recorded with other settings: {stored.get('config')}")
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        environment = {"python": platform.python_version(), "platform": platform.platform(), "json": json_util.BACKEND}
+        json_util.dump_file({"environment": environment, "config": config, "results": results}, args.baseline, indent=True)
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nREGRESSIONS:")
+            for regression in regressions:
+                print(f"  {regression}")
+            if args.check:
+                sys.exit(1)
+        else:
+            print(f"\nNo regression beyond {args.tolerance:.0%} of the baseline")
+
+
+if __name__ == "__main__":
+    main()
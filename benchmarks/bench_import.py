@@ -0,0 +1,103 @@
+"""
+Import Time Benchmark - cost of importing ComfyKit in a fresh interpreter
+
+Measures each statement in new processes with `python -X importtime` (best of
+N runs, cumulative microseconds of the comfykit module) and checks which heavy
+dependencies got loaded. Use it to catch import-time regressions: it exits
+with status 1 if `import comfykit` loads a heavy dependency or exceeds
+--max-ms.
+
+Usage:
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --runs 10 --max-ms 50
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Dependencies that must not be loaded by `import comfykit`
+HEAVY_MODULES = ["aiohttp", "websockets", "PIL", "pydantic", "certifi", "ssl", "tomllib"]
+
+STATEMENTS = [
+    ("import comfykit", "import comfykit"),
+    ("from comfykit import ComfyKit", "from comfykit import ComfyKit"),
+    ("ComfyKit() + HTTP executor", "from comfykit import ComfyKit; ComfyKit()._get_http_executor()"),
+    ("ComfyKit() + WebSocket executor", "from comfykit import ComfyKit; ComfyKit()._get_websocket_executor()"),
+    ("comfykit.__version__", "import comfykit; comfykit.__version__"),
+]
+
+
+def run(statement: str) -> Tuple[Dict[str, int], List[str]]:
+    """Run a statement in a fresh interpreter
+
+    Returns:
+        Cumulative import time (µs) of each top-level import and the heavy
+        dependencies loaded afterwards
+    """
+    code = f"{statement}\nimport sys\nprint(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")])))
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                             capture_output=True, text=True, env=env, cwd=ROOT, check=True)
+
+    imports = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|", 2)
+        # Nested imports are indented, their time is part of the top-level import
+        if cumulative.strip().isdigit() and not name.startswith("  "):
+            imports[name.strip()] = int(cumulative)
+    loaded = [module for module in process.stdout.strip().split(",") if module]
+    return imports, loaded
+
+
+def measure(statement: str, startup: Tuple[Set[str], Set[str]]) -> Tuple[int, List[str]]:
+    """Import time of a statement (µs) and heavy dependencies, interpreter startup excluded
+
+    Args:
+        statement: Statement to run
+        startup: Top-level imports and heavy dependencies of an interpreter running nothing
+    """
+    startup_imports, startup_loaded = startup
+    imports, loaded = run(statement)
+    total = sum(cumulative for name, cumulative in imports.items() if name not in startup_imports)
+    return total, [module for module in loaded if module not in startup_loaded]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per statement")
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail if `import comfykit` takes longer")
+    args = parser.parse_args()
+
+    startup_imports, startup_loaded = run("pass")
+    startup = (set(startup_imports), set(startup_loaded))
+
+    print(f"{'statement':<34} {'import time':>12}  heavy modules loaded")
+    results = {}
+    for label, statement in STATEMENTS:
+        runs = [measure(statement, startup) for _ in range(args.runs)]
+        best = min(total for total, _ in runs)
+        loaded = runs[0][1]
+        results[label] = (best, loaded)
+        print(f"{label:<34} {best / 1000:>9.1f} ms  {', '.join(loaded) or '-'}")
+
+    failed = False
+    import_time, loaded = results["import comfykit"]
+    if loaded:
+        print(f"\nREGRESSION: `import comfykit` loads {', '.join(loaded)}")
+        failed = True
+    if args.max_ms is not None and import_time / 1000 > args.max_ms:
+        print(f"\nREGRESSION: `import comfykit` takes {import_time / 1000:.1f} ms (max {args.max_ms} ms)")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+JSON Codec Benchmark - stdlib json vs the comfykit.utils.json_util backend
+
+Measures the JSON work ComfyKit does on its hot paths:
+- serializing the prompt submitted to /prompt
+- parsing WebSocket messages (progress / executed frames)
+- loading a workflow file
+
+Usage:
+    python benchmarks/bench_json.py
+    pip install orjson  # or: pip install comfykit[fast]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from comfykit.utils import json_util  # noqa: E402
+
+WORKFLOW_FILE = Path(__file__).resolve().parent.parent / "workflows" / "t2i_by_local_flux.json"
+
+
+def build_prompt(copies: int = 20) -> dict:
+    """A large prompt: the sample workflow repeated with renumbered nodes"""
+    workflow = json.loads(WORKFLOW_FILE.read_text(encoding="utf-8"))
+    prompt = {}
+    for copy_index in range(copies):
+        for node_id, node in workflow.items():
+            prompt[f"{copy_index}_{node_id}"] = node
+    return {"prompt": prompt, "client_id": "0d4b8c1e-4d7c-4c8e-9b8a-2f6f7c1d2e3f"}
+
+
+PROGRESS_FRAME = json.dumps({
+    "type": "progress",
+    "data": {"value": 12, "max": 20, "prompt_id": "5f8e9c6a-1b2c-4d3e-8f9a-0b1c2d3e4f5a", "node": "3"},
+})
+
+EXECUTED_FRAME = json.dumps({
+    "type": "executed",
+    "data": {
+        "node": "9",
+        "display_node": "9",
+        "output": {"images": [
+            {"filename": f"ComfyUI_{i:05d}_.png", "subfolder": "", "type": "output"} for i in range(16)
+        ]},
+        "prompt_id": "5f8e9c6a-1b2c-4d3e-8f9a-0b1c2d3e4f5a",
+    },
+})
+
+
+def bench(name: str, stdlib_fn, fast_fn, number: int):
+    stdlib_time = min(timeit.repeat(stdlib_fn, number=number, repeat=5)) / number
+    fast_time = min(timeit.repeat(fast_fn, number=number, repeat=5)) / number
+    print(f"{name:<28} {stdlib_time * 1e6:>10.1f} µs {fast_time * 1e6:>10.1f} µs {stdlib_time / fast_time:>8.1f}x")
+
+
+def main():
+    print(f"json_util backend: {json_util.BACKEND}")
+    if json_util.BACKEND == "json":
+        print("orjson is not installed, both columns use the standard library\n")
+    else:
+        print()
+
+    prompt = build_prompt()
+    prompt_size = len(json.dumps(prompt))
+
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8") as f:
+        json.dump(prompt["prompt"], f, ensure_ascii=False, indent=2)
+        workflow_path = f.name
+
+    def stdlib_load_workflow():
+        with open(workflow_path, "r", encoding="utf-8") as workflow_file:
+            return json.load(workflow_file)
+
+    print(f"{'operation':<28} {'stdlib':>13} {'json_util':>13} {'speedup':>9}")
+    try:
+        bench(f"dumps prompt ({prompt_size // 1024} KB)",
+              lambda: json.dumps(prompt), lambda: json_util.dumpb(prompt), 200)
+        bench("loads progress frame",
+              lambda: json.loads(PROGRESS_FRAME), lambda: json_util.loads(PROGRESS_FRAME), 20000)
+        bench("loads executed frame",
+              lambda: json.loads(EXECUTED_FRAME), lambda: json_util.loads(EXECUTED_FRAME), 5000)
+        bench("load workflow file",
+              stdlib_load_workflow, lambda: json_util.load_file(workflow_path), 200)
+    finally:
+        os.remove(workflow_path)
+
+
+if __name__ == "__main__":
+    main()
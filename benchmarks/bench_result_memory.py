@@ -0,0 +1,148 @@
+"""
+ExecuteResult Memory Benchmark - memory held by many execution results
+
+Builds results the way the HTTP executor does (history outputs decoded from
+JSON, URLs grouped by output variable) and measures the memory they keep
+with tracemalloc:
+- legacy: the previous layout, flat lists stored next to the grouped ones
+  and the raw outputs always attached
+- compact: flat lists built from the grouped outputs on first access, no
+  raw outputs (also measured after the flat lists were accessed)
+- compact + keep_outputs: raw outputs kept on request
+
+Usage:
+    python benchmarks/bench_result_memory.py
+    python benchmarks/bench_result_memory.py --results 50000 --images 8
+"""
+
+import argparse
+import gc
+import json
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from comfykit.comfyui.models import ExecuteResult  # noqa: E402
+
+BASE_URL = "http://127.0.0.1:8188"
+
+
+class LegacyExecuteResult(BaseModel):
+    """ExecuteResult as it was before the flat lists became views"""
+    status: str
+    prompt_id: Optional[str] = None
+    duration: Optional[float] = None
+    images: List[str] = Field(default_factory=list)
+    images_by_var: Dict[str, List[str]] = Field(default_factory=dict)
+    audios: List[str] = Field(default_factory=list)
+    audios_by_var: Dict[str, List[str]] = Field(default_factory=dict)
+    videos: List[str] = Field(default_factory=list)
+    videos_by_var: Dict[str, List[str]] = Field(default_factory=dict)
+    texts: List[str] = Field(default_factory=list)
+    texts_by_var: Dict[str, List[str]] = Field(default_factory=dict)
+    outputs: Optional[Dict[str, Any]] = None
+    msg: Optional[str] = None
+    server_url: Optional[str] = None
+    index: Optional[int] = None
+    cached: bool = False
+
+
+def history_outputs(index: int, images: int) -> bytes:
+    """/history outputs of one prompt: two SaveImage nodes and a text node"""
+    return json.dumps({
+        "9": {"images": [{"filename": f"ComfyUI_{index:06d}_{i:02d}_.png", "subfolder": "", "type": "output"}
+                         for i in range(images)]},
+        "12": {"images": [{"filename": f"ComfyUI_mask_{index:06d}_.png", "subfolder": "masks", "type": "output"}]},
+        "15": {"text": [f"a photo of a cat, variation {index}"]},
+    }).encode()
+
+
+def group_outputs(outputs: Dict[str, Any]) -> Dict[str, Dict[str, List[str]]]:
+    """URLs / texts grouped by output variable, as the executors build them"""
+    output_id_2_var = {"9": "image", "12": "mask", "15": "caption"}
+    images_by_var = {}
+    texts_by_var = {}
+    for node_id, node_output in outputs.items():
+        var = output_id_2_var.get(node_id, node_id)
+        if "images" in node_output:
+            images_by_var[var] = [
+                f"{BASE_URL}/view?filename={image['filename']}&subfolder={image['subfolder']}&type={image['type']}"
+                for image in node_output["images"]
+            ]
+        if "text" in node_output:
+            texts_by_var[var] = list(node_output["text"])
+    return {"images_by_var": images_by_var, "texts_by_var": texts_by_var}
+
+
+def build_legacy(index: int, raw: bytes) -> LegacyExecuteResult:
+    outputs = json.loads(raw)
+    grouped = group_outputs(outputs)
+    result = LegacyExecuteResult(status="completed", prompt_id=f"prompt-{index}", outputs=outputs, **grouped)
+    result.images = [url for urls in result.images_by_var.values() for url in urls]
+    result.texts = [text for texts in result.texts_by_var.values() for text in texts]
+    return result
+
+
+def build_compact(index: int, raw: bytes, keep_outputs: bool = False) -> ExecuteResult:
+    outputs = json.loads(raw)
+    grouped = group_outputs(outputs)
+    return ExecuteResult(status="completed", prompt_id=f"prompt-{index}",
+                         outputs=outputs if keep_outputs else None, **grouped)
+
+
+def build_compact_accessed(index: int, raw: bytes) -> ExecuteResult:
+    result = build_compact(index, raw)
+    result.images, result.audios, result.videos, result.texts
+    return result
+
+
+def measure(build: Callable[[int, bytes], Any], raws: List[bytes]) -> int:
+    """Bytes still allocated by the built results"""
+    gc.collect()
+    tracemalloc.start()
+    results = [build(index, raw) for index, raw in enumerate(raws)]
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del results
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--results", type=int, default=20000, help="Number of results kept")
+    parser.add_argument("--images", type=int, default=4, help="Images of the main output per result")
+    args = parser.parse_args()
+
+    raws = [history_outputs(index, args.images) for index in range(args.results)]
+    print(f"{args.results} results, {args.images + 1} images and 1 text each\n")
+
+    variants = [
+        ("legacy", build_legacy),
+        ("compact", build_compact),
+        ("compact, lists accessed", build_compact_accessed),
+        ("compact + keep_outputs", lambda index, raw: build_compact(index, raw, keep_outputs=True)),
+    ]
+    print(f"{'layout':<24} {'total':>10} {'per result':>12} {'vs legacy':>10}")
+    legacy_size = None
+    for name, build in variants:
+        size = measure(build, raws)
+        legacy_size = legacy_size or size
+        print(f"{name:<24} {size / 1024 / 1024:>7.1f} MB {size / args.results:>9.0f} B {size / legacy_size:>9.0%}")
+
+    legacy = build_legacy(0, raws[0])
+    compact = build_compact(0, raws[0])
+    assert compact.images == legacy.images and compact.texts == legacy.texts
+    legacy_time = min(timeit.repeat(lambda: legacy.images, number=100000, repeat=5)) / 100000
+    compact_time = min(timeit.repeat(lambda: compact.images, number=100000, repeat=5)) / 100000
+    print(f"\nresult.images access: {legacy_time * 1e9:.0f} ns legacy, {compact_time * 1e9:.0f} ns compact (built on first access)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+WebSocket Pre-filter Benchmark - routing ComfyUI text frames with and without the pre-filter
+
+Replays a high-traffic message stream through WebSocketConnectionManager's
+dispatcher, once decoding every frame and once with the pre-filter that skips
+or defers frames not needed by the tracked prompt.
+
+The default stream mimics a busy shared server: status broadcasts, a system
+monitor plugin reporting every second, and the progress of several other
+prompts around the one tracked prompt. A recorded stream (one text frame per
+line) can be replayed instead, or recorded from a running server.
+
+Usage:
+    python benchmarks/bench_ws_prefilter.py
+    python benchmarks/bench_ws_prefilter.py --record ws://127.0.0.1:8188/ws --seconds 60 --output stream.jsonl
+    python benchmarks/bench_ws_prefilter.py --stream stream.jsonl --prompt-id <tracked prompt_id>
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import timeit
+import uuid
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from comfykit.comfyui.websocket_manager import WebSocketConnectionManager  # noqa: E402
+from comfykit.utils import json_util  # noqa: E402
+
+
+def frame(msg_type: str, **data) -> str:
+    # Same layout as ComfyUI (aiohttp send_json)
+    return json.dumps({"type": msg_type, "data": data})
+
+
+def prompt_frames(prompt_id: str, nodes: int = 8, steps: int = 30) -> List[str]:
+    """Frames of one prompt execution"""
+    frames = [frame("execution_start", prompt_id=prompt_id, timestamp=0)]
+    frames.append(frame("execution_cached", nodes=["1", "2"], prompt_id=prompt_id, timestamp=0))
+    for node in range(3, 3 + nodes):
+        frames.append(frame("executing", node=str(node), display_node=str(node), prompt_id=prompt_id))
+        node_steps = steps if node == 5 else 1
+        for step in range(1, node_steps + 1):
+            frames.append(frame("progress", value=step, max=node_steps, prompt_id=prompt_id, node=str(node)))
+            frames.append(frame("progress_state", prompt_id=prompt_id, nodes={
+                str(node): {"value": step, "max": node_steps, "state": "running", "node_id": str(node),
+                            "prompt_id": prompt_id, "display_node_id": str(node), "parent_node_id": None,
+                            "real_node_id": str(node)},
+            }))
+    frames.append(frame("executed", node=str(2 + nodes), display_node=str(2 + nodes), output={"images": [
+        {"filename": f"ComfyUI_{i:05d}_.png", "subfolder": "", "type": "output"} for i in range(4)
+    ]}, prompt_id=prompt_id))
+    frames.append(frame("executing", node=None, display_node=None, prompt_id=prompt_id))
+    frames.append(frame("execution_success", prompt_id=prompt_id, timestamp=0))
+    return frames
+
+
+def synthetic_stream(other_prompts: int = 20, seed: int = 0) -> Tuple[List[str], str]:
+    """A shared server's stream: other prompts around the tracked one, plus broadcasts"""
+    rng = random.Random(seed)
+    tracked = str(uuid.UUID(int=rng.getrandbits(128)))
+    prompts = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(other_prompts)]
+    prompts.insert(other_prompts // 2, tracked)
+
+    stream = []
+    for index, prompt_id in enumerate(prompts):
+        for i, message in enumerate(prompt_frames(prompt_id)):
+            stream.append(message)
+            if i % 4 == 0:
+                stream.append(frame("crystools.monitor", cpu_utilization=rng.uniform(0, 100), ram_total=68719476736,
+                                    ram_used=rng.randrange(1 << 34), ram_used_percent=rng.uniform(0, 100),
+                                    hdd_total=-1, hdd_used=-1, hdd_used_percent=-1, device_type="cuda",
+                                    gpus=[{"gpu_utilization": rng.randrange(100), "gpu_temperature": 60,
+                                           "vram_total": 25769803776, "vram_used": rng.randrange(1 << 34),
+                                           "vram_used_percent": rng.uniform(0, 100)}]))
+            if i % 10 == 0:
+                stream.append(frame("status", status={"exec_info": {"queue_remaining": len(prompts) - index}}))
+    return stream, tracked
+
+
+def load_stream(path: str) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+async def record_stream(ws_url: str, seconds: float, output: str):
+    """Write the text frames received from a server, one per line"""
+    import websockets
+
+    url = f"{ws_url}?clientId={uuid.uuid4()}"
+    count = 0
+    with open(output, "w", encoding="utf-8") as f:
+        async with websockets.connect(url, max_size=None) as websocket:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + seconds
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    message = await asyncio.wait_for(websocket.recv(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if isinstance(message, str):
+                    f.write(message.replace("\n", " ") + "\n")
+                    count += 1
+    print(f"Recorded {count} text frames to {output}")
+
+
+def replay(stream: List[str], tracked: Optional[str], prefilter: bool) -> Tuple[float, int]:
+    """Dispatch the stream to a fresh manager
+
+    Returns:
+        Seconds spent (best of 5) and messages delivered to the tracked prompt
+    """
+    def run():
+        manager = WebSocketConnectionManager("ws://127.0.0.1:8188/ws", prefilter=prefilter)
+        queue = manager.subscribe(tracked) if tracked else None
+        for message in stream:
+            manager._dispatch(message)
+        return queue.qsize() if queue is not None else 0
+
+    delivered = run()
+    seconds = min(timeit.repeat(run, number=1, repeat=5))
+    return seconds, delivered
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stream", help="Replay a recorded stream (one text frame per line)")
+    parser.add_argument("--prompt-id", help="Prompt tracked while replaying a recorded stream")
+    parser.add_argument("--record", metavar="WS_URL", help="Record the stream of a server instead")
+    parser.add_argument("--seconds", type=float, default=60.0, help="Recording duration")
+    parser.add_argument("--output", default="ws_stream.jsonl", help="Recording file")
+    args = parser.parse_args()
+
+    if args.record:
+        asyncio.run(record_stream(args.record, args.seconds, args.output))
+        return
+
+    if args.stream:
+        stream, tracked = load_stream(args.stream), args.prompt_id
+    else:
+        stream, tracked = synthetic_stream()
+
+    size = sum(len(message) for message in stream)
+    print(f"json_util backend: {json_util.BACKEND}")
+    print(f"Stream: {len(stream)} frames, {size // 1024} KB, tracked prompt: {tracked or '-'}\n")
+
+    full_time, full_delivered = replay(stream, tracked, prefilter=False)
+    fast_time, fast_delivered = replay(stream, tracked, prefilter=True)
+    if full_delivered != fast_delivered:
+        print(f"Delivered messages differ: {full_delivered} decoding all, {fast_delivered} pre-filtered")
+
+    print(f"{'mode':<16} {'total':>10} {'per frame':>12} {'delivered':>10}")
+    print(f"{'decode all':<16} {full_time * 1e3:>7.1f} ms {full_time / len(stream) * 1e6:>9.2f} µs {full_delivered:>10}")
+    print(f"{'pre-filter':<16} {fast_time * 1e3:>7.1f} ms {fast_time / len(stream) * 1e6:>9.2f} µs {fast_delivered:>10}")
+    print(f"\nspeedup: {full_time / fast_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
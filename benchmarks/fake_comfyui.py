@@ -0,0 +1,294 @@
+"""
+Fake ComfyUI Server - local aiohttp stand-in for ComfyUI used by the benchmarks
+
+Implements the endpoints ComfyKit talks to (/prompt, /queue, /history,
+/history/{prompt_id}, /ws, /upload/image, /view) with the same message
+flow as ComfyUI, but "executes" a prompt by sleeping. Execution latency,
+number/size of output images, progress steps and parallel execution slots
+are configurable, so ComfyKit's own overhead can be measured.
+
+Benchmark helpers (not part of ComfyUI):
+    GET  /bench/stats   request counts per route and timings of each prompt
+    POST /bench/reset   clear counts, timings and history
+    POST /bench/config  change settings (JSON body, same names as the CLI)
+
+Usage:
+    python benchmarks/fake_comfyui.py --port 8288 --latency 0.5 --output-images 2
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+SETTINGS = ("latency", "output_images", "output_bytes", "progress_steps", "workers")
+
+
+class FakeComfyUI:
+    """In-memory ComfyUI: a prompt queue run by `workers` parallel slots"""
+
+    def __init__(self, latency: float = 0.1, output_images: int = 1, output_bytes: int = 256 * 1024,
+                 progress_steps: int = 5, workers: int = 1):
+        """Initialize fake server
+
+        Args:
+            latency: Seconds a prompt "executes"
+            output_images: Images output by the SaveImage node of each prompt
+            output_bytes: Size of each file served by /view
+            progress_steps: Progress messages sent while a prompt executes
+            workers: Prompts executed at once (ComfyUI runs one)
+        """
+        self.latency = latency
+        self.output_images = output_images
+        self.output_bytes = output_bytes
+        self.progress_steps = progress_steps
+        self.workers = workers
+
+        self.pending: List[Tuple[int, str, Dict[str, Any]]] = []
+        self.running: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        self.history: Dict[str, Dict[str, Any]] = {}
+        self.uploads: Dict[str, int] = {}
+        self.sockets: Dict[str, web.WebSocketResponse] = {}
+        self.number = 0
+        self._wakeup = asyncio.Event()
+        self._slots: List[asyncio.Task] = []
+        self.reset()
+
+        self.app = web.Application(client_max_size=1024 ** 3, middlewares=[self.count_requests])
+        router = self.app.router
+        router.add_post("/prompt", self.post_prompt)
+        router.add_get("/queue", self.get_queue)
+        router.add_get("/history", self.get_history)
+        router.add_get("/history/{prompt_id}", self.get_prompt_history)
+        router.add_post("/upload/image", self.upload_image)
+        router.add_get("/view", self.view)
+        router.add_get("/ws", self.websocket)
+        router.add_get("/bench/stats", self.bench_stats)
+        router.add_post("/bench/reset", self.bench_reset)
+        router.add_post("/bench/config", self.bench_config)
+        self.app.on_startup.append(self._start_slots)
+        self.app.on_cleanup.append(self._stop_slots)
+
+    def reset(self):
+        self.counts: Dict[str, int] = {}
+        self.timings: Dict[str, Dict[str, float]] = {}
+        self.history.clear()
+        self.uploads.clear()
+
+    def configure(self, **settings):
+        for name, value in settings.items():
+            if name not in SETTINGS:
+                raise ValueError(f"Unknown setting: {name}")
+            setattr(self, name, value)
+        self._resize_slots()
+
+    @web.middleware
+    async def count_requests(self, request: web.Request, handler):
+        resource = request.match_info.route.resource
+        route = resource.canonical if resource is not None else request.path
+        if not route.startswith("/bench/"):
+            key = f"{request.method} {route}"
+            self.counts[key] = self.counts.get(key, 0) + 1
+        return await handler(request)
+
+    async def _start_slots(self, app: web.Application):
+        self._resize_slots()
+
+    async def _stop_slots(self, app: web.Application):
+        for slot in self._slots:
+            slot.cancel()
+        await asyncio.gather(*self._slots, return_exceptions=True)
+        for socket in list(self.sockets.values()):
+            await socket.close()
+
+    def _resize_slots(self):
+        self._slots = [slot for slot in self._slots if not slot.done()]
+        while len(self._slots) < self.workers:
+            self._slots.append(asyncio.ensure_future(self._run_slot()))
+        for slot in self._slots[self.workers:]:
+            slot.cancel()
+        del self._slots[self.workers:]
+
+    async def _send(self, client_id: Optional[str], msg_type: str, data: Dict[str, Any]):
+        message = json.dumps({"type": msg_type, "data": data})
+        if msg_type == "status":
+            targets = list(self.sockets.values())
+        else:
+            socket = self.sockets.get(client_id)
+            targets = [socket] if socket is not None else []
+        for socket in targets:
+            try:
+                await socket.send_str(message)
+            except Exception:
+                pass
+
+    async def _broadcast_status(self):
+        await self._send(None, "status", {"status": {"exec_info": {"queue_remaining": len(self.pending) + len(self.running)}}})
+
+    async def _run_slot(self):
+        while True:
+            while not self.pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            number, prompt_id, body = self.pending.pop(0)
+            self.running[prompt_id] = (number, body)
+            await self._execute(prompt_id, body)
+            del self.running[prompt_id]
+            await self._broadcast_status()
+
+    async def _execute(self, prompt_id: str, body: Dict[str, Any]):
+        client_id = body.get("client_id")
+        timing = self.timings[prompt_id]
+        timing["started_at"] = time.time()
+        await self._broadcast_status()
+        await self._send(client_id, "execution_start", {"prompt_id": prompt_id, "timestamp": int(time.time() * 1000)})
+        await self._send(client_id, "execution_cached", {"nodes": [], "prompt_id": prompt_id, "timestamp": int(time.time() * 1000)})
+        await self._send(client_id, "executing", {"node": "3", "display_node": "3", "prompt_id": prompt_id})
+
+        steps = max(self.progress_steps, 1)
+        for step in range(1, steps + 1):
+            await asyncio.sleep(self.latency / steps)
+            if self.progress_steps:
+                await self._send(client_id, "progress", {"value": step, "max": steps, "prompt_id": prompt_id, "node": "3"})
+
+        output = {"images": [
+            {"filename": f"ComfyKit_{prompt_id[:8]}_{index:05d}_.png", "subfolder": "", "type": "output"}
+            for index in range(self.output_images)
+        ]}
+        await self._send(client_id, "executing", {"node": "9", "display_node": "9", "prompt_id": prompt_id})
+        await self._send(client_id, "executed", {"node": "9", "display_node": "9", "output": output, "prompt_id": prompt_id})
+        self.history[prompt_id] = {
+            "prompt": [0, prompt_id, body.get("prompt", {}), {"client_id": client_id}, ["9"]],
+            "outputs": {"9": output},
+            "status": {"status_str": "success", "completed": True, "messages": []},
+        }
+        timing["finished_at"] = time.time()
+        await self._send(client_id, "executing", {"node": None, "display_node": None, "prompt_id": prompt_id})
+        await self._send(client_id, "execution_success", {"prompt_id": prompt_id, "timestamp": int(time.time() * 1000)})
+
+    async def post_prompt(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if not isinstance(body.get("prompt"), dict):
+            return web.json_response({"error": {"type": "invalid_prompt", "message": "No prompt provided"}}, status=400)
+        prompt_id = str(uuid.uuid4())
+        self.timings[prompt_id] = {"received_at": time.time()}
+        self.number += 1
+        self.pending.append((self.number, prompt_id, body))
+        self._wakeup.set()
+        await self._broadcast_status()
+        return web.json_response({"prompt_id": prompt_id, "number": self.number, "node_errors": {}})
+
+    async def get_queue(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "queue_running": [[number, prompt_id, {}, {}, ["9"]] for prompt_id, (number, _) in self.running.items()],
+            "queue_pending": [[number, prompt_id, {}, {}, ["9"]] for number, prompt_id, _ in self.pending],
+        })
+
+    async def get_history(self, request: web.Request) -> web.Response:
+        items = list(self.history.items())
+        max_items = request.query.get("max_items")
+        if max_items is not None:
+            items = items[-int(max_items):]
+        return web.json_response(dict(items))
+
+    async def get_prompt_history(self, request: web.Request) -> web.Response:
+        prompt_id = request.match_info["prompt_id"]
+        entry = self.history.get(prompt_id)
+        return web.json_response({prompt_id: entry} if entry is not None else {})
+
+    async def upload_image(self, request: web.Request) -> web.Response:
+        reader = await request.multipart()
+        name, size = None, 0
+        while True:
+            field = await reader.next()
+            if field is None:
+                break
+            if field.name == "image":
+                name = field.filename
+                while True:
+                    chunk = await field.read_chunk(65536)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+            else:
+                await field.release()
+        if name is None:
+            return web.Response(status=400, text="No image provided")
+        self.uploads[name] = size
+        return web.json_response({"name": name, "subfolder": "", "type": "input"})
+
+    async def view(self, request: web.Request) -> web.StreamResponse:
+        filename = request.query.get("filename", "")
+        if request.query.get("type") == "input":
+            if filename not in self.uploads:
+                return web.Response(status=404)
+            size = self.uploads[filename]
+        else:
+            size = self.output_bytes
+        body = (bytes(range(256)) * (size // 256 + 1))[:size]
+
+        range_header = request.headers.get("Range")
+        if range_header and range_header.startswith("bytes="):
+            start = int(range_header[len("bytes="):].split("-")[0] or 0)
+            if start >= size:
+                return web.Response(status=416, headers={"Content-Range": f"bytes */{size}"})
+            return web.Response(status=206, body=body[start:], content_type="image/png",
+                                headers={"Content-Range": f"bytes {start}-{size - 1}/{size}"})
+        return web.Response(body=body, content_type="image/png")
+
+    async def websocket(self, request: web.Request) -> web.WebSocketResponse:
+        socket = web.WebSocketResponse(max_msg_size=0)
+        await socket.prepare(request)
+        client_id = request.query.get("clientId") or str(uuid.uuid4())
+        self.sockets[client_id] = socket
+        await socket.send_str(json.dumps({"type": "status", "data": {
+            "status": {"exec_info": {"queue_remaining": len(self.pending) + len(self.running)}}, "sid": client_id,
+        }}))
+        try:
+            async for _ in socket:
+                pass
+        finally:
+            if self.sockets.get(client_id) is socket:
+                del self.sockets[client_id]
+        return socket
+
+    async def bench_stats(self, request: web.Request) -> web.Response:
+        return web.json_response({"counts": self.counts, "timings": self.timings})
+
+    async def bench_reset(self, request: web.Request) -> web.Response:
+        self.reset()
+        return web.json_response({})
+
+    async def bench_config(self, request: web.Request) -> web.Response:
+        try:
+            self.configure(**await request.json())
+        except ValueError as e:
+            return web.Response(status=400, text=str(e))
+        return web.json_response({name: getattr(self, name) for name in SETTINGS})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8288)
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds a prompt executes")
+    parser.add_argument("--output-images", type=int, default=1, help="Output images per prompt")
+    parser.add_argument("--output-bytes", type=int, default=256 * 1024, help="Size of each output image")
+    parser.add_argument("--progress-steps", type=int, default=5, help="Progress messages per prompt")
+    parser.add_argument("--workers", type=int, default=1, help="Prompts executed at once")
+    args = parser.parse_args()
+
+    async def create_app() -> web.Application:
+        server = FakeComfyUI(latency=args.latency, output_images=args.output_images, output_bytes=args.output_bytes,
+                             progress_steps=args.progress_steps, workers=args.workers)
+        return server.app
+
+    web.run_app(create_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,17 +10,13 @@ Example:
     >>> print(result.images)
 """
 
-try:
-    import tomllib  # Python 3.11+
-except ImportError:
-    import tomli as tomllib  # Python 3.8-3.10
-
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from comfykit.comfyui.models import ExecuteResult
-
-# Core API exports
-from comfykit.executor import ComfyKit
+# The public API is imported on first access, see __getattr__
+if TYPE_CHECKING:
+    from comfykit.comfyui.models import ExecuteResult
+    from comfykit.executor import ComfyKit
 
 
 def get_version() -> str:
@@ -54,6 +50,11 @@ def get_version() -> str:
         if pyproject_path is None:
             return "unknown"
 
+        try:
+            import tomllib  # Python 3.11+
+        except ImportError:
+            import tomli as tomllib  # Python 3.8-3.10
+
         with open(pyproject_path, "rb") as f:
             pyproject_data = tomllib.load(f)
 
@@ -61,10 +62,27 @@ def get_version() -> str:
     except Exception:
         return "unknown"
 
-__version__ = get_version()
 
 __all__ = [
     "ComfyKit",
     "ExecuteResult",
     "__version__",
 ]
+
+
+def __getattr__(name: str):
+    """Resolve the public API lazily (PEP 562), `import comfykit` stays cheap"""
+    if name == "ComfyKit":
+        from comfykit.executor import ComfyKit as value
+    elif name == "ExecuteResult":
+        from comfykit.comfyui.models import ExecuteResult as value
+    elif name == "__version__":
+        value = get_version()
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,8 +1,34 @@
-from .runninghub_client import RunningHubClient, get_runninghub_client
-from .runninghub_executor import RunningHubExecutor
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .runninghub_client import RunningHubClient, get_runninghub_client
+    from .runninghub_executor import RunningHubExecutor
 
 __all__ = [
     'RunningHubClient',
     'get_runninghub_client',
     'RunningHubExecutor'
 ]
+
+# Imported on first access (PEP 562), importing a submodule such as
+# comfykit.comfyui.models must not load the RunningHub client (aiohttp, ssl)
+_LAZY_EXPORTS = {
+    'RunningHubClient': 'runninghub_client',
+    'get_runninghub_client': 'runninghub_client',
+    'RunningHubExecutor': 'runninghub_executor',
+}
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,20 +1,27 @@
+import asyncio
 import copy
-import json
 import mimetypes
 import os
 import random
-import tempfile
+import time
 from abc import ABC, abstractmethod
 from contextlib import asynccontextmanager
-from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 from urllib.parse import urlparse
 
 import aiohttp
 
-from comfykit.comfyui.models import ExecuteResult
-from comfykit.comfyui.workflow_parser import WorkflowMetadata, WorkflowParser
+from comfykit.comfyui.media import MediaDownloader
+from comfykit.comfyui.models import CompletedEvent, ExecuteResult, StreamEvent
+from comfykit.comfyui.result_cache import ResultCache, get_result_cache
+from comfykit.comfyui.upload_cache import UploadCache, get_upload_cache
+from comfykit.comfyui.workflow_cache import get_workflow_cache
+from comfykit.comfyui.workflow_parser import WorkflowMetadata
 from comfykit.logger import logger
+from comfykit.utils import json_util
 from comfykit.utils.os_util import get_data_path
+from comfykit.utils.retry_util import HttpStatusError, RetryPolicy
 
 # Node types that need special media upload handling
 MEDIA_UPLOAD_NODE_TYPES = {
@@ -25,36 +32,318 @@ MEDIA_UPLOAD_NODE_TYPES = {
     'VHS_LoadVideo',
 }
 
+@dataclass
+class PreparedPrompt:
+    """Workflow with parameters applied (media uploaded), ready to be submitted"""
+    workflow_data: Dict[str, Any]
+    output_id_2_var: Dict[str, str]
+    prompt_ext_params: Dict[str, Any] = field(default_factory=dict)
+    seed_changes: Dict[str, int] = field(default_factory=dict)
+    cache_key: Optional[str] = None
+    server_url: Optional[str] = None  # Server the media was uploaded to (set by the pool executor)
+
+
 class ComfyUIExecutor(ABC):
     """ComfyUI executor abstract base class"""
 
-    def __init__(self, base_url: str = None, api_key: str = None, cookies: str = None):
+    def __init__(self, base_url: str = None, api_key: str = None, cookies: str = None,
+                 connection_limit: int = 100, connection_limit_per_host: int = 0, keepalive_timeout: float = 30.0,
+                 cookies_ttl: Optional[float] = 300.0, prefetch_media: bool = False,
+                 upload_cache: Union[bool, UploadCache] = False, upload_cache_url_ttl: Optional[float] = 3600.0,
+                 upload_concurrency: int = 4, max_concurrent_uploads: int = 8, retry_count: int = 2,
+                 result_cache: Union[bool, ResultCache] = False, keep_outputs: bool = False):
         """Initialize executor
         
         Args:
             base_url: ComfyUI base URL (optional)
             api_key: API key for authentication (optional)
             cookies: Cookies for authentication (optional)
+            connection_limit: Max open connections in the pooled session (default: 100, 0 = unlimited)
+            connection_limit_per_host: Max open connections per host (default: 0, unlimited)
+            keepalive_timeout: Seconds an idle keep-alive connection is kept in the pool (default: 30)
+            cookies_ttl: Seconds resolved URL-sourced cookies are reused before refetching
+                        (default: 300, None = until a 401/403 invalidates them)
+            prefetch_media: Start downloading output media as soon as it is produced,
+                           so result.media() reads/saves hit local files (default: False)
+            upload_cache: Skip uploading media inputs that were already uploaded to the same
+                         target (True: shared on-disk cache, or an UploadCache instance; default: False)
+            upload_cache_url_ttl: Seconds an upload of a URL input is reused, URL contents are
+                                 assumed unchanged meanwhile (default: 3600, None = no expiry)
+            upload_concurrency: Max concurrent media uploads of one execution (default: 4)
+            max_concurrent_uploads: Max concurrent media uploads across all executions of
+                                   this executor (default: 8)
+            retry_count: Retries of transient /prompt and upload failures (default: 2)
+            result_cache: Reuse results of exact repeats of a prompt, executions with randomized
+                         seeds excepted (True: shared cache, or a ResultCache instance; default: False)
+            keep_outputs: Keep the raw node outputs in result.outputs (default: False)
         """
         self.base_url = (base_url or "http://127.0.0.1:8188").rstrip('/')
         self.api_key = api_key
         self.cookies = cookies
+        self.connection_limit = connection_limit
+        self.connection_limit_per_host = connection_limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._session_cookies: Optional[Dict[str, str]] = None
+
+        # Resolved cookies cache (see _parse_comfyui_cookies)
+        self.cookies_ttl = cookies_ttl
+        self._resolved_cookies: Optional[Dict[str, str]] = None
+        self._cookies_expire_at: Optional[float] = None
+        # asyncio primitives are bound to the event loop that first uses them,
+        # they are created per running loop like the session
+        self._cookies_lock: Optional[asyncio.Lock] = None
+        self._cookies_lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.prefetch_media = prefetch_media
+        self.keep_outputs = keep_outputs
+
+        if upload_cache is True:
+            upload_cache = get_upload_cache()
+        self.upload_cache: Optional[UploadCache] = upload_cache or None
+        self.upload_cache_url_ttl = upload_cache_url_ttl
+
+        self.upload_concurrency = upload_concurrency
+        self.max_concurrent_uploads = max_concurrent_uploads
+        self._upload_semaphore: Optional[asyncio.Semaphore] = None
+        self._upload_semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._media_downloader: Optional[MediaDownloader] = None
+
+        # Transient failures of /prompt and uploads are retried, each endpoint has its own circuit breaker
+        self.retry_policy = RetryPolicy(max_attempts=retry_count + 1)
+
+        if result_cache is True:
+            result_cache = get_result_cache()
+        # Explicit check, an empty cache is falsy (__len__)
+        self.result_cache: Optional[ResultCache] = result_cache if isinstance(result_cache, ResultCache) else None
 
     @abstractmethod
     async def execute_workflow(self, workflow_file: str, params: Dict[str, Any] = None) -> ExecuteResult:
         """Abstract method to execute a workflow"""
         pass
 
+    async def prepare_workflow(self, workflow_file: str, params: Dict[str, Any] = None) -> PreparedPrompt:
+        """Load workflow, apply parameters (uploading media) and randomize seeds
+        
+        Preparation is separated from submission so that batch execution can
+        prepare the next items while earlier ones are running on ComfyUI.
+        
+        Raises:
+            Exception: If the workflow cannot be loaded or a parameter cannot be applied
+        """
+        if not os.path.exists(workflow_file):
+            raise Exception(f"Workflow file does not exist: {workflow_file}")
+
+        # Get workflow metadata
+        metadata = self.get_workflow_metadata(workflow_file)
+        if not metadata:
+            raise Exception("Cannot parse workflow metadata")
+
+        # Load workflow JSON (shared cache entry, copied when params are applied)
+        workflow_data = self.get_workflow_data(workflow_file)
+
+        if not workflow_data:
+            raise Exception("Workflow data is missing")
+
+        # Use new parameter mapping logic
+        # Even if no parameters are passed, default values need to be applied
+        workflow_data = await self._apply_params_to_workflow(workflow_data, metadata, params or {})
+
+        # Replace any seed == 0 with a random 63-bit seed before submission
+        workflow_data, seed_changes = self._randomize_seed_in_workflow(workflow_data)
+
+        # Extract output node information from metadata
+        output_id_2_var = self._extract_output_nodes(metadata)
+
+        # Prepare extra parameters
+        prompt_ext_params = {}
+        if self.api_key:
+            prompt_ext_params = {
+                "extra_data": {
+                    "api_key_comfy_org": self.api_key
+                }
+            }
+        else:
+            logger.debug("COMFYUI_API_KEY is not set")
+
+        return PreparedPrompt(
+            workflow_data=workflow_data,
+            output_id_2_var=output_id_2_var,
+            prompt_ext_params=prompt_ext_params,
+            seed_changes=seed_changes,
+            cache_key=self._get_result_cache_key(workflow_data, seed_changes),
+        )
+
+    async def execute_prepared(self, prepared: PreparedPrompt) -> ExecuteResult:
+        """Submit a prepared workflow and wait for its result"""
+        raise NotImplementedError(f"{type(self).__name__} does not support prepared execution")
+
+    async def stream_prepared(self, prepared: PreparedPrompt, previews: bool = False) -> AsyncIterator[StreamEvent]:
+        """Submit a prepared workflow and yield execution events
+
+        Executors without progress reporting only yield the final CompletedEvent.
+
+        Args:
+            prepared: Prepared workflow
+            previews: Also yield latent preview images (PreviewEvent), if supported
+        """
+        result = await self.execute_prepared(prepared)
+        yield CompletedEvent(prompt_id=result.prompt_id, result=result)
+
+    async def stream_workflow(self, workflow_file: str, params: Dict[str, Any] = None, previews: bool = False) -> AsyncIterator[StreamEvent]:
+        """Execute workflow and yield execution events, ending with a CompletedEvent
+
+        Executors without progress reporting only yield the final CompletedEvent.
+
+        Args:
+            workflow_file: Workflow file path
+            params: Workflow parameters
+            previews: Also yield latent preview images (PreviewEvent), if supported
+        """
+        result = await self.execute_workflow(workflow_file, params)
+        yield CompletedEvent(prompt_id=result.prompt_id, result=result)
+
+    def _get_result_cache_key(self, prompt: Any, seed_changes: Dict[str, int]) -> Optional[str]:
+        """Get the result cache key of a final prompt, None if the result must not be reused"""
+        if self.result_cache is None:
+            return None
+        if seed_changes:
+            logger.debug("Seeds were randomized, skipping the result cache")
+            return None
+        return ResultCache.make_key(self._get_upload_target(), prompt)
+
+    async def _get_cached_result(self, cache_key: Optional[str]) -> Optional[ExecuteResult]:
+        """Get a copy of a cached result, bound to this executor's downloader"""
+        if self.result_cache is None or cache_key is None:
+            return None
+        entry = await self.result_cache.get(cache_key)
+        if entry is None:
+            return None
+
+        logger.info(f"Reuse cached result of prompt {entry.result.prompt_id}")
+        result = entry.result.model_copy(deep=True)
+        result.cached = True
+        downloader = self.get_media_downloader()
+        for url, path in entry.media.items():
+            downloader.use_local_file(url, path)
+        return self._attach_media(result)
+
+    async def _store_result(self, cache_key: Optional[str], result: ExecuteResult):
+        """Remember a completed result in the result cache"""
+        if self.result_cache is None or cache_key is None or result.status != "completed":
+            return
+        try:
+            await self.result_cache.put(cache_key, result, self.get_media_downloader())
+        except Exception as e:
+            logger.warning(f"Failed to cache result: {e}")
+
+    def _is_cookies_url(self) -> bool:
+        """Check if COMFYUI_COOKIES points to a URL that serves the cookies"""
+        return bool(self.cookies) and self.cookies.strip().startswith(('http://', 'https://'))
+
+    def _has_valid_cookies(self) -> bool:
+        """Check if resolved cookies are cached and not expired"""
+        if self._resolved_cookies is None:
+            return False
+        return self._cookies_expire_at is None or time.monotonic() < self._cookies_expire_at
+
+    def invalidate_cookies(self):
+        """Drop resolved cookies so the next request resolves them again"""
+        if self._resolved_cookies is not None:
+            logger.info("Invalidated cached ComfyUI cookies")
+        self._resolved_cookies = None
+        self._cookies_expire_at = None
+
+    def _check_auth_status(self, status: int) -> bool:
+        """Invalidate cached cookies when ComfyUI rejects the request as unauthorized
+
+        Returns:
+            True if cookies were invalidated (a retry will use fresh ones)
+        """
+        if status in (401, 403) and self._is_cookies_url():
+            self.invalidate_cookies()
+            return True
+        return False
+
+    def _status_error(self, status: int, message: str) -> HttpStatusError:
+        """Build the error of an unexpected response status (retryable after a cookie refresh)"""
+        return HttpStatusError(status, message, retryable=True if self._check_auth_status(status) else None)
+
+    async def _queue_prompt(self, workflow: Dict[str, Any], client_id: str, prompt_ext_params: Optional[Dict[str, Any]] = None) -> str:
+        """Submit workflow to queue
+
+        Submissions are only retried when ComfyUI surely did not queue the
+        prompt (connection refused, 429/503), so it never runs twice.
+        """
+        prompt_data = {
+            "prompt": workflow,
+            "client_id": client_id
+        }
+
+        # Update all parameters of prompt_data and prompt_ext_params
+        if prompt_ext_params:
+            prompt_data.update(prompt_ext_params)
+
+        json_data = json_util.dumpb(prompt_data)
+
+        # Use aiohttp to send request
+        prompt_url = f"{self.base_url}/prompt"
+
+        async def submit() -> str:
+            async with self.get_comfyui_session() as session:
+                async with session.post(
+                        prompt_url,
+                        data=json_data,
+                        headers={"Content-Type": "application/json"}
+                    ) as response:
+                    if response.status != 200:
+                        response_text = await response.text()
+                        raise self._status_error(response.status, f"Submit workflow failed: [{response.status}] {response_text}")
+
+                    result = await response.json(loads=json_util.loads)
+                    prompt_id = result.get("prompt_id")
+                    if not prompt_id:
+                        raise Exception(f"Get prompt_id failed: {result}")
+                    logger.info(f"Task submitted: {prompt_id}")
+                    return prompt_id
+
+        return await self.retry_policy.call(submit, key="/prompt", idempotent=False)
+
     async def _parse_comfyui_cookies(self) -> Optional[Dict[str, str]]:
+        """Get resolved COMFYUI_COOKIES (cached)
+        
+        Static cookies are parsed once. URL-sourced cookies are reused for
+        cookies_ttl seconds or until a 401/403 response invalidates them.
+        Concurrent callers share a single refresh instead of each fetching the URL.
+        """
+        if not self.cookies:
+            return None
+
+        if self._has_valid_cookies():
+            return self._resolved_cookies
+
+        async with self._get_cookies_lock():
+            # Another caller may have refreshed the cookies while we were waiting
+            if self._has_valid_cookies():
+                return self._resolved_cookies
+
+            cookies = await self._load_comfyui_cookies()
+            if cookies is not None:
+                self._resolved_cookies = cookies
+                if self._is_cookies_url() and self.cookies_ttl is not None:
+                    self._cookies_expire_at = time.monotonic() + self.cookies_ttl
+                else:
+                    self._cookies_expire_at = None
+            return cookies
+
+    async def _load_comfyui_cookies(self) -> Optional[Dict[str, str]]:
         """Parse COMFYUI_COOKIES configuration and return cookies dictionary
         Supports three formats:
         1. HTTP URL - Access cookies from a URL
         2. JSON string format - directly parse
         3. Key-value string format - parse to dictionary
         """
-        if not self.cookies:
-            return None
-
         try:
             content = self.cookies.strip()
 
@@ -70,7 +359,7 @@ class ComfyUIExecutor(ABC):
 
             # Parse cookies content
             if content.startswith('{'):
-                return json.loads(content)
+                return json_util.loads(content)
             else:
                 cookies = {}
                 for pair in content.split(';'):
@@ -82,22 +371,139 @@ class ComfyUIExecutor(ABC):
             logger.warning(f"Failed to parse COMFYUI_COOKIES: {e}")
             return None
 
+    def _get_cookies_lock(self) -> asyncio.Lock:
+        """Get or create the cookies refresh lock of the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._cookies_lock is None or self._cookies_lock_loop is not loop:
+            self._cookies_lock = asyncio.Lock()
+            self._cookies_lock_loop = loop
+        return self._cookies_lock
+
+    def _get_upload_semaphore(self) -> asyncio.Semaphore:
+        """Get or create the semaphore bounding uploads across executions of the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._upload_semaphore is None or self._upload_semaphore_loop is not loop:
+            self._upload_semaphore = asyncio.Semaphore(self.max_concurrent_uploads)
+            self._upload_semaphore_loop = loop
+        return self._upload_semaphore
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Get or create the pooled session shared by all requests of this executor
+        
+        Returns:
+            Shared aiohttp ClientSession instance (keep-alive connection pool)
+        """
+        loop = asyncio.get_running_loop()
+        if self._session is not None and not self._session.closed and self._session_loop is not loop:
+            # Session belongs to another (possibly closed) event loop and cannot be reused
+            logger.warning("ComfyUI session was created in another event loop, creating a new one")
+            self._session = None
+
+        if self._session is None or self._session.closed:
+            headers = {}
+
+            # Add API key if configured
+            if self.api_key:
+                headers['Authorization'] = f'Bearer {self.api_key}'
+
+            connector = aiohttp.TCPConnector(
+                limit=self.connection_limit,
+                limit_per_host=self.connection_limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(headers=headers, connector=connector)
+            self._session_loop = loop
+            self._session_cookies = None
+            logger.info(f"Created new aiohttp ClientSession for ComfyUI: {self.base_url}")
+        return self._session
+
     @asynccontextmanager
     async def get_comfyui_session(self) -> AsyncGenerator[aiohttp.ClientSession, None]:
-        """Create aiohttp session with authentication"""
-        headers = {}
+        """Get the pooled aiohttp session with authentication
         
-        # Add API key if configured
-        if self.api_key:
-            headers['Authorization'] = f'Bearer {self.api_key}'
-        
-        # Parse cookies
+        The session is shared and stays open after the context exits,
+        call close() to release the connection pool.
+        """
+        session = await self._get_session()
+
+        # Parse cookies (only pushed into the cookie jar when they changed)
         cookies = await self._parse_comfyui_cookies()
-        
-        # Create session with auth
-        async with aiohttp.ClientSession(headers=headers, cookies=cookies) as session:
-            yield session
+        if cookies and cookies is not self._session_cookies:
+            session.cookie_jar.update_cookies(cookies)
+            self._session_cookies = cookies
+
+        yield session
+
+    def get_media_downloader(self) -> MediaDownloader:
+        """Get the downloader used by media handles of this executor's results"""
+        if self._media_downloader is None:
+            self._media_downloader = MediaDownloader(self)
+        return self._media_downloader
+
+    def _prefetch_media(self, urls: List[str]):
+        """Start downloading output media in the background if prefetching is enabled"""
+        if not self.prefetch_media:
+            return
+        downloader = self.get_media_downloader()
+        for url in urls:
+            downloader.prefetch(url)
+
+    def _attach_media(self, result: ExecuteResult) -> ExecuteResult:
+        """Bind result media handles to this executor's downloader"""
+        result._media_downloader = self.get_media_downloader()
+        self._prefetch_media(result.images + result.videos + result.audios)
+        return result
 
+    async def close(self):
+        """Close the pooled session and cleanup resources"""
+        if self._media_downloader is not None:
+            await self._media_downloader.close()
+            self._media_downloader = None
+        if self._session and not self._session.closed:
+            await self._session.close()
+            logger.info("Closed ComfyUI aiohttp ClientSession")
+        self._session = None
+        self._session_loop = None
+
+    async def __aenter__(self):
+        """Async context manager entry"""
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Async context manager exit"""
+        await self.close()
+
+    async def _get_prompt_history(self, prompt_id: str) -> Optional[Dict[str, Any]]:
+        """Get /history entry of a prompt, None if it is not finished (or not found)"""
+        history_url = f"{self.base_url}/history/{prompt_id}"
+        async with self.get_comfyui_session() as session:
+            async with session.get(history_url) as response:
+                if response.status != 200:
+                    self._check_auth_status(response.status)
+                    return None
+                history_data = await response.json(loads=json_util.loads)
+                return history_data.get(prompt_id)
+
+    async def _get_history(self, max_items: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Get recent /history entries (most recent max_items), None on failure"""
+        history_url = f"{self.base_url}/history"
+        params = {"max_items": str(max_items)} if max_items else None
+        async with self.get_comfyui_session() as session:
+            async with session.get(history_url, params=params) as response:
+                if response.status != 200:
+                    self._check_auth_status(response.status)
+                    return None
+                return await response.json(loads=json_util.loads)
+
+    async def _get_queue(self) -> Optional[Dict[str, Any]]:
+        """Get /queue (queue_running and queue_pending), None on failure"""
+        queue_url = f"{self.base_url}/queue"
+        async with self.get_comfyui_session() as session:
+            async with session.get(queue_url) as response:
+                if response.status != 200:
+                    self._check_auth_status(response.status)
+                    return None
+                return await response.json(loads=json_util.loads)
 
     def _generate_63bit_seed(self) -> int:
         """Generate a 63-bit random integer seed.
@@ -131,8 +537,58 @@ class ComfyUIExecutor(ABC):
             logger.info(f"Randomized seeds for {len(changed)} node(s): {changed}")
         return workflow_data, changed
 
-    async def _apply_param_mapping(self, workflow_data: Dict[str, Any], mapping: Any, param_value: Any):
-        """Apply single parameter based on parameter mapping"""
+    def _needs_upload(self, mapping: Any) -> bool:
+        """Check if a parameter mapping takes media that may need uploading"""
+        # DSL upload marker (~), or node types with special media handling (backward compatibility)
+        return mapping.need_upload or mapping.node_class_type in MEDIA_UPLOAD_NODE_TYPES
+
+    def _is_upload_source(self, param_value: Any) -> bool:
+        """Check if a media parameter value must be uploaded (URL or local file)"""
+        return isinstance(param_value, str) and (
+            param_value.startswith(('http://', 'https://')) or os.path.exists(param_value)
+        )
+
+    async def _resolve_uploads(self, param_values: List[Any], upload: Callable[[str], Awaitable[Any]]) -> Dict[str, Any]:
+        """Upload all media sources among the values concurrently
+
+        Identical values are uploaded once. Concurrency is bounded per call
+        (upload_concurrency) and across all executions (max_concurrent_uploads).
+
+        Returns:
+            Mapping of source value -> uploaded value
+        """
+        sources = list(dict.fromkeys(value for value in param_values if self._is_upload_source(value)))
+        if not sources:
+            return {}
+
+        execution_slots = asyncio.Semaphore(self.upload_concurrency)
+        upload_slots = self._get_upload_semaphore()
+
+        async def upload_one(source: str) -> Any:
+            async with execution_slots, upload_slots:
+                return await upload(source)
+
+        tasks = [asyncio.create_task(upload_one(source)) for source in sources]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            # One upload failed (or we were cancelled), don't leave the others running
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        return dict(zip(sources, results))
+
+    async def _apply_param_mapping(self, workflow_data: Dict[str, Any], mapping: Any, param_value: Any,
+                                   uploads: Optional[Dict[str, Any]] = None):
+        """Apply single parameter based on parameter mapping
+
+        Args:
+            workflow_data: Workflow to modify
+            mapping: Parameter mapping
+            param_value: Parameter value
+            uploads: Already uploaded media sources (source value -> uploaded name)
+        """
         node_id = mapping.node_id
         input_field = mapping.input_field
         node_class_type = mapping.node_class_type
@@ -151,45 +607,54 @@ class ComfyUIExecutor(ABC):
 
         # Priority 1: Check DSL upload marker (~)
         if need_upload:
-            await self._handle_media_upload(node_data, input_field, param_value)
+            await self._handle_media_upload(node_data, input_field, param_value, uploads)
         # Priority 2: Check if node type needs special media upload handling (backward compatibility)
         elif node_class_type in MEDIA_UPLOAD_NODE_TYPES:
-            await self._handle_media_upload(node_data, input_field, param_value)
+            await self._handle_media_upload(node_data, input_field, param_value, uploads)
         else:
             # Regular parameter setting
             await self._set_node_param(node_data, input_field, param_value)
 
-    async def _handle_media_upload(self, node_data: Dict[str, Any], input_field: str, param_value: Any):
+    async def _handle_media_upload(self, node_data: Dict[str, Any], input_field: str, param_value: Any,
+                                   uploads: Optional[Dict[str, Any]] = None):
         """Handle media upload"""
         # Ensure inputs exist
         if "inputs" not in node_data:
             node_data["inputs"] = {}
 
-        # If parameter value is a URL starting with http, upload media first
+        # If parameter value is a URL or local file, upload media first (unless already uploaded)
         if isinstance(param_value, str):
-            if param_value.startswith(('http://', 'https://')):
-                try:
-                    # Upload media and get uploaded media name
-                    media_value = await self._upload_media_from_source(param_value)
-                    # Use uploaded media name as node input value
-                    await self._set_node_param(node_data, input_field, media_value)
-                    logger.info(f"Media upload successful: {media_value}")
-                except Exception as e:
-                    logger.error(f"Media upload failed: {str(e)}")
-                    raise Exception(f"Media upload failed: {str(e)}")
-            # Handle local file path
-            elif os.path.exists(param_value):
-                try:
-                    uploaded_filename = await self._upload_media(param_value)
-                    await self._set_node_param(node_data, input_field, uploaded_filename)
-                    logger.info(f"Media upload successful (local file): {uploaded_filename}")
-                except Exception as e:
-                    logger.error(f"Failed to upload local file {param_value}: {str(e)}")
-                    raise Exception(f"Failed to upload local file: {str(e)}")
+            if self._is_upload_source(param_value):
+                if uploads is not None and param_value in uploads:
+                    media_value = uploads[param_value]
+                else:
+                    media_value = await self._upload_media_source(param_value)
+                # Use uploaded media name as node input value
+                await self._set_node_param(node_data, input_field, media_value)
         else:
             # Use parameter value as media name
             await self._set_node_param(node_data, input_field, param_value)
 
+    async def _upload_media_source(self, param_value: str) -> str:
+        """Upload a media parameter value (URL or local file) and return the uploaded name"""
+        if param_value.startswith(('http://', 'https://')):
+            try:
+                # Upload media and get uploaded media name
+                media_value = await self._upload_media_from_source_cached(param_value)
+                logger.info(f"Media upload successful: {media_value}")
+                return media_value
+            except Exception as e:
+                logger.error(f"Media upload failed: {str(e)}")
+                raise Exception(f"Media upload failed: {str(e)}")
+        # Handle local file path
+        try:
+            uploaded_filename = await self._upload_media_cached(param_value)
+            logger.info(f"Media upload successful (local file): {uploaded_filename}")
+            return uploaded_filename
+        except Exception as e:
+            logger.error(f"Failed to upload local file {param_value}: {str(e)}")
+            raise Exception(f"Failed to upload local file: {str(e)}")
+
     async def _set_node_param(self, node_data: Dict[str, Any], input_field: str, param_value: Any):
         """Set node parameter"""
         # Ensure inputs exist
@@ -198,41 +663,97 @@ class ComfyUIExecutor(ABC):
         # Set parameter value
         node_data["inputs"][input_field] = param_value
 
-    async def _upload_media_from_source(self, media_url: str) -> str:
-        """Upload media from URL"""
-        async with self.get_comfyui_session() as session:
-            async with session.get(media_url) as response:
-                if response.status != 200:
-                    raise Exception(f"Download media failed: HTTP {response.status}")
-
-                # Extract filename from URL
-                parsed_url = urlparse(media_url)
-                filename = os.path.basename(parsed_url.path)
-                if not filename:
-                    filename = f"temp_media_{hash(media_url)}.jpg"
+    def _get_upload_target(self) -> str:
+        """Identify where uploads go, for the upload cache"""
+        return f"comfyui:{self.base_url}"
 
-                # Get media data
-                media_data = await response.read()
+    async def _is_upload_available(self, uploaded_name: str) -> bool:
+        """Check that a previously uploaded file still exists in the ComfyUI input folder"""
+        subfolder, _, filename = uploaded_name.rpartition('/')
+        params = {"filename": filename, "type": "input"}
+        if subfolder:
+            params["subfolder"] = subfolder
+        try:
+            async with self.get_comfyui_session() as session:
+                async with session.head(f"{self.base_url}/view", params=params) as response:
+                    return response.status == 200
+        except aiohttp.ClientError as e:
+            logger.warning(f"Check uploaded file failed: {e}")
+            return False
+
+    async def _upload_with_cache(self, content_key: str, upload: Callable[[], Awaitable[str]], ttl: Optional[float] = None) -> str:
+        """Run an upload unless the same content was already uploaded to this target"""
+        if self.upload_cache is None:
+            return await upload()
+
+        target = self._get_upload_target()
+        uploaded_name = self.upload_cache.get(content_key, target)
+        if uploaded_name is not None:
+            if await self._is_upload_available(uploaded_name):
+                logger.info(f"Reuse uploaded media: {uploaded_name}")
+                return uploaded_name
+            self.upload_cache.invalidate(content_key, target)
+
+        uploaded_name = await upload()
+        if uploaded_name:
+            self.upload_cache.put(content_key, target, uploaded_name, ttl)
+        return uploaded_name
+
+    async def _upload_media_cached(self, media_path: str) -> str:
+        """Upload a local file, reusing a previous upload of the same content"""
+        if self.upload_cache is None:
+            return await self._upload_media(media_path)
+        content_key = await self.upload_cache.file_key(media_path)
+        return await self._upload_with_cache(content_key, lambda: self._upload_media(media_path))
+
+    async def _upload_media_from_source_cached(self, media_url: str) -> str:
+        """Upload media from URL, reusing a recent upload of the same URL"""
+        if self.upload_cache is None:
+            return await self._upload_media_from_source(media_url)
+        return await self._upload_with_cache(
+            UploadCache.url_key(media_url),
+            lambda: self._upload_media_from_source(media_url),
+            ttl=self.upload_cache_url_ttl,
+        )
 
-                # Save to temporary file
-                suffix = os.path.splitext(filename)[1] or ".jpg"
-                with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-                    tmp.write(media_data)
-                    temp_path = tmp.name
+    async def _upload_media_from_source(self, media_url: str) -> str:
+        """Upload media from URL
 
-        try:
-            # Upload temporary file to ComfyUI
-            return await self._upload_media(temp_path)
-        finally:
-            # Delete temporary file
-            os.unlink(temp_path)
+        The download body is relayed into the upload body chunk by chunk, the
+        media is neither buffered in memory nor written to disk. A retry
+        downloads it again.
+        """
+        # Extract filename from URL
+        parsed_url = urlparse(media_url)
+        filename = os.path.basename(parsed_url.path)
+        if not filename:
+            filename = f"temp_media_{hash(media_url)}.jpg"
+
+        async def relay() -> str:
+            async with self.get_comfyui_session() as session:
+                # The source and ComfyUI have their own circuit breakers, a failing
+                # source host (headers or body) must not pause uploads of other media
+                download_key = f"download:{parsed_url.netloc}"
+                async with self.retry_policy.circuit(download_key):
+                    response = await session.get(media_url)
+                    if response.status != 200:
+                        response.release()
+                        raise HttpStatusError(response.status, f"Download media failed: HTTP {response.status}")
+
+                async with response:
+                    mime_type = mimetypes.guess_type(filename)[0] or response.content_type or 'application/octet-stream'
+                    body = self.retry_policy.stream(download_key, response.content.iter_any())
+                    async with self.retry_policy.circuit("/upload/image"):
+                        return await self._post_media(filename, body, mime_type)
+
+        return await self.retry_policy.call(relay, key=None)
 
     async def _upload_media(self, media_path: str) -> str:
-        """Upload media to ComfyUI"""
-        # Read media data
-        with open(media_path, 'rb') as f:
-            media_data = f.read()
+        """Upload media to ComfyUI
 
+        The file is streamed from disk in chunks, so large videos are never
+        loaded into memory as a whole.
+        """
         # Extract filename
         filename = os.path.basename(media_path)
 
@@ -241,9 +762,24 @@ class ComfyUIExecutor(ABC):
         if mime_type is None:
             mime_type = 'application/octet-stream'
 
+        async def upload() -> str:
+            with open(media_path, 'rb') as f:
+                return await self._post_media(filename, f, mime_type)
+
+        return await self.retry_policy.call(upload, key="/upload/image")
+
+    async def _post_media(self, filename: str, content: Any, mime_type: str) -> str:
+        """POST media to /upload/image (single attempt)
+
+        Args:
+            filename: File name sent to ComfyUI
+            content: Bytes, file object, stream (aiohttp.StreamReader) or async iterable of
+                     bytes, all but bytes are sent chunk by chunk
+            mime_type: Content type of the media
+        """
         # Prepare form data
         data = aiohttp.FormData()
-        data.add_field('image', media_data,
+        data.add_field('image', content,
                        filename=filename,
                        content_type=mime_type)
 
@@ -252,33 +788,41 @@ class ComfyUIExecutor(ABC):
         async with self.get_comfyui_session() as session:
             async with session.post(upload_url, data=data) as response:
                 if response.status != 200:
-                    raise Exception(f"Upload media failed: HTTP {response.status}")
+                    raise self._status_error(response.status, f"Upload media failed: HTTP {response.status}")
 
                 # Get upload result
-                result = await response.json()
+                result = await response.json(loads=json_util.loads)
                 return result.get('name', '')
 
     async def _apply_params_to_workflow(self, workflow_data: Dict[str, Any], metadata: WorkflowMetadata, params: Dict[str, Any]) -> Dict[str, Any]:
         """Apply parameters to workflow using new parser"""
         workflow_data = copy.deepcopy(workflow_data)
 
-        # Iterate through all parameter mappings
+        # Collect the value of every parameter mapping
+        assignments = []
         for mapping in metadata.mapping_info.param_mappings:
             param_name = mapping.param_name
 
             # Check if parameter exists
             if param_name in params:
-                param_value = params[param_name]
-                await self._apply_param_mapping(workflow_data, mapping, param_value)
+                assignments.append((mapping, params[param_name]))
             else:
                 # Use default value (if exists)
                 if param_name in metadata.params:
                     param_info = metadata.params[param_name]
                     if param_info.default is not None:
-                        await self._apply_param_mapping(workflow_data, mapping, param_info.default)
+                        assignments.append((mapping, param_info.default))
                     elif param_info.required:
                         raise Exception(f"Required parameter '{param_name}' is missing")
 
+        # Upload all media inputs concurrently, then apply everything in order
+        uploads = await self._resolve_uploads(
+            [value for mapping, value in assignments if mapping.node_id in workflow_data and self._needs_upload(mapping)],
+            self._upload_media_source,
+        )
+        for mapping, value in assignments:
+            await self._apply_param_mapping(workflow_data, mapping, value, uploads)
+
         return workflow_data
 
     def _extract_output_nodes(self, metadata: WorkflowMetadata) -> Dict[str, str]:
@@ -291,9 +835,12 @@ class ComfyUIExecutor(ABC):
         return output_id_2_var
 
     def get_workflow_metadata(self, workflow_file: str) -> Optional[WorkflowMetadata]:
-        """Get workflow metadata (using new parser)"""
-        parser = WorkflowParser()
-        return parser.parse_workflow_file(workflow_file)
+        """Get workflow metadata (cached by file identity, do not mutate)"""
+        return get_workflow_cache().get_metadata(workflow_file)
+
+    def get_workflow_data(self, workflow_file: str) -> Dict[str, Any]:
+        """Get raw workflow JSON (cached by file identity, do not mutate)"""
+        return get_workflow_cache().get_workflow_data(workflow_file)
 
     def _split_media_by_suffix(self, node_output: Dict[str, Any], base_url: str) -> Tuple[List[str], List[str], List[str]]:
         """Split media by file extension into images/videos/audios"""
@@ -335,10 +882,3 @@ class ComfyUIExecutor(ABC):
             var_name = output_id_2_var.get(node_id, str(node_id))
             result[var_name] = media_data
         return result
-
-    def _extend_flat_list_from_dict(self, media_dict: Dict[str, List[str]]) -> List[str]:
-        """Flatten all lists in the dictionary into a single list"""
-        flat = []
-        for items in media_dict.values():
-            flat.extend(items)
-        return flat
@@ -0,0 +1,234 @@
+"""History poller - one background loop tracking every in-flight prompt of an executor"""
+
+import asyncio
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+
+from comfykit.logger import logger
+
+if TYPE_CHECKING:
+    from comfykit.comfyui.base_executor import ComfyUIExecutor
+
+
+class PromptNotFoundError(Exception):
+    """Prompt left the queue but never showed up in history (deleted, history cleared, server restarted)"""
+
+
+class HistoryPoller:
+    """Shared /queue + /history poller for HTTP executions
+
+    Instead of every execution polling /history/{prompt_id} on its own, each
+    tick does one GET /queue to see which tracked prompts are still queued or
+    running, and one GET /history?max_items=N for the prompts that left the
+    queue. Request volume is O(1) per tick regardless of the number of
+    in-flight prompts.
+
+    The tick adapts to the state of the tracked prompts:
+    - a tracked prompt is running: poll fast, around its expected completion
+      (based on observed run durations)
+    - all tracked prompts are waiting in the queue: back off with queue position
+
+    A prompt that left the queue but is not in the recent history batch is
+    looked up with GET /history/{prompt_id}, at most `max_lookups_per_tick`
+    per tick and with exponential backoff per prompt. After `max_misses`
+    lookups without finding it, its execution fails with PromptNotFoundError.
+
+    While /queue is unavailable, every tracked prompt is checked against the
+    history batch and looked up the same rate-limited way, but a prompt that
+    is not found may still be queued or running, so those lookups never fail
+    its execution.
+    """
+
+    def __init__(self, executor: "ComfyUIExecutor", min_interval: float = 0.25, max_interval: float = 5.0,
+                 max_lookups_per_tick: int = 4, max_misses: int = 10):
+        """Initialize history poller
+
+        Args:
+            executor: Executor used to issue /queue and /history requests
+            min_interval: Shortest delay between ticks (seconds)
+            max_interval: Longest delay between ticks (seconds)
+            max_lookups_per_tick: Most /history/{prompt_id} lookups of missing prompts per tick
+            max_misses: Lookups of a missing prompt before its execution fails
+        """
+        self._executor = executor
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_lookups_per_tick = max_lookups_per_tick
+        self.max_misses = max_misses
+        self._waiters: Dict[str, asyncio.Future] = {}
+        self._running_since: Dict[str, float] = {}
+        # Missing prompt -> (failed lookups, time of the next lookup)
+        self._misses: Dict[str, Tuple[int, float]] = {}
+        self._avg_run_duration: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self.request_count = 0
+
+    @property
+    def tracked_count(self) -> int:
+        return len(self._waiters)
+
+    async def wait_for(self, prompt_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Wait until the prompt shows up in /history and return its history entry
+
+        Raises:
+            asyncio.TimeoutError: If timeout is set and exceeded
+        """
+        future = self._waiters.get(prompt_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._waiters[prompt_id] = future
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        try:
+            if timeout is not None and timeout > 0:
+                return await asyncio.wait_for(future, timeout=timeout)
+            return await future
+        finally:
+            self._waiters.pop(prompt_id, None)
+            self._running_since.pop(prompt_id, None)
+            self._misses.pop(prompt_id, None)
+
+    async def _run(self):
+        """Poll until no prompt is tracked anymore"""
+        while self._waiters:
+            try:
+                interval = await self._tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"History polling failed: {e}")
+                interval = self.max_interval
+            await asyncio.sleep(interval)
+
+    def _resolve(self, prompt_id: str, prompt_history: Dict[str, Any]):
+        """Wake up the execution waiting for this prompt"""
+        future = self._waiters.get(prompt_id)
+        if future is not None and not future.done():
+            future.set_result(prompt_history)
+        self._misses.pop(prompt_id, None)
+
+        started = self._running_since.pop(prompt_id, None)
+        if started is not None:
+            # Track how long prompts run to predict when running prompts will finish
+            duration = time.monotonic() - started
+            if self._avg_run_duration is None:
+                self._avg_run_duration = duration
+            else:
+                self._avg_run_duration = 0.8 * self._avg_run_duration + 0.2 * duration
+
+    async def _tick(self) -> float:
+        """Check all tracked prompts once, return the delay until the next tick"""
+        tracked = [pid for pid, future in self._waiters.items() if not future.done()]
+        if not tracked:
+            return self.min_interval
+
+        self.request_count += 1
+        queue_data = await self._executor._get_queue()
+        if queue_data is None:
+            # /queue unavailable, fall back to checking history for every tracked prompt
+            await self._check_history(tracked, queue_known=False)
+            return self.max_interval
+
+        running_ids: Set[str] = {item[1] for item in queue_data.get("queue_running", []) if len(item) > 1}
+        pending = sorted(queue_data.get("queue_pending", []), key=lambda item: item[0])
+        pending_positions = {item[1]: position for position, item in enumerate(pending) if len(item) > 1}
+
+        now = time.monotonic()
+        finished = []
+        for pid in tracked:
+            if pid in running_ids:
+                self._running_since.setdefault(pid, now)
+            elif pid not in pending_positions:
+                finished.append(pid)
+
+        missing = await self._check_history(finished) if finished else []
+        return self._next_interval(tracked, running_ids, pending_positions, missing)
+
+    async def _check_history(self, prompt_ids: List[str], queue_known: bool = True) -> List[str]:
+        """Resolve prompts found in history, return the ones not found
+
+        Args:
+            prompt_ids: Prompts to check
+            queue_known: The prompts are known to have left the queue, so a failed
+                         lookup counts as a miss (see _miss)
+        """
+        # Other clients may finish prompts too, leave room for them in the batch
+        self.request_count += 1
+        history_data = await self._executor._get_history(max_items=len(prompt_ids) * 2 + 16) or {}
+
+        missing = []
+        lookups = 0
+        now = time.monotonic()
+        for pid in prompt_ids:
+            prompt_history = history_data.get(pid)
+            if prompt_history is None:
+                misses, next_lookup = self._misses.get(pid, (0, now))
+                if now < next_lookup or lookups >= self.max_lookups_per_tick:
+                    missing.append(pid)
+                    continue
+                # Pushed out of the recent batch (or not written yet), look it up directly
+                lookups += 1
+                self.request_count += 1
+                prompt_history = await self._executor._get_prompt_history(pid)
+                if prompt_history is None:
+                    if queue_known:
+                        self._miss(pid, misses + 1)
+                    else:
+                        # May still be queued or running, back off without counting a miss
+                        self._misses[pid] = (misses, now + self.max_interval)
+            if prompt_history is None:
+                missing.append(pid)
+            else:
+                self._resolve(pid, prompt_history)
+        return missing
+
+    def _miss(self, prompt_id: str, misses: int):
+        """Back off the lookups of a missing prompt, fail its execution after max_misses"""
+        if misses >= self.max_misses:
+            future = self._waiters.get(prompt_id)
+            if future is not None and not future.done():
+                future.set_exception(PromptNotFoundError(
+                    f"Prompt {prompt_id} left the queue but was not found in history after {misses} lookups"))
+            self._misses.pop(prompt_id, None)
+            return
+        delay = min(self.max_interval, self.min_interval * 2 ** misses)
+        self._misses[prompt_id] = (misses, time.monotonic() + delay)
+
+    def _next_interval(self, tracked: List[str], running_ids: Set[str], pending_positions: Dict[str, int], missing: List[str]) -> float:
+        """Pick the next tick delay from the state of tracked prompts"""
+        if missing:
+            # Left the queue but not in history yet, will show up any moment
+            # (their individual lookups are backed off, see _miss)
+            return self.min_interval
+
+        running = [pid for pid in tracked if pid in running_ids]
+        if running:
+            if self._avg_run_duration is None:
+                return self.min_interval
+            now = time.monotonic()
+            elapsed = max(now - self._running_since.get(pid, now) for pid in running)
+            remaining = self._avg_run_duration - elapsed
+            # Poll at half the expected remaining time, fast once it is due
+            return min(self.max_interval, max(self.min_interval, remaining / 2))
+
+        positions = [pending_positions[pid] for pid in tracked if pid in pending_positions]
+        if positions:
+            # Back off the further the first tracked prompt is from the head of the queue
+            return min(self.max_interval, self.min_interval * (1 + min(positions)))
+        return self.min_interval
+
+    async def close(self):
+        """Stop polling and cancel all waiters"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        for future in self._waiters.values():
+            if not future.done():
+                future.cancel()
+        self._waiters.clear()
+        self._running_since.clear()
+        self._misses.clear()
@@ -0,0 +1,301 @@
+"""Media handles - lazy, concurrent downloads of execution outputs"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, AsyncGenerator, AsyncIterator, List, Optional, Union
+from urllib.parse import parse_qs, urlparse
+
+import aiofiles
+import aiohttp
+
+from comfykit.logger import logger
+
+if TYPE_CHECKING:
+    from comfykit.comfyui.base_executor import ComfyUIExecutor
+
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+
+class MediaDownloader:
+    """Downloads output media of an executor
+
+    Requests to the executor's own server go through its pooled, authenticated
+    session. Other hosts (e.g. CDN URLs) use a separate plain session, so
+    credentials are never sent to them.
+
+    Prefetched media is streamed into a temporary directory in the background,
+    reads and saves of a prefetched URL then use the local file.
+    """
+
+    def __init__(self, executor: Optional["ComfyUIExecutor"] = None, max_concurrency: int = 8,
+                 max_prefetched: int = 256, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """Initialize downloader
+
+        Args:
+            executor: Executor whose session is used for its own server (None: plain sessions only)
+            max_concurrency: Maximum number of concurrent prefetch downloads
+            max_prefetched: Maximum number of prefetched files kept, oldest are dropped first
+            chunk_size: Read size when streaming responses
+        """
+        self._executor = executor
+        self.max_prefetched = max_prefetched
+        self.chunk_size = chunk_size
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._prefetched: "OrderedDict[str, asyncio.Future]" = OrderedDict()
+        self._temp_dir: Optional[str] = None
+        self._plain_session: Optional[aiohttp.ClientSession] = None
+
+    def _is_executor_url(self, url: str) -> bool:
+        if self._executor is None or not self._executor.base_url:
+            return False
+        return urlparse(url).netloc == urlparse(self._executor.base_url).netloc
+
+    @asynccontextmanager
+    async def _get_session(self, url: str) -> AsyncGenerator[aiohttp.ClientSession, None]:
+        """Get the session to download a URL with"""
+        if self._is_executor_url(url):
+            async with self._executor.get_comfyui_session() as session:
+                yield session
+        elif self._executor is not None:
+            if self._plain_session is None or self._plain_session.closed:
+                self._plain_session = aiohttp.ClientSession()
+            yield self._plain_session
+        else:
+            # Detached downloader (result not produced by an executor), no session to reuse
+            async with aiohttp.ClientSession() as session:
+                yield session
+
+    @asynccontextmanager
+    async def open(self, url: str, offset: int = 0) -> AsyncGenerator[aiohttp.ClientResponse, None]:
+        """Request a URL, from `offset` on if given
+
+        The response status tells whether the range was honoured: 206 (partial),
+        200 (whole file) or 416 (offset is at/after the end of the file).
+        """
+        headers = {"Range": f"bytes={offset}-"} if offset else None
+        async with self._get_session(url) as session:
+            async with session.get(url, headers=headers) as response:
+                if response.status == 416 and offset:
+                    yield response
+                    return
+                if response.status not in (200, 206):
+                    if self._executor is not None and self._is_executor_url(url):
+                        self._executor._check_auth_status(response.status)
+                    raise Exception(f"Download media failed: [{response.status}] {url}")
+                yield response
+
+    async def iter_chunks(self, url: str, chunk_size: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Stream the content of a URL"""
+        async with self.open(url) as response:
+            async for chunk in response.content.iter_chunked(chunk_size or self.chunk_size):
+                yield chunk
+
+    async def download_to(self, url: str, path: Union[str, Path], resume: bool = True) -> Path:
+        """Stream a URL to a file
+
+        The content is written to `<path>.part` first and renamed when complete.
+        A `.part` file left by an interrupted download is resumed with a Range
+        request (restarted if the server ignores the range).
+        """
+        path = Path(path)
+        part_path = path.with_name(path.name + ".part")
+        offset = part_path.stat().st_size if resume and part_path.exists() else 0
+
+        async with self.open(url, offset) as response:
+            if response.status != 416:
+                if offset and response.status == 206:
+                    logger.debug(f"Resume download from byte {offset}: {url}")
+                mode = "ab" if response.status == 206 else "wb"
+                async with aiofiles.open(part_path, mode) as f:
+                    async for chunk in response.content.iter_chunked(self.chunk_size):
+                        await f.write(chunk)
+
+        os.replace(part_path, path)
+        return path
+
+    def prefetch(self, url: str):
+        """Start downloading a URL in the background (no-op if already started)"""
+        if url in self._prefetched:
+            return
+        self._prefetched[url] = asyncio.create_task(self._prefetch(url))
+        self._trim_prefetched()
+
+    def use_local_file(self, url: str, path: Union[str, Path]):
+        """Serve reads and saves of a URL from a local copy (e.g. media stored with a cached result)
+
+        The file is not owned by the downloader, it is never removed by it.
+        No-op if the URL is already prefetched.
+        """
+        if url in self._prefetched:
+            return
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(Path(path))
+        self._prefetched[url] = future
+        self._trim_prefetched()
+
+    def _trim_prefetched(self):
+        """Keep the prefetch directory bounded, drop the oldest entries"""
+        while len(self._prefetched) > self.max_prefetched:
+            _, task = self._prefetched.popitem(last=False)
+            task.cancel()
+            task.add_done_callback(self._remove_prefetched_file)
+
+    async def _prefetch(self, url: str) -> Path:
+        if self._temp_dir is None:
+            self._temp_dir = tempfile.mkdtemp(prefix="comfykit_media_")
+        suffix = os.path.splitext(media_filename(url))[1]
+        path = Path(self._temp_dir) / (hashlib.sha1(url.encode()).hexdigest() + suffix)
+        async with self._semaphore:
+            return await self.download_to(url, path)
+
+    def _remove_prefetched_file(self, task: asyncio.Future):
+        if task.cancelled() or task.exception() is not None:
+            return
+        if self._temp_dir is None or task.result().parent != Path(self._temp_dir):
+            # Local file registered with use_local_file()
+            return
+        try:
+            os.remove(task.result())
+        except OSError:
+            pass
+
+    async def get_prefetched(self, url: str) -> Optional[Path]:
+        """Wait for the prefetch of a URL, None if it was not prefetched or failed"""
+        task = self._prefetched.get(url)
+        if task is None:
+            return None
+        try:
+            path = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if task.cancelled():
+                return None
+            raise
+        except Exception as e:
+            logger.warning(f"Prefetch media failed, downloading again: {e}")
+            self._prefetched.pop(url, None)
+            return None
+        return path if path.exists() else None
+
+    async def close(self):
+        """Cancel prefetches, remove prefetched files and close the plain session"""
+        for task in self._prefetched.values():
+            task.cancel()
+        if self._prefetched:
+            await asyncio.gather(*self._prefetched.values(), return_exceptions=True)
+        self._prefetched.clear()
+        if self._temp_dir is not None:
+            shutil.rmtree(self._temp_dir, ignore_errors=True)
+            self._temp_dir = None
+        if self._plain_session is not None and not self._plain_session.closed:
+            await self._plain_session.close()
+        self._plain_session = None
+
+
+def media_filename(url: str) -> str:
+    """Get the file name of a media URL (ComfyUI /view?filename=... or URL path)"""
+    parsed = urlparse(url)
+    filename = parse_qs(parsed.query).get("filename")
+    if filename:
+        return os.path.basename(filename[0])
+    return os.path.basename(parsed.path) or hashlib.sha1(url.encode()).hexdigest()
+
+
+class MediaRef:
+    """Lazy handle of one output file of an execution
+
+    Nothing is downloaded until read(), stream() or save() is called (or the
+    executor prefetched it).
+    """
+
+    def __init__(self, url: str, kind: str, var: Optional[str] = None, downloader: Optional[MediaDownloader] = None):
+        """Initialize media handle
+
+        Args:
+            url: Media URL
+            kind: "image", "video" or "audio"
+            var: Output variable name the media belongs to
+            downloader: Downloader of the executor that produced it (None: standalone requests)
+        """
+        self.url = url
+        self.kind = kind
+        self.var = var
+        self._downloader = downloader or MediaDownloader()
+
+    @property
+    def filename(self) -> str:
+        return media_filename(self.url)
+
+    def __repr__(self) -> str:
+        return f"MediaRef(kind={self.kind!r}, var={self.var!r}, filename={self.filename!r})"
+
+    def prefetch(self):
+        """Start downloading in the background"""
+        self._downloader.prefetch(self.url)
+
+    async def read(self) -> bytes:
+        """Download the whole content into memory"""
+        path = await self._downloader.get_prefetched(self.url)
+        if path is not None:
+            async with aiofiles.open(path, "rb") as f:
+                return await f.read()
+        async with self._downloader.open(self.url) as response:
+            return await response.read()
+
+    async def stream(self, chunk_size: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Iterate over the content in chunks without buffering it all"""
+        chunk_size = chunk_size or self._downloader.chunk_size
+        path = await self._downloader.get_prefetched(self.url)
+        if path is not None:
+            async with aiofiles.open(path, "rb") as f:
+                while chunk := await f.read(chunk_size):
+                    yield chunk
+            return
+        async for chunk in self._downloader.iter_chunks(self.url, chunk_size):
+            yield chunk
+
+    async def save(self, directory: Union[str, Path] = ".", filename: Optional[str] = None, resume: bool = True) -> Path:
+        """Save to a directory, streaming to disk
+
+        Args:
+            directory: Target directory (created if missing)
+            filename: Target file name (default: the original file name)
+            resume: Resume an interrupted download of the same target with a Range request
+
+        Returns:
+            Path of the saved file
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / (filename or self.filename)
+
+        prefetched = await self._downloader.get_prefetched(self.url)
+        if prefetched is not None:
+            await asyncio.to_thread(shutil.copyfile, prefetched, path)
+            return path
+        return await self._downloader.download_to(self.url, path, resume=resume)
+
+
+async def save_all(media: List[MediaRef], directory: Union[str, Path] = ".", concurrency: int = 4) -> List[Path]:
+    """Save media handles concurrently
+
+    Args:
+        media: Media handles to save
+        directory: Target directory
+        concurrency: Maximum number of concurrent downloads
+
+    Returns:
+        Saved paths, in the order of `media`
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def save_one(ref: MediaRef) -> Path:
+        async with semaphore:
+            return await ref.save(directory)
+
+    return list(await asyncio.gather(*(save_one(ref) for ref in media)))
@@ -1,21 +1,242 @@
-from typing import Any, Dict, List, Optional
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Literal, Optional, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, computed_field, model_validator
+
+if TYPE_CHECKING:
+    from comfykit.comfyui.media import MediaRef
+
+
+# Flat output lists of ExecuteResult, built from the <kind>_by_var dicts
+FLAT_OUTPUT_FIELDS = ("images", "audios", "videos", "texts")
+FLAT_OUTPUT_DESCRIPTIONS = {
+    "images": "List of image URLs",
+    "audios": "List of audio URLs",
+    "videos": "List of video URLs",
+    "texts": "List of texts",
+}
+# <kind>_by_var field -> private attribute holding its flat list
+_FLAT_OUTPUT_ATTRS = {f"{name}_by_var": f"_{name}" for name in FLAT_OUTPUT_FIELDS}
+
+
+def _flatten(by_var: Dict[str, List[str]]) -> List[str]:
+    flat = []
+    for items in by_var.values():
+        flat.extend(items)
+    return flat
+
+
+def _add_flat_outputs_to_schema(schema: Dict[str, Any]):
+    """List the flat outputs in the validation schema too (the constructor accepts them)"""
+    properties = schema.setdefault("properties", {})
+    for name in FLAT_OUTPUT_FIELDS:
+        properties.setdefault(name, {
+            "description": FLAT_OUTPUT_DESCRIPTIONS[name],
+            "items": {"type": "string"},
+            "title": name.capitalize(),
+            "type": "array",
+        })
 
 
 class ExecuteResult(BaseModel):
-    """Execution result model"""
+    """Execution result model
+
+    Outputs are stored once, grouped by variable name (images_by_var...).
+    images, audios, videos and texts are built from them on first access (all
+    variables in order) and kept, so they can be modified like lists. They are
+    accepted by the constructor and included when serializing. Assigning a
+    <kind>_by_var dict rebuilds its flat list on the next access. Raw outputs
+    are only kept when the executor was created with keep_outputs=True.
+    """
+    model_config = ConfigDict(json_schema_extra=_add_flat_outputs_to_schema)
+
     status: str = Field(description="Execution status")
     prompt_id: Optional[str] = Field(None, description="Prompt ID")
     duration: Optional[float] = Field(None, description="Execution duration (in seconds)")
-    images: List[str] = Field(default_factory=list, description="List of image URLs")
     images_by_var: Dict[str, List[str]] = Field(default_factory=dict, description="Images grouped by variable name")
-    audios: List[str] = Field(default_factory=list, description="List of audio URLs")
     audios_by_var: Dict[str, List[str]] = Field(default_factory=dict, description="Audios grouped by variable name")
-    videos: List[str] = Field(default_factory=list, description="List of video URLs")
     videos_by_var: Dict[str, List[str]] = Field(default_factory=dict, description="Videos grouped by variable name")
-    texts: List[str] = Field(default_factory=list, description="List of texts")
     texts_by_var: Dict[str, List[str]] = Field(default_factory=dict, description="Texts grouped by variable name")
-    outputs: Optional[Dict[str, Any]] = Field(None, description="Raw outputs")
+    outputs: Optional[Dict[str, Any]] = Field(None, description="Raw outputs (only with keep_outputs)")
     msg: Optional[str] = Field(None, description="Message")
+    server_url: Optional[str] = Field(None, description="ComfyUI server that executed the workflow (pool execution)")
+    index: Optional[int] = Field(None, description="Position of the params in an execute_many batch")
+    cached: bool = Field(False, description="Result reused from the result cache, the workflow was not run again")
+
+    # Downloader of the executor that produced the result (pooled session, prefetched files)
+    _media_downloader: Any = PrivateAttr(default=None)
+    # Flat lists, None until built or assigned
+    _images: Optional[List[str]] = PrivateAttr(default=None)
+    _audios: Optional[List[str]] = PrivateAttr(default=None)
+    _videos: Optional[List[str]] = PrivateAttr(default=None)
+    _texts: Optional[List[str]] = PrivateAttr(default=None)
+
+    @model_validator(mode="wrap")
+    @classmethod
+    def _split_flat_outputs(cls, data: Any, handler):
+        """Accept the flat lists as input, they are only stored if they add something"""
+        flat = None
+        if isinstance(data, dict) and any(name in data for name in FLAT_OUTPUT_FIELDS):
+            flat = {name: data[name] for name in FLAT_OUTPUT_FIELDS if data.get(name) is not None}
+            data = {key: value for key, value in data.items() if key not in FLAT_OUTPUT_FIELDS}
+        result = handler(data)
+        if flat:
+            for name, items in flat.items():
+                items = [str(item) for item in items]
+                if items != _flatten(getattr(result, f"{name}_by_var")):
+                    setattr(result, name, items)
+        return result
+
+    def __setattr__(self, name: str, value: Any):
+        super().__setattr__(name, value)
+        attr = _FLAT_OUTPUT_ATTRS.get(name)
+        if attr is not None:
+            self.__pydantic_private__[attr] = None
+
+    def _get_flat(self, attr: str, by_var: Dict[str, List[str]]) -> List[str]:
+        # Read from __pydantic_private__ directly, private attribute lookup is slow
+        private = self.__pydantic_private__
+        items = private[attr]
+        if items is None:
+            items = private[attr] = _flatten(by_var)
+        return items
+
+    def _set_flat(self, attr: str, items: List[str]):
+        self.__pydantic_private__[attr] = [str(item) for item in items]
+
+    @computed_field(description=FLAT_OUTPUT_DESCRIPTIONS["images"])
+    @property
+    def images(self) -> List[str]:
+        return self._get_flat("_images", self.images_by_var)
+
+    @images.setter
+    def images(self, items: List[str]):
+        self._set_flat("_images", items)
+
+    @computed_field(description=FLAT_OUTPUT_DESCRIPTIONS["audios"])
+    @property
+    def audios(self) -> List[str]:
+        return self._get_flat("_audios", self.audios_by_var)
+
+    @audios.setter
+    def audios(self, items: List[str]):
+        self._set_flat("_audios", items)
+
+    @computed_field(description=FLAT_OUTPUT_DESCRIPTIONS["videos"])
+    @property
+    def videos(self) -> List[str]:
+        return self._get_flat("_videos", self.videos_by_var)
+
+    @videos.setter
+    def videos(self, items: List[str]):
+        self._set_flat("_videos", items)
+
+    @computed_field(description=FLAT_OUTPUT_DESCRIPTIONS["texts"])
+    @property
+    def texts(self) -> List[str]:
+        return self._get_flat("_texts", self.texts_by_var)
+
+    @texts.setter
+    def texts(self, items: List[str]):
+        self._set_flat("_texts", items)
+
+    def media(self, var: Optional[str] = None) -> List["MediaRef"]:
+        """Get lazy download handles of the output images, videos and audios
+
+        Args:
+            var: Only media of this output variable (default: all)
+        """
+        from comfykit.comfyui.media import MediaRef
+
+        refs = []
+        for kind, by_var, flat in (
+            ("image", self.images_by_var, self.images),
+            ("video", self.videos_by_var, self.videos),
+            ("audio", self.audios_by_var, self.audios),
+        ):
+            if by_var:
+                for var_name, urls in by_var.items():
+                    if var is None or var_name == var:
+                        refs.extend(MediaRef(url, kind, var_name, self._media_downloader) for url in urls)
+            elif var is None:
+                refs.extend(MediaRef(url, kind, None, self._media_downloader) for url in flat)
+        return refs
+
+    async def save_all(self, directory: Union[str, Path] = ".", concurrency: int = 4) -> List[Path]:
+        """Download all output media concurrently into a directory
+
+        Args:
+            directory: Target directory (created if missing)
+            concurrency: Maximum number of concurrent downloads
+
+        Returns:
+            Saved paths, in the order of media()
+        """
+        from comfykit.comfyui.media import save_all
+
+        return await save_all(self.media(), directory, concurrency)
+
+
+class ExecutionEvent(BaseModel):
+    """Base model of events yielded by ComfyKit.stream()"""
+    type: str = Field(description="Event type")
+    prompt_id: Optional[str] = Field(None, description="Prompt ID")
+
+
+class QueuedEvent(ExecutionEvent):
+    """Workflow was accepted by ComfyUI and queued"""
+    type: Literal["queued"] = "queued"
+
+
+class NodeStartedEvent(ExecutionEvent):
+    """A node started executing"""
+    type: Literal["node_started"] = "node_started"
+    node: str = Field(description="Node ID")
+
+
+class ProgressEvent(ExecutionEvent):
+    """Step progress of the executing node (e.g. sampler steps)"""
+    type: Literal["progress"] = "progress"
+    node: Optional[str] = Field(None, description="Node ID")
+    value: int = Field(description="Current step")
+    max: int = Field(description="Total steps")
+
+
+class PreviewEvent(ExecutionEvent):
+    """Latent preview image sent while a node (usually a sampler) runs
+
+    Only yielded when previews are requested. `image` is a memoryview into the
+    received WebSocket frame (no copy), use bytes(event.image) to keep it.
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    type: Literal["preview"] = "preview"
+    node: Optional[str] = Field(None, description="Node ID, if reported by ComfyUI")
+    mime_type: str = Field(description="Image MIME type (e.g. image/jpeg)")
+    image: memoryview = Field(description="Encoded preview image")
+
+
+class CachedEvent(ExecutionEvent):
+    """Nodes skipped because their outputs were cached"""
+    type: Literal["cached"] = "cached"
+    nodes: List[str] = Field(default_factory=list, description="Cached node IDs")
+
+
+class NodeOutputEvent(ExecutionEvent):
+    """A node finished and its outputs are ready"""
+    type: Literal["node_output"] = "node_output"
+    node: str = Field(description="Node ID")
+    var: Optional[str] = Field(None, description="Output variable name of the node, if any")
+    images: List[str] = Field(default_factory=list, description="List of image URLs")
+    videos: List[str] = Field(default_factory=list, description="List of video URLs")
+    audios: List[str] = Field(default_factory=list, description="List of audio URLs")
+    texts: List[str] = Field(default_factory=list, description="List of texts")
+
+
+class CompletedEvent(ExecutionEvent):
+    """Execution finished (successfully or not), always the last event"""
+    type: Literal["completed"] = "completed"
+    result: ExecuteResult = Field(description="Final execution result")
+
 
+StreamEvent = Union[QueuedEvent, NodeStartedEvent, ProgressEvent, PreviewEvent, CachedEvent, NodeOutputEvent, CompletedEvent]
@@ -0,0 +1,268 @@
+"""Pool executor - route executions across several ComfyUI servers"""
+
+import asyncio
+import time
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional
+
+import aiohttp
+
+from comfykit.comfyui.base_executor import ComfyUIExecutor, PreparedPrompt
+from comfykit.comfyui.http_executor import HttpExecutor
+from comfykit.comfyui.models import CompletedEvent, ExecuteResult, StreamEvent
+from comfykit.comfyui.websocket_executor import WebSocketExecutor
+from comfykit.logger import logger
+
+
+@dataclass
+class PoolMember:
+    """Routing state of one ComfyUI server in the pool"""
+    executor: ComfyUIExecutor
+    queue_depth: int = 0  # running + pending prompts at the last sample
+    dispatched_since_sample: int = 0  # executions routed here after the last sample
+    in_flight: int = 0  # executions of this pool currently on the server
+    latency: Optional[float] = None  # EWMA of /queue response time (seconds)
+    sampled_at: float = 0.0
+    consecutive_failures: int = 0
+    ejected_until: float = 0.0
+    sampling: Optional[asyncio.Task] = None
+
+    @property
+    def base_url(self) -> str:
+        return self.executor.base_url
+
+    @property
+    def load(self) -> int:
+        """Estimated queue length, including executions routed since the last sample
+
+        Executions of this pool still preparing (uploading media) are not in
+        /queue yet, so a fresh sample can't see them: in_flight is a lower bound.
+        """
+        return max(self.queue_depth + self.dispatched_since_sample, self.in_flight)
+
+
+class ComfyUIPoolExecutor(ComfyUIExecutor):
+    """Execute workflows on a fleet of ComfyUI servers
+
+    Each execution is routed to the healthy server with the shortest queue
+    (sampled from /queue, plus executions routed there since the sample, and
+    at least the executions of this pool in flight there), then the lowest
+    recent /queue latency. Servers failing several samples in a row
+    are ejected for a while and probed again afterwards.
+
+    Media uploads are done on the selected server, so routing happens when a
+    workflow is prepared. Results record the serving server in `server_url`.
+    """
+
+    def __init__(
+        self,
+        base_urls: List[str],
+        executor_type: Literal["http", "websocket"] = "http",
+        api_key: str = None,
+        cookies: str = None,
+        sample_interval: float = 1.0,
+        max_failures: int = 3,
+        eject_duration: float = 30.0,
+        **kwargs,
+    ):
+        """Initialize pool executor
+
+        Args:
+            base_urls: ComfyUI base URLs of all servers in the pool
+            executor_type: Executor used for each server ("http" or "websocket")
+            api_key: API key for authentication (optional)
+            cookies: Cookies for authentication (optional)
+            sample_interval: Seconds a /queue sample is considered fresh
+            max_failures: Consecutive failed samples before a server is ejected
+            eject_duration: Seconds an ejected server is skipped before probing it again
+            **kwargs: Other executor options (connection limits, cookies_ttl, ...)
+        """
+        if not base_urls:
+            raise ValueError("ComfyUI pool requires at least one base URL")
+        super().__init__(base_urls[0], api_key, cookies, **kwargs)
+        executor_class = WebSocketExecutor if executor_type == "websocket" else HttpExecutor
+        self.members = [
+            PoolMember(executor=executor_class(url, api_key, cookies, **kwargs))
+            for url in base_urls
+        ]
+        self.sample_interval = sample_interval
+        self.max_failures = max_failures
+        self.eject_duration = eject_duration
+
+    def _get_member(self, server_url: str) -> PoolMember:
+        for member in self.members:
+            if member.base_url == server_url:
+                return member
+        raise Exception(f"Server is not part of the pool: {server_url}")
+
+    def _is_healthy(self, member: PoolMember, now: float) -> bool:
+        return member.ejected_until <= now
+
+    def _record_failure(self, member: PoolMember, error: Any):
+        """Count a failure, ejecting the server once it failed too often in a row"""
+        member.consecutive_failures += 1
+        if member.consecutive_failures >= self.max_failures and member.ejected_until <= time.monotonic():
+            member.ejected_until = time.monotonic() + self.eject_duration
+            logger.warning(f"Ejected ComfyUI server {member.base_url} for {self.eject_duration}s: {error}")
+
+    def _record_success(self, member: PoolMember):
+        if member.consecutive_failures or member.ejected_until:
+            logger.info(f"ComfyUI server {member.base_url} is healthy again")
+        member.consecutive_failures = 0
+        member.ejected_until = 0.0
+
+    async def _sample(self, member: PoolMember):
+        """Sample queue depth and latency of a server"""
+        started = time.monotonic()
+        try:
+            queue_data = await member.executor._get_queue()
+            if queue_data is None:
+                raise Exception("GET /queue failed")
+        except Exception as e:
+            self._record_failure(member, e)
+            member.sampled_at = time.monotonic()
+            return
+
+        latency = time.monotonic() - started
+        member.latency = latency if member.latency is None else 0.7 * member.latency + 0.3 * latency
+        member.queue_depth = len(queue_data.get("queue_running", [])) + len(queue_data.get("queue_pending", []))
+        member.dispatched_since_sample = 0
+        member.sampled_at = time.monotonic()
+        self._record_success(member)
+
+    async def _refresh_samples(self):
+        """Re-sample stale members (including ejected ones that are due for a probe)"""
+        now = time.monotonic()
+        pending = []
+        for member in self.members:
+            if not self._is_healthy(member, now) or now - member.sampled_at < self.sample_interval:
+                continue
+            # Share one in-progress sample between concurrent selections
+            if member.sampling is None or member.sampling.done():
+                member.sampling = asyncio.create_task(self._sample(member))
+            pending.append(member.sampling)
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _select_member(self) -> PoolMember:
+        """Pick the healthy server with the shortest queue, then the lowest latency
+
+        Servers whose last request failed (but are not ejected yet) are only
+        used when no other server is available.
+        """
+        await self._refresh_samples()
+        now = time.monotonic()
+        candidates = [member for member in self.members if self._is_healthy(member, now)]
+        if not candidates:
+            # Everything is ejected, try the one coming back first rather than failing outright
+            candidates = [min(self.members, key=lambda member: member.ejected_until)]
+        member = min(
+            candidates,
+            key=lambda member: (member.consecutive_failures > 0, member.load, member.latency if member.latency is not None else float("inf")),
+        )
+        member.dispatched_since_sample += 1
+        return member
+
+    async def prepare_workflow(self, workflow_file: str, params: Dict[str, Any] = None) -> PreparedPrompt:
+        """Select a server and prepare the workflow on it (media is uploaded to that server)"""
+        member = await self._select_member()
+        member.in_flight += 1
+        try:
+            prepared = await member.executor.prepare_workflow(workflow_file, params)
+        except aiohttp.ClientConnectionError as e:
+            member.in_flight -= 1
+            self._record_failure(member, e)
+            raise
+        except Exception:
+            member.in_flight -= 1
+            raise
+        prepared.server_url = member.base_url
+        logger.info(f"Routed execution to ComfyUI server {member.base_url} (queue: {member.load}, in flight: {member.in_flight})")
+        return prepared
+
+    async def execute_prepared(self, prepared: PreparedPrompt) -> ExecuteResult:
+        """Execute a prepared workflow on the server it was prepared for"""
+        member = self._get_member(prepared.server_url)
+        try:
+            result = await member.executor.execute_prepared(prepared)
+        finally:
+            member.in_flight -= 1
+        self._record_result(member, result)
+        return result
+
+    async def stream_prepared(self, prepared: PreparedPrompt, previews: bool = False) -> AsyncIterator[StreamEvent]:
+        """Execute a prepared workflow on the server it was prepared for, yielding its events"""
+        member = self._get_member(prepared.server_url)
+        finished = False
+        try:
+            async with aclosing(member.executor.stream_prepared(prepared, previews=previews)) as events:
+                async for event in events:
+                    if isinstance(event, CompletedEvent):
+                        member.in_flight -= 1
+                        finished = True
+                        self._record_result(member, event.result)
+                    yield event
+        finally:
+            if not finished:
+                member.in_flight -= 1
+
+    def _record_result(self, member: PoolMember, result: ExecuteResult):
+        """Update server health from an execution result and tag it with the server"""
+        if result.status == "error" and not result.prompt_id:
+            # Never got a prompt ID: the server did not accept the submission
+            self._record_failure(member, result.msg)
+        elif result.prompt_id:
+            self._record_success(member)
+        result.server_url = member.base_url
+
+    async def execute_workflow(self, workflow_file: str, params: Dict[str, Any] = None) -> ExecuteResult:
+        """Execute workflow on the least loaded server of the pool"""
+        try:
+            try:
+                prepared = await self.prepare_workflow(workflow_file, params)
+            except Exception as e:
+                logger.error(f"Prepare workflow failed: {str(e)}")
+                return ExecuteResult(status="error", msg=str(e))
+
+            return await self.execute_prepared(prepared)
+
+        except Exception as e:
+            logger.error(f"Execute workflow failed: {str(e)}", exc_info=True)
+            return ExecuteResult(status="error", msg=str(e))
+
+    async def stream_workflow(self, workflow_file: str, params: Dict[str, Any] = None, previews: bool = False) -> AsyncIterator[StreamEvent]:
+        """Execute workflow on the least loaded server of the pool, yielding its events"""
+        try:
+            prepared = await self.prepare_workflow(workflow_file, params)
+        except Exception as e:
+            logger.error(f"Prepare workflow failed: {str(e)}")
+            yield CompletedEvent(result=ExecuteResult(status="error", msg=str(e)))
+            return
+
+        async with aclosing(self.stream_prepared(prepared, previews=previews)) as events:
+            async for event in events:
+                yield event
+
+    def get_pool_stats(self) -> List[Dict[str, Any]]:
+        """Get routing state of every server in the pool"""
+        now = time.monotonic()
+        return [
+            {
+                "url": member.base_url,
+                "healthy": self._is_healthy(member, now),
+                "queue_depth": member.queue_depth,
+                "in_flight": member.in_flight,
+                "latency": member.latency,
+                "consecutive_failures": member.consecutive_failures,
+            }
+            for member in self.members
+        ]
+
+    async def close(self):
+        """Close all member executors"""
+        for member in self.members:
+            if member.sampling is not None and not member.sampling.done():
+                member.sampling.cancel()
+            await member.executor.close()
+        await super().close()
@@ -0,0 +1,333 @@
+"""Result cache - reuse results of executions that were already run with the same prompt"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from comfykit.comfyui.media import media_filename
+from comfykit.comfyui.models import ExecuteResult
+from comfykit.logger import logger
+from comfykit.utils import json_util
+from comfykit.utils.os_util import get_cache_path
+
+if TYPE_CHECKING:
+    from comfykit.comfyui.media import MediaDownloader
+
+# Other processes share the disk tier, a scan every so often counts their entries too
+DISK_RESCAN_INTERVAL = 600.0
+# Eviction frees the disk tier down to this fraction of max_disk_bytes, so a full
+# cache is not scanned again on every put
+DISK_EVICTION_TARGET = 0.9
+
+
+@dataclass
+class CachedResult:
+    """Cached execution result and the local copies of its media (URL -> path)"""
+    result: ExecuteResult
+    stored_at: float
+    media: Dict[str, str] = field(default_factory=dict)
+
+
+class ResultCache:
+    """Two-tier cache of completed execution results
+
+    Keys are the hash of the final submitted prompt (parameters applied, media
+    uploaded) and the target it was submitted to, so only exact repeats hit.
+    Executions with randomized seeds are never cached by the executors.
+
+    Entries are kept in memory (LRU, max_entries) and, unless max_disk_bytes
+    is 0, as JSON files under the cache directory shared by all processes
+    (least recently used first beyond max_disk_bytes). The size of the disk
+    tier is tracked in memory, the directory is only scanned once at first,
+    when the limit is exceeded and every DISK_RESCAN_INTERVAL seconds. Both
+    tiers expire entries after `ttl` seconds.
+
+    With store_media=True the output media is downloaded next to the entry,
+    so cache hits still read/save media after the server dropped its outputs.
+    """
+
+    def __init__(self, ttl: Optional[float] = 86400.0, max_entries: int = 256,
+                 max_disk_bytes: int = 1024 * 1024 * 1024, store_media: bool = False,
+                 disk_dir: Optional[str] = None):
+        """Initialize result cache
+
+        Args:
+            ttl: Seconds a result is reused (None: until evicted)
+            max_entries: Maximum number of results kept in memory
+            max_disk_bytes: Size limit of the disk tier, media included (0: memory only)
+            store_media: Also keep a local copy of the output media
+            disk_dir: Directory of the disk tier (default: <cache dir>/results)
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.store_media = store_media
+        self.disk_dir = disk_dir or get_cache_path("results")
+        self._entries: "OrderedDict[str, CachedResult]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Size of the disk tier, None until the directory was scanned
+        self._disk_bytes: Optional[int] = None
+        self._disk_scanned_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(target: str, prompt: Any) -> str:
+        """Hash a submitted prompt canonically (key order and whitespace do not matter)
+
+        Args:
+            target: Where the prompt is submitted (server / account), uploaded
+                   file names are only meaningful there
+            prompt: JSON-serializable prompt
+        """
+        canonical = json_util.dumpb({"target": target, "prompt": prompt}, sort_keys=True, default=str)
+        return hashlib.sha256(canonical).hexdigest()
+
+    @property
+    def disk(self) -> bool:
+        return self.max_disk_bytes > 0
+
+    def _is_fresh(self, entry: CachedResult) -> bool:
+        return self.ttl is None or time.time() - entry.stored_at < self.ttl
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key + ".json")
+
+    def _media_dir(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key)
+
+    def _store(self, key: str, entry: CachedResult):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _load_from_disk(self, key: str) -> Optional[CachedResult]:
+        path = self._entry_path(key)
+        try:
+            stored = json_util.load_file(path)
+            entry = CachedResult(
+                result=ExecuteResult.model_validate(stored["result"]),
+                stored_at=stored["stored_at"],
+                media={url: os.path.join(self._media_dir(key), name) for url, name in stored.get("media", {}).items()},
+            )
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable cached result {key}: {e}")
+            return None
+        if not self._is_fresh(entry):
+            self._discard_from_disk(key)
+            return None
+        # Mark as recently used for disk eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def _save_to_disk(self, key: str, entry: CachedResult):
+        path = self._entry_path(key)
+        try:
+            replaced_size = os.path.getsize(path)
+        except OSError:
+            replaced_size = 0
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            stored = {
+                "stored_at": entry.stored_at,
+                "result": entry.result.model_dump(mode="json"),
+                "media": {url: os.path.basename(media_path) for url, media_path in entry.media.items()},
+            }
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            json_util.dump_file(stored, temp_path)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to store result {key} on disk: {e}")
+            return
+
+        size = self._file_size(path) + sum(self._file_size(media_path) for media_path in entry.media.values())
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += size - replaced_size
+            scan = (self._disk_bytes is None or self._disk_bytes > self.max_disk_bytes
+                    or time.monotonic() - self._disk_scanned_at >= DISK_RESCAN_INTERVAL)
+        if scan:
+            self._evict_disk()
+
+    @staticmethod
+    def _file_size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def _entry_disk_size(self, key: str) -> int:
+        """Size of an entry on disk, media included"""
+        size = self._file_size(self._entry_path(key))
+        try:
+            size += sum(media.stat().st_size for media in os.scandir(self._media_dir(key)) if media.is_file())
+        except OSError:
+            pass
+        return size
+
+    def _remove_from_disk(self, key: str):
+        try:
+            os.remove(self._entry_path(key))
+        except OSError:
+            pass
+        shutil.rmtree(self._media_dir(key), ignore_errors=True)
+
+    def _discard_from_disk(self, key: str):
+        """Remove an entry from disk and from the tracked size"""
+        size = self._entry_disk_size(key)
+        self._remove_from_disk(key)
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes = max(0, self._disk_bytes - size)
+
+    def _evict_disk(self):
+        """Scan the disk tier, if beyond max_disk_bytes remove the least recently used entries
+
+        Expired entries are removed when read, or evicted like the others.
+        The scan also resets the tracked size of the disk tier.
+        """
+        entries = []
+        total = 0
+        try:
+            for item in os.scandir(self.disk_dir):
+                if not item.name.endswith(".json") or not item.is_file():
+                    continue
+                key = item.name[:-len(".json")]
+                stat = item.stat()
+                size = stat.st_size
+                media_dir = self._media_dir(key)
+                if os.path.isdir(media_dir):
+                    size += sum(media.stat().st_size for media in os.scandir(media_dir) if media.is_file())
+                entries.append((stat.st_mtime, key, size))
+                total += size
+        except OSError as e:
+            logger.warning(f"Result cache eviction failed: {e}")
+            return
+
+        if total > self.max_disk_bytes:
+            entries.sort()
+            for _, key, size in entries:
+                if total <= self.max_disk_bytes * DISK_EVICTION_TARGET:
+                    break
+                self._remove_from_disk(key)
+                total -= size
+
+        with self._lock:
+            self._disk_bytes = total
+            self._disk_scanned_at = time.monotonic()
+
+    async def get(self, key: str) -> Optional[CachedResult]:
+        """Get a cached result, None if unknown or expired
+
+        Returns:
+            Cached entry (shared, copy the result before changing it)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._is_fresh(entry):
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is None and self.disk:
+            entry = await asyncio.to_thread(self._load_from_disk, key)
+            if entry is not None:
+                self._store(key, entry)
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    async def put(self, key: str, result: ExecuteResult, downloader: Optional["MediaDownloader"] = None):
+        """Remember a completed result
+
+        Args:
+            key: Cache key (see make_key)
+            result: Completed execution result
+            downloader: Downloader of the executor, used to copy the media if store_media is set
+        """
+        # Rebuilt from the fields only, the copy must not keep the executor's downloader
+        entry = CachedResult(result=ExecuteResult.model_validate(result.model_dump()), stored_at=time.time())
+        if self.store_media and self.disk and downloader is not None:
+            entry.media = await self._download_media(key, result, downloader)
+        self._store(key, entry)
+        if self.disk:
+            await asyncio.to_thread(self._save_to_disk, key, entry)
+
+    async def _download_media(self, key: str, result: ExecuteResult, downloader: "MediaDownloader") -> Dict[str, str]:
+        media_dir = self._media_dir(key)
+        os.makedirs(media_dir, exist_ok=True)
+
+        async def download(index: int, url: str) -> Optional[str]:
+            path = os.path.join(media_dir, f"{index}_{media_filename(url)}")
+            try:
+                prefetched = await downloader.get_prefetched(url)
+                if prefetched is not None:
+                    await asyncio.to_thread(shutil.copyfile, prefetched, path)
+                else:
+                    await downloader.download_to(url, path)
+            except Exception as e:
+                logger.warning(f"Failed to store media of cached result: {e}")
+                return None
+            return path
+
+        urls = list(dict.fromkeys(result.images + result.videos + result.audios))
+        paths = await asyncio.gather(*(download(index, url) for index, url in enumerate(urls)))
+        return {url: path for url, path in zip(urls, paths) if path is not None}
+
+    def invalidate(self, key: Optional[str] = None):
+        """Drop one cached result (memory and disk), or everything if not specified"""
+        with self._lock:
+            keys = list(self._entries) if key is None else [key]
+            for k in keys:
+                self._entries.pop(k, None)
+        if not self.disk:
+            return
+        if key is not None:
+            self._discard_from_disk(key)
+        else:
+            shutil.rmtree(self.disk_dir, ignore_errors=True)
+            with self._lock:
+                self._disk_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_result_cache: Optional[ResultCache] = None
+
+
+def get_result_cache() -> ResultCache:
+    """Get the process-wide result cache
+
+    Configured with the COMFYKIT_RESULT_CACHE_TTL (seconds), COMFYKIT_RESULT_CACHE_SIZE
+    (entries in memory), COMFYKIT_RESULT_CACHE_DISK_SIZE (megabytes, 0 keeps results
+    in memory only) and COMFYKIT_RESULT_CACHE_MEDIA (true/false) env vars.
+    """
+    global _result_cache
+    if _result_cache is None:
+        ttl = float(os.getenv("COMFYKIT_RESULT_CACHE_TTL", "86400"))
+        _result_cache = ResultCache(
+            ttl=ttl if ttl > 0 else None,
+            max_entries=int(os.getenv("COMFYKIT_RESULT_CACHE_SIZE", "256")),
+            max_disk_bytes=int(float(os.getenv("COMFYKIT_RESULT_CACHE_DISK_SIZE", "1024")) * 1024 * 1024),
+            store_media=os.getenv("COMFYKIT_RESULT_CACHE_MEDIA", "false").lower() in ("1", "true", "yes"),
+        )
+    return _result_cache
@@ -1,8 +1,8 @@
-import asyncio
-import json
 import tempfile
+from contextlib import AsyncExitStack, asynccontextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Literal, Optional
+from typing import TYPE_CHECKING, Any, AsyncGenerator, AsyncIterator, Dict, List, Literal, Optional
+from urllib.parse import urlparse
 
 import ssl
 import certifi
@@ -10,12 +10,54 @@ import aiohttp
 import os
 
 from comfykit.logger import logger
+from comfykit.utils import json_util
+from comfykit.utils.rate_limit_util import ConcurrencyLimiter, TokenBucket
+from comfykit.utils.retry_util import ApiError, HttpStatusError, RetryPolicy, is_retryable
+
+if TYPE_CHECKING:
+    from comfykit.comfyui.runninghub_watcher import RunningHubTaskWatcher
+
+
+# Endpoint classes sharing a rate limit
+ENDPOINT_CLASSES = {
+    "/task/openapi/create": "create",
+    "/task/openapi/status": "status",
+    "/task/openapi/outputs": "outputs",
+    "/task/openapi/upload": "upload",
+    "/api/openapi/getJsonApiFormat": "workflow",
+}
+
+# Requests that must not be sent twice
+NON_IDEMPOTENT_ENDPOINTS = {"/task/openapi/create"}
+
+# API error messages meaning "try again later" (the request had no effect)
+RETRYABLE_API_MESSAGES = {"TASK_QUEUE_MAXED", "TASK_INSTANCE_MAXED"}
+
+# Default requests per second of each endpoint class
+DEFAULT_RATE_LIMITS = {
+    "create": 5.0,
+    "status": 20.0,
+    "outputs": 20.0,
+    "upload": 5.0,
+    "workflow": 5.0,
+}
+
+
+def parse_rate_limits(value: Optional[str]) -> Dict[str, float]:
+    """Parse rate limits like "create=2,status=10" (requests per second, 0 = unlimited)"""
+    rate_limits = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            name, rate = item.split("=", 1)
+            rate_limits[name.strip()] = float(rate)
+    return rate_limits
 
 
 class RunningHubClient:
     """RunningHub API client for workflow and file operations"""
 
-    def __init__(self, api_key: str = None, base_url: str = None, timeout: int = None, retry_count: int = None, instance_type: str = None):
+    def __init__(self, api_key: str = None, base_url: str = None, timeout: int = None, retry_count: int = None, instance_type: str = None,
+                 rate_limits: Optional[Dict[str, float]] = None, max_concurrent_tasks: Optional[int] = None):
         """Initialize RunningHub client
         
         Args:
@@ -27,6 +69,13 @@ class RunningHubClient:
             instance_type: Instance type for execution (optional)
                           Set to "plus" to use 48GB VRAM machine
                           Default: None (uses RunningHub default instance)
+            rate_limits: Requests per second by endpoint class (create, status, outputs,
+                        upload, workflow; 0 = unlimited), merged over DEFAULT_RATE_LIMITS
+                        (optional, reads from RUNNINGHUB_RATE_LIMITS env var, e.g. "create=2,status=10")
+            max_concurrent_tasks: Tasks allowed to run at once, match it to the account's
+                                 parallelism so extra tasks wait locally (see task_slot)
+                                 (optional, reads from RUNNINGHUB_MAX_CONCURRENT_TASKS env var,
+                                 default: unlimited)
         """
         self.api_key = api_key or os.getenv("RUNNINGHUB_API_KEY")
         self.base_url = (base_url or os.getenv("RUNNINGHUB_BASE_URL", "https://www.runninghub.ai")).rstrip('/')
@@ -36,6 +85,18 @@ class RunningHubClient:
         self.retry_count = retry_count if retry_count is not None else int(os.getenv("RUNNINGHUB_RETRY_COUNT", "3"))
         self.instance_type = instance_type or os.getenv("RUNNINGHUB_INSTANCE_TYPE")
         self._session: Optional[aiohttp.ClientSession] = None
+        self._watcher: Optional["RunningHubTaskWatcher"] = None
+
+        if rate_limits is None:
+            rate_limits = parse_rate_limits(os.getenv("RUNNINGHUB_RATE_LIMITS"))
+        self.rate_limits = {**DEFAULT_RATE_LIMITS, **rate_limits}
+        self._buckets = {name: TokenBucket(rate) for name, rate in self.rate_limits.items()}
+        if max_concurrent_tasks is None:
+            max_concurrent_tasks = int(os.getenv("RUNNINGHUB_MAX_CONCURRENT_TASKS", "0"))
+        self.task_slots = ConcurrencyLimiter(max_concurrent_tasks)
+
+        # Transient failures are retried with jittered backoff, 4xx and API errors fail right away
+        self.retry_policy = RetryPolicy(max_attempts=self.retry_count + 1, base_delay=1.0, classify=self._is_retryable)
 
         if not self.api_key:
             raise ValueError("RunningHub API key is required")
@@ -59,65 +120,87 @@ class RunningHubClient:
             logger.info("Created new aiohttp ClientSession for RunningHub API")
         return self._session
 
+    async def _build_form_data(self, data: Optional[Dict], files: Dict, stack: AsyncExitStack) -> aiohttp.FormData:
+        """Build multipart form data, file entries with a 'path' or 'open' source are streamed
+        
+        FormData can only be sent once, so it is rebuilt (and sources reopened)
+        for every attempt. Opened sources are closed with the given AsyncExitStack.
+        """
+        form_data = aiohttp.FormData()
+        if data:
+            for key, value in data.items():
+                form_data.add_field(key, str(value))
+        for key, file_info in files.items():
+            if 'path' in file_info:
+                content = stack.enter_context(open(file_info['path'], 'rb'))
+            elif 'open' in file_info:
+                content = await stack.enter_async_context(file_info['open']())
+            else:
+                content = file_info['content']
+            form_data.add_field(key, content, filename=file_info['filename'])
+        return form_data
+
     async def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None, files: Optional[Dict] = None,
-                            timeout: Optional[int] = None) -> Dict[str, Any]:
-        """Make HTTP request to RunningHub API with retry logic (SSL fixed with certifi)."""
+                            timeout: Optional[int] = None, check_code: bool = True) -> Dict[str, Any]:
+        """Make HTTP request to RunningHub API with retry logic (SSL fixed with certifi).
+        
+        Args:
+            method: HTTP method
+            endpoint: API endpoint path
+            data: JSON body, or form fields when files are given
+            files: Multipart files, {field: {'filename': ..., 'path': ...}} (streamed from disk),
+                   {field: {'filename': ..., 'open': callable}} (async context manager factory
+                   yielding a stream, e.g. a download body) or {field: {'filename': ..., 'content': bytes}}
+            timeout: Request timeout override in seconds
+            check_code: Treat a non-zero API 'code' as an error. If False the
+                        response is returned as is, for endpoints whose codes carry state
+        """
         url = f"{self.base_url}{endpoint}"
         headers = {}
 
-        # Prepare request data
-        if files:
-            # For file upload, don't set Content-Type (let aiohttp handle it)
-            request_data = aiohttp.FormData()
-            if data:
-                for key, value in data.items():
-                    request_data.add_field(key, str(value))
-            for key, file_info in files.items():
-                request_data.add_field(key, file_info['content'], filename=file_info['filename'])
-        else:
+        # Prepare request data (multipart data is built per attempt)
+        json_data = None
+        if not files:
             # For JSON requests
             headers['Content-Type'] = 'application/json'
-            request_data = json.dumps(data) if data else None
-
-        # Retry logic
-        last_exception = None
-        for attempt in range(self.retry_count + 1):
-            try:
-                # Get or create shared session
-                session = await self._get_session()
-                
-                # Override timeout for this specific request if provided
-                request_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else None
-                
+            json_data = json_util.dumpb(data) if data else None
+
+        async def attempt() -> Dict[str, Any]:
+            # Get or create shared session
+            session = await self._get_session()
+
+            # Override timeout for this specific request if provided
+            request_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else None
+
+            # Wait for the rate limit of the endpoint class (every attempt is a request)
+            bucket = self._buckets.get(ENDPOINT_CLASSES.get(endpoint))
+            if bucket is not None:
+                await bucket.acquire()
+
+            async with AsyncExitStack() as stack:
+                # For file upload, don't set Content-Type (let aiohttp handle it)
+                request_data = await self._build_form_data(data, files, stack) if files else json_data
                 async with session.request(method, url, headers=headers, data=request_data, timeout=request_timeout) as response:
                     if response.status == 200:
-                        result = await response.json()
-                        if result.get('code') == 0:
+                        result = await response.json(loads=json_util.loads)
+                        if result.get('code') == 0 or not check_code:
                             return result
-                        else:
-                            raise Exception(f"RunningHub API error: {result.get('msg', 'Unknown error')}")
+                        msg = result.get('msg', 'Unknown error')
+                        raise ApiError(result.get('code'), f"RunningHub API error: {msg}",
+                                       retryable=msg in RETRYABLE_API_MESSAGES)
                     else:
                         response_text = await response.text()
-                        raise Exception(f"HTTP {response.status}: {response_text}")
-
-            except Exception as e:
-                last_exception = e
-                
-                # If session is closed, recreate it for the next attempt
-                if "Session is closed" in str(e) or "closed" in str(e).lower():
-                    logger.warning("Detected closed session, recreating for next attempt...")
-                    if self._session and not self._session.closed:
-                        await self._session.close()
-                    self._session = None
-                
-                if attempt < self.retry_count:
-                    wait_time = 2 ** attempt  # Exponential backoff
-                    logger.warning(f"Request failed (attempt {attempt + 1}/{self.retry_count + 1}): {e}. Retrying in {wait_time}s...")
-                    await asyncio.sleep(wait_time)
-                else:
-                    logger.error(f"Request failed after {self.retry_count + 1} attempts: {e}")
-
-        raise last_exception
+                        raise HttpStatusError(response.status, f"HTTP {response.status}: {response_text}")
+
+        # Creating a task is not idempotent, only resend it if it surely wasn't created
+        return await self.retry_policy.call(attempt, key=endpoint, idempotent=endpoint not in NON_IDEMPOTENT_ENDPOINTS)
+
+    def _is_retryable(self, error: BaseException, idempotent: bool = True) -> bool:
+        """Classify request errors, see retry_util.is_retryable"""
+        if isinstance(error, RuntimeError) and self._session is not None and self._session.closed:
+            # Session closed under us, the next attempt gets a new one
+            return True
+        return is_retryable(error, idempotent)
 
     async def get_workflow_json(self, workflow_id: str) -> Dict[str, Any]:
         """Get workflow JSON by workflow ID using getJsonApiFormat API
@@ -143,8 +226,7 @@ class RunningHubClient:
                 raise Exception("No workflow JSON found in response")
 
             # Parse the JSON string to get the actual workflow object
-            import json
-            workflow_json = json.loads(prompt_str)
+            workflow_json = json_util.loads(prompt_str)
 
             logger.info(f"Successfully retrieved workflow JSON for {workflow_id}")
             return workflow_json
@@ -165,8 +247,8 @@ class RunningHubClient:
         workflow_json = await self.get_workflow_json(workflow_id)
 
         # Create temporary file
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False, encoding='utf-8') as f:
-            json.dump(workflow_json, f, ensure_ascii=False, indent=2)
+        with tempfile.NamedTemporaryFile(mode='wb', suffix='.json', delete=False) as f:
+            f.write(json_util.dumpb(workflow_json, indent=True))
             temp_file_path = f.name
 
         logger.info(f"Workflow saved to temporary file: {temp_file_path}")
@@ -186,52 +268,92 @@ class RunningHubClient:
 
         logger.info(f"Uploading file to RunningHub: {file_path}")
 
-        # Read file content
-        with open(file_path, 'rb') as f:
-            file_content = f.read()
+        files = {
+            "file": {
+                "path": file_path,
+                "filename": Path(file_path).name
+            }
+        }
 
-        filename = Path(file_path).name
+        try:
+            return await self._upload(files)
+        except Exception as e:
+            logger.error(f"Failed to upload file {file_path}: {e}")
+            raise
 
-        data = {
-            "apiKey": self.api_key
-        }
+    async def upload_url(self, url: str) -> str:
+        """Upload a remote file to RunningHub
+        
+        The download body is relayed into the upload body chunk by chunk (no
+        temp file, no full buffering). Retries download the file again.
+        
+        Args:
+            url: URL of the file to upload
+            
+        Returns:
+            RunningHub fileName (as required by LoadImage nodes)
+        """
+        logger.info(f"Uploading file from URL to RunningHub: {url}")
+
+        @asynccontextmanager
+        async def open_download() -> AsyncGenerator[AsyncIterator[bytes], None]:
+            session = await self._get_session()
+            # The source has its own circuit breaker, a failing source host (headers
+            # or body) must not pause uploads of other files
+            download_key = f"download:{urlparse(url).netloc}"
+            async with self.retry_policy.circuit(download_key):
+                response = await session.get(url)
+                if response.status != 200:
+                    response.release()
+                    raise HttpStatusError(response.status, f"Download media failed: HTTP {response.status}")
+            async with response:
+                yield self.retry_policy.stream(download_key, response.content.iter_any())
 
         files = {
             "file": {
-                "content": file_content,
-                "filename": filename
+                "open": open_download,
+                "filename": os.path.basename(urlparse(url).path) or f"temp_media_{abs(hash(url))}.jpg"
             }
         }
 
         try:
-            result = await self._make_request("POST", "/task/openapi/upload", data=data, files=files)
-            upload_data = result.get('data', {})
+            return await self._upload(files)
+        except Exception as e:
+            logger.error(f"Failed to upload file from URL {url}: {e}")
+            raise
+
+    async def _upload(self, files: Dict[str, Dict[str, Any]]) -> str:
+        """Upload multipart files, return the RunningHub fileName"""
+        data = {
+            "apiKey": self.api_key
+        }
 
-            # According to RunningHub documentation, the response should contain fileName
-            file_name = upload_data.get('fileName', '')
+        result = await self._make_request("POST", "/task/openapi/upload", data=data, files=files)
+        upload_data = result.get('data', {})
 
-            if not file_name:
-                # Fallback to URL if fileName is not available
-                file_url = upload_data.get('url', '')
-                if file_url:
-                    logger.warning(f"fileName not found in response, using URL: {file_url}")
-                    return file_url
-                else:
-                    raise Exception("Neither fileName nor URL found in upload response")
+        # According to RunningHub documentation, the response should contain fileName
+        file_name = upload_data.get('fileName', '')
 
-            logger.info(f"File uploaded successfully, fileName: {file_name}")
-            return file_name
+        if not file_name:
+            # Fallback to URL if fileName is not available
+            file_url = upload_data.get('url', '')
+            if file_url:
+                logger.warning(f"fileName not found in response, using URL: {file_url}")
+                return file_url
+            else:
+                raise Exception("Neither fileName nor URL found in upload response")
 
-        except Exception as e:
-            logger.error(f"Failed to upload file {file_path}: {e}")
-            raise
+        logger.info(f"File uploaded successfully, fileName: {file_name}")
+        return file_name
 
-    async def create_task(self, workflow_id: str, node_info_list: List[Dict] = None) -> Dict[str, Any]:
+    async def create_task(self, workflow_id: str, node_info_list: List[Dict] = None, webhook_url: Optional[str] = None) -> Dict[str, Any]:
         """Create workflow execution task
         
         Args:
             workflow_id: RunningHub workflow ID
             node_info_list: Node parameter modifications
+            webhook_url: URL RunningHub calls back when the task ends (optional,
+                        see RunningHubWebhookReceiver)
             
         Returns:
             Task creation result
@@ -246,6 +368,9 @@ class RunningHubClient:
         if node_info_list:
             data["nodeInfoList"] = node_info_list
 
+        if webhook_url:
+            data["webhookUrl"] = webhook_url
+
         # Add instanceType if specified (for high-VRAM machines like 48G)
         if self.instance_type:
             data["instanceType"] = self.instance_type
@@ -315,8 +440,66 @@ class RunningHubClient:
             logger.error(f"Failed to query task result for {task_id}: {e}")
             raise
 
+    async def probe_task_outputs(self, task_id: str) -> Dict[str, Any]:
+        """Query task outputs without treating 'not finished' codes as errors
+
+        The outputs endpoint reports the task state through its response code
+        (see runninghub_watcher.TASK_OUTPUT_CODES), so one call tells whether the task is still
+        queued/running, failed, or finished together with its outputs.
+
+        Args:
+            task_id: Task ID
+
+        Returns:
+            Raw response: code, msg and data
+        """
+        data = {
+            "apiKey": self.api_key,
+            "taskId": task_id
+        }
+        return await self._make_request("POST", "/task/openapi/outputs", data=data, check_code=False)
+
+    def task_slot(self) -> ConcurrencyLimiter:
+        """Slot of the concurrent task cap, hold it from create_task until the task finished
+
+        Example:
+            >>> async with client.task_slot():
+            ...     task = await client.create_task(workflow_id, node_info_list)
+            ...     ...  # wait for completion
+        """
+        return self.task_slots
+
+    def get_rate_limit_stats(self) -> Dict[str, Any]:
+        """Get rate limit and task cap wait metrics
+
+        Returns:
+            {"endpoints": {class: {"rate", "acquired", "waited", "total_wait", "max_wait", "avg_wait"}},
+             "tasks": {"limit", "in_use", "waiting", "acquired", "waited", "total_wait", "max_wait", "avg_wait"}}
+        """
+        return {
+            "endpoints": {
+                name: {"rate": bucket.rate, **bucket.stats.as_dict()}
+                for name, bucket in self._buckets.items()
+            },
+            "tasks": {
+                "limit": self.task_slots.limit,
+                "in_use": self.task_slots.in_use,
+                "waiting": self.task_slots.waiting,
+                **self.task_slots.stats.as_dict(),
+            },
+        }
+
+    def get_task_watcher(self) -> "RunningHubTaskWatcher":
+        """Get the task watcher of this client (created on first use)"""
+        if self._watcher is None:
+            from comfykit.comfyui.runninghub_watcher import RunningHubTaskWatcher
+            self._watcher = RunningHubTaskWatcher(self)
+        return self._watcher
+
     async def close(self):
         """Close the shared session and cleanup resources"""
+        if self._watcher is not None:
+            await self._watcher.close()
         if self._session and not self._session.closed:
             await self._session.close()
             self._session = None
@@ -1,19 +1,28 @@
 import asyncio
+import copy
+import hashlib
 import os
-import time
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
 
-from comfykit.comfyui.base_executor import MEDIA_UPLOAD_NODE_TYPES, ComfyUIExecutor
+from comfykit.comfyui.base_executor import ComfyUIExecutor
 from comfykit.comfyui.models import ExecuteResult
+from comfykit.comfyui.result_cache import ResultCache
 from comfykit.comfyui.runninghub_client import RunningHubClient
+from comfykit.comfyui.runninghub_webhook import RunningHubWebhookReceiver
+from comfykit.comfyui.upload_cache import UploadCache
+from comfykit.comfyui.workflow_cache import CachedWorkflow, get_remote_workflow_cache
 from comfykit.logger import logger
-from comfykit.utils.file_util import download_files
 
 
 class RunningHubExecutor(ComfyUIExecutor):
     """RunningHub executor for executing workflows on RunningHub cloud platform"""
 
-    def __init__(self, base_url: str = None, api_key: str = None, timeout: int = None, retry_count: int = 3, instance_type: str = None):
+    def __init__(self, base_url: str = None, api_key: str = None, timeout: int = None, retry_count: int = 3, instance_type: str = None,
+                 upload_cache: Union[bool, UploadCache] = False, upload_ttl: Optional[float] = 86400.0,
+                 upload_concurrency: int = 4, max_concurrent_uploads: int = 8,
+                 rate_limits: Optional[Dict[str, float]] = None, max_concurrent_tasks: Optional[int] = None,
+                 webhook_receiver: Optional[RunningHubWebhookReceiver] = None,
+                 result_cache: Union[bool, ResultCache] = False, keep_outputs: bool = False):
         """Initialize RunningHub executor
         
         Args:
@@ -24,27 +33,39 @@ class RunningHubExecutor(ComfyUIExecutor):
             retry_count: API retry count (default: 3)
             instance_type: Instance type for execution (optional)
                           Set to "plus" to use 48GB VRAM machine
+            upload_cache: Skip uploading media inputs already uploaded with this account
+                         (True: shared on-disk cache, or an UploadCache instance; default: False)
+            upload_ttl: Seconds an upload is reused, RunningHub files cannot be checked
+                       cheaply so entries simply expire (default: 86400)
+            upload_concurrency: Max concurrent media uploads of one execution (default: 4)
+            max_concurrent_uploads: Max concurrent media uploads across all executions (default: 8)
+            rate_limits: Requests per second by endpoint class (create, status, outputs, upload, workflow)
+            max_concurrent_tasks: Tasks run at once, others wait locally (default: unlimited)
+            webhook_receiver: Create tasks with its callback URL and complete them when
+                             RunningHub calls back, polling only as a safety net (optional,
+                             started on first use, not closed by the executor)
+            result_cache: Reuse results of exact repeats of a task, executions with randomized
+                         seeds excepted (True: shared cache, or a ResultCache instance; default: False)
+            keep_outputs: Keep the raw task outputs in result.outputs["raw_data"] (default: False)
         """
         # For RunningHub, base_url is the API base URL
-        super().__init__(base_url or "https://www.runninghub.ai", api_key=api_key)
+        super().__init__(base_url or "https://www.runninghub.ai", api_key=api_key, upload_cache=upload_cache,
+                         upload_concurrency=upload_concurrency, max_concurrent_uploads=max_concurrent_uploads,
+                         result_cache=result_cache, keep_outputs=keep_outputs)
+        self.upload_ttl = upload_ttl
         self.timeout = timeout  # Task completion timeout (None = unlimited)
         self.retry_count = retry_count
         self.instance_type = instance_type
+        self.webhook_receiver = webhook_receiver
         # Note: HTTP request timeout is handled by client with its own default (300s)
         # We don't pass executor's timeout to client to keep them separate
-        self.client = RunningHubClient(api_key=api_key, base_url=base_url, retry_count=retry_count, instance_type=instance_type)
+        self.client = RunningHubClient(api_key=api_key, base_url=base_url, retry_count=retry_count, instance_type=instance_type,
+                                      rate_limits=rate_limits, max_concurrent_tasks=max_concurrent_tasks)
 
     async def close(self):
         """Close the RunningHub client and cleanup resources"""
         await self.client.close()
-
-    async def __aenter__(self):
-        """Async context manager entry"""
-        return self
-
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Async context manager exit"""
-        await self.close()
+        await super().close()
 
     def __del__(self):
         """Destructor to ensure resources are cleaned up
@@ -62,16 +83,19 @@ class RunningHubExecutor(ComfyUIExecutor):
             # Silently ignore errors in __del__
             pass
 
-    async def execute_by_id(self, workflow_id: str, params: Dict[str, Any] = None) -> ExecuteResult:
+    async def execute_by_id(self, workflow_id: str, params: Dict[str, Any] = None, refresh: bool = False) -> ExecuteResult:
         """Execute workflow on RunningHub platform by workflow ID directly
         
         Supports unified simple parameter format like local ComfyUI!
         Automatically fetches workflow definition and does parameter mapping.
+        The definition is cached (see RUNNINGHUB_WORKFLOW_CACHE_TTL), so repeated
+        executions skip the fetch and the parse.
         
         Args:
             workflow_id: RunningHub workflow ID (numeric string)
             params: Workflow parameters in SIMPLE format (same as local ComfyUI)
                    Example: {"prompt": "a cat", "seed": 42}
+            refresh: Fetch the workflow definition again even if it is cached
                    
         Returns:
             Execution result
@@ -81,25 +105,20 @@ class RunningHubExecutor(ComfyUIExecutor):
 
             logger.info(f"Starting RunningHub workflow execution: workflow_id={workflow_id}")
 
-            # Fetch workflow definition from RunningHub API
-            logger.info(f"Fetching workflow definition for workflow_id={workflow_id}")
-            workflow_json = await self.client.get_workflow_json(workflow_id)
-            
+            # Fetch workflow definition from RunningHub API (shared cache entry)
+            cached = await self._get_workflow_definition(workflow_id, refresh)
+            if not cached.metadata:
+                return ExecuteResult(status="error", msg="Failed to parse workflow metadata")
+
+            # Tag a copy, the cached metadata is shared
+            metadata = cached.metadata.model_copy(update={"workflow_id": workflow_id, "is_runninghub": True})
+
+            # Copy before seed randomization, the cached definition is shared
+            workflow_json = copy.deepcopy(cached.workflow_data)
+
             # Apply seed randomization (consistent with local ComfyUI behavior)
             workflow_json, seed_changes = self._randomize_seed_in_workflow(workflow_json)
             
-            # Parse workflow to get metadata for parameter mapping
-            from comfykit.comfyui.workflow_parser import WorkflowParser
-            parser = WorkflowParser()
-            metadata = parser.parse_workflow(workflow_json, f"workflow_{workflow_id}")
-            
-            if not metadata:
-                return ExecuteResult(status="error", msg="Failed to parse workflow metadata")
-            
-            # Store workflow_id in metadata
-            metadata.workflow_id = workflow_id
-            metadata.is_runninghub = True
-            
             logger.info(f"Workflow parsed successfully: {len(metadata.params)} parameters found")
 
             # Convert simple parameters to RunningHub nodeInfoList format using metadata
@@ -108,29 +127,45 @@ class RunningHubExecutor(ComfyUIExecutor):
             # Extract output node information from metadata
             output_id_2_var = self._extract_output_nodes(metadata)
 
-            # Create task on RunningHub
-            task_data = await self.client.create_task(workflow_id, node_info_list if node_info_list else None)
-            task_id = task_data.get('taskId')
-
-            if not task_id:
-                return ExecuteResult(status="error", msg="Failed to create RunningHub task")
-
-            logger.info(f"RunningHub task created: {task_id}")
+            cache_key = self._get_task_cache_key(workflow_id, cached.workflow_data, node_info_list, seed_changes)
+            cached_result = await self._get_cached_result(cache_key)
+            if cached_result is not None:
+                return cached_result
 
-            # Wait for task completion with output mapping
-            result = await self._wait_for_task_completion(task_id, output_id_2_var)
+            # Create task on RunningHub and wait for completion with output mapping
+            result = await self._run_task(workflow_id, node_info_list, output_id_2_var)
 
             # Calculate execution time
             end_time = asyncio.get_event_loop().time()
             duration = end_time - start_time
             result.duration = duration
 
+            self._attach_media(result)
+            await self._store_result(cache_key, result)
             return result
 
         except Exception as e:
             logger.error(f"RunningHub workflow execution failed: {e}", exc_info=True)
             return ExecuteResult(status="error", msg=f"RunningHub execution failed: {str(e)}")
 
+    def _get_workflow_cache_key(self, workflow_id: str) -> str:
+        return f"runninghub:{self.base_url}:{workflow_id}"
+
+    async def _get_workflow_definition(self, workflow_id: str, refresh: bool = False) -> CachedWorkflow:
+        """Get the workflow definition and parsed metadata of a workflow ID"""
+        async def fetch() -> Dict[str, Any]:
+            logger.info(f"Fetching workflow definition for workflow_id={workflow_id}")
+            return await self.client.get_workflow_json(workflow_id)
+
+        return await get_remote_workflow_cache().get(
+            self._get_workflow_cache_key(workflow_id), fetch, name=f"workflow_{workflow_id}", refresh=refresh
+        )
+
+    def invalidate_workflow(self, workflow_id: Optional[str] = None):
+        """Drop the cached definition of a workflow ID (or of all workflows)"""
+        cache = get_remote_workflow_cache()
+        cache.invalidate(self._get_workflow_cache_key(workflow_id) if workflow_id else None)
+
     async def execute_workflow(self, workflow_file: str, params: Dict[str, Any] = None) -> ExecuteResult:
         """Execute workflow on RunningHub platform
         
@@ -148,19 +183,14 @@ class RunningHubExecutor(ComfyUIExecutor):
                 logger.error(f"Workflow file does not exist: {workflow_file}")
                 return ExecuteResult(status="error", msg=f"Workflow file does not exist: {workflow_file}")
 
-            # Load workflow JSON and apply seed randomization
-            import json
-            with open(workflow_file, 'r', encoding='utf-8') as f:
-                workflow_json = json.load(f)
+            # Load workflow JSON (shared cache entry, copy before seed randomization)
+            workflow_json = copy.deepcopy(self.get_workflow_data(workflow_file))
             
             # Apply seed randomization (consistent with local ComfyUI behavior)
             workflow_json, seed_changes = self._randomize_seed_in_workflow(workflow_json)
             
-            # Parse workflow to get metadata
-            from pathlib import Path
-            from comfykit.comfyui.workflow_parser import WorkflowParser
-            parser = WorkflowParser()
-            metadata = parser.parse_workflow(workflow_json, Path(workflow_file).stem)
+            # Parse workflow to get metadata (cached by file identity)
+            metadata = self.get_workflow_metadata(workflow_file)
             
             if not metadata:
                 return ExecuteResult(status="error", msg="Cannot parse workflow metadata")
@@ -175,26 +205,24 @@ class RunningHubExecutor(ComfyUIExecutor):
             # Convert parameters to RunningHub nodeInfoList format
             node_info_list = await self._convert_params_to_node_info_list(metadata, params or {}, seed_changes)
 
-            # Create task on RunningHub
-            task_data = await self.client.create_task(workflow_id, node_info_list if node_info_list else None)
-            task_id = task_data.get('taskId')
-
-            if not task_id:
-                return ExecuteResult(status="error", msg="Failed to create RunningHub task")
-
-            logger.info(f"RunningHub task created: {task_id}")
-
             # Extract output node information from metadata
             output_id_2_var = self._extract_output_nodes(metadata)
 
-            # Wait for task completion
-            result = await self._wait_for_task_completion(task_id, output_id_2_var)
+            cache_key = self._get_task_cache_key(workflow_id, self.get_workflow_data(workflow_file), node_info_list, seed_changes)
+            cached_result = await self._get_cached_result(cache_key)
+            if cached_result is not None:
+                return cached_result
+
+            # Create task on RunningHub and wait for completion
+            result = await self._run_task(workflow_id, node_info_list, output_id_2_var)
 
             # Calculate execution time
             end_time = asyncio.get_event_loop().time()
             duration = end_time - start_time
             result.duration = duration
 
+            self._attach_media(result)
+            await self._store_result(cache_key, result)
             return result
 
         except Exception as e:
@@ -215,22 +243,26 @@ class RunningHubExecutor(ComfyUIExecutor):
         node_info_list = []
         seed_changes = seed_changes or {}
 
+        # Upload all media inputs concurrently first (same upload logic as base_executor)
+        uploads = await self._resolve_uploads(
+            [params[mapping.param_name] for mapping in metadata.mapping_info.param_mappings
+             if mapping.param_name in params and self._needs_upload(mapping)],
+            self._handle_runninghub_media_upload,
+        )
+
         # Process parameter mappings from metadata
         for param_mapping in metadata.mapping_info.param_mappings:
             param_name = param_mapping.param_name
 
             if param_name in params:
                 param_value = params[param_name]
-                node_class_type = param_mapping.node_class_type
-                need_upload = param_mapping.need_upload
 
-                # Follow the same upload logic as base_executor
-                # Priority 1: Check DSL upload marker (~)
-                if need_upload:
-                    param_value = await self._handle_runninghub_media_upload(param_value)
-                # Priority 2: Check if node type needs special media upload handling (backward compatibility)
-                elif node_class_type in MEDIA_UPLOAD_NODE_TYPES:
-                    param_value = await self._handle_runninghub_media_upload(param_value)
+                # Priority 1: DSL upload marker (~), Priority 2: media node types (backward compatibility)
+                if self._needs_upload(param_mapping):
+                    if isinstance(param_value, str) and param_value in uploads:
+                        param_value = uploads[param_value]
+                    else:
+                        param_value = await self._handle_runninghub_media_upload(param_value)
 
                 # Create nodeInfo entry
                 node_info = {
@@ -266,7 +298,14 @@ class RunningHubExecutor(ComfyUIExecutor):
             # Handle URL
             if param_value.startswith(('http://', 'https://')):
                 try:
-                    media_value = await self._upload_media_from_url(param_value)
+                    ttl = self.upload_ttl
+                    if self.upload_cache_url_ttl is not None:
+                        ttl = self.upload_cache_url_ttl if ttl is None else min(ttl, self.upload_cache_url_ttl)
+                    media_value = await self._upload_with_cache(
+                        UploadCache.url_key(param_value),
+                        lambda: self._upload_media_from_url(param_value),
+                        ttl=ttl,
+                    )
                     logger.info(f"Media upload successful (URL): {media_value}")
                     return media_value
                 except Exception as e:
@@ -275,7 +314,14 @@ class RunningHubExecutor(ComfyUIExecutor):
             # Handle local file path
             elif os.path.exists(param_value):
                 try:
-                    uploaded_filename = await self.client.upload_file(param_value)
+                    if self.upload_cache is not None:
+                        uploaded_filename = await self._upload_with_cache(
+                            await self.upload_cache.file_key(param_value),
+                            lambda: self.client.upload_file(param_value),
+                            ttl=self.upload_ttl,
+                        )
+                    else:
+                        uploaded_filename = await self.client.upload_file(param_value)
                     logger.info(f"Media upload successful (local file): {uploaded_filename}")
                     return uploaded_filename
                 except Exception as e:
@@ -285,14 +331,20 @@ class RunningHubExecutor(ComfyUIExecutor):
         # Other cases (already a fileName or doesn't need upload)
         return param_value
 
+    def _get_upload_target(self) -> str:
+        """Uploads belong to the RunningHub account (API key is hashed, never stored)"""
+        account = hashlib.sha256((self.client.api_key or "").encode()).hexdigest()[:16]
+        return f"runninghub:{self.client.base_url}:{account}"
+
+    async def _is_upload_available(self, uploaded_name: str) -> bool:
+        """RunningHub has no cheap existence check, cached uploads rely on their TTL"""
+        return True
+
     async def _upload_media_from_url(self, media_url: str) -> str:
         """Upload media from URL to RunningHub"""
         try:
-            # Download the file first
-            async with download_files(media_url) as temp_file_path:
-                # Upload to RunningHub and get fileName
-                result = await self.client.upload_file(temp_file_path)
-                return result
+            # Relay the download straight into the upload
+            return await self.client.upload_url(media_url)
         except Exception as e:
             logger.error(f"Failed to upload media from URL {media_url}: {e}")
             raise
@@ -314,66 +366,100 @@ class RunningHubExecutor(ComfyUIExecutor):
             raise
 
 
-    async def _wait_for_task_completion(self, task_id: str, output_id_2_var: Optional[Dict[str, str]] = None, max_wait_time: int = None) -> ExecuteResult:
-        """Wait for RunningHub task completion and return results"""
+    def _get_task_cache_key(self, workflow_id: str, workflow_definition: Dict[str, Any], node_info_list: List[dict],
+                            seed_changes: Dict[str, int]) -> Optional[str]:
+        """Get the result cache key of a task: the workflow definition and its parameter overrides
+
+        Args:
+            workflow_definition: Definition before seed randomization
+            seed_changes: Randomized seeds, only those not overridden by params make the task unrepeatable
+        """
+        randomized = {
+            node_id: seed for node_id, seed in seed_changes.items()
+            if {"nodeId": node_id, "fieldName": "seed", "fieldValue": seed} in node_info_list
+        }
+        prompt = {
+            "workflowId": workflow_id,
+            "workflow": workflow_definition,
+            "nodeInfoList": node_info_list,
+            "instanceType": self.instance_type,
+        }
+        return self._get_result_cache_key(prompt, randomized)
+
+    async def _run_task(self, workflow_id: str, node_info_list: List[dict], output_id_2_var: Dict[str, str]) -> ExecuteResult:
+        """Create a task and wait for its result
+
+        A slot of the client's concurrent task cap is held meanwhile, so tasks
+        beyond the account's parallelism wait here instead of being rejected.
+        """
+        webhook_url = None
+        if self.webhook_receiver is not None:
+            await self.webhook_receiver.start()
+            self.webhook_receiver.register(self.client.get_task_watcher())
+            webhook_url = self.webhook_receiver.url
+
+        async with self.client.task_slot():
+            task_data = await self.client.create_task(workflow_id, node_info_list if node_info_list else None,
+                                                      webhook_url=webhook_url)
+            task_id = task_data.get('taskId')
+
+            if not task_id:
+                return ExecuteResult(status="error", msg="Failed to create RunningHub task")
+
+            logger.info(f"RunningHub task created: {task_id}")
+
+            return await self._wait_for_task_completion(task_id, output_id_2_var, webhook=webhook_url is not None)
+
+    def get_rate_limit_stats(self) -> Dict[str, Any]:
+        """Get rate limit and task cap wait metrics of the client (see RunningHubClient.get_rate_limit_stats)"""
+        return self.client.get_rate_limit_stats()
+
+    async def _wait_for_task_completion(self, task_id: str, output_id_2_var: Optional[Dict[str, str]] = None, max_wait_time: int = None,
+                                        webhook: bool = False) -> ExecuteResult:
+        """Wait for RunningHub task completion and return results
+
+        Status checks are scheduled by the client's task watcher, shared by all
+        tasks in flight (see RunningHubTaskWatcher). Tasks created with a webhook
+        are resolved by the callback and only checked rarely.
+        """
         # Use provided max_wait_time, or fall back to self.timeout
         # If both are None, no timeout limit (wait indefinitely)
         if max_wait_time is None:
             max_wait_time = self.timeout
-        
-        check_interval = 2
-        start_time = time.time()
 
         timeout_msg = f"{max_wait_time}s" if max_wait_time else "unlimited"
         logger.info(f"Waiting for RunningHub task completion: {task_id} (timeout: {timeout_msg})")
 
-        while True:
-            elapsed_time = time.time() - start_time
-            
-            # Only check timeout if max_wait_time is set (not None)
-            if max_wait_time is not None and elapsed_time >= max_wait_time:
-                break
-
-            try:
-                # Query task status (now returns dict with status, msg, code)
-                status_info = await self.client.query_task_status(task_id)
-                task_status = status_info['status']
-                status_msg = status_info['msg']
-                
-                logger.debug(f"Task {task_id} status: {task_status}, msg: {status_msg}")
-
-                # RunningHub API only returns: ["QUEUED","RUNNING","FAILED","SUCCESS"]
-                if task_status == 'SUCCESS':
-                    # Task completed - get results
-                    result_data = await self.client.query_task_result(task_id)
-                    return await self._process_task_result(task_id, result_data, output_id_2_var)
-
-                elif task_status == 'FAILED':
-                    # Task failed - use msg from status API (no additional query needed)
-                    error_msg = f"RunningHub task {task_id} failed"
-                    if status_msg:
-                        error_msg += f": {status_msg}"
-                    
-                    logger.error(error_msg)
-                    return ExecuteResult(
-                        status="error",
-                        prompt_id=task_id,
-                        msg=error_msg
-                    )
-
-                elif task_status in ['QUEUED', 'RUNNING']:
-                    # Task still in progress - wait and check again
-                    logger.info(f"Task {task_id} status: {task_status}, waiting...")
-                    await asyncio.sleep(check_interval)
-                    continue
-
-            except Exception as e:
-                logger.error(f"Error checking task status {task_id}: {e}", exc_info=True)
-                await asyncio.sleep(check_interval)
-                continue
+        watcher = self.client.get_task_watcher()
+        future = watcher.watch(task_id, webhook=webhook)
+        try:
+            outcome = await asyncio.wait_for(asyncio.shield(future), max_wait_time)
+        except asyncio.TimeoutError:
+            # Timeout
+            error_msg = f"RunningHub task {task_id} timeout after {max_wait_time} seconds"
+            logger.error(error_msg)
+            return ExecuteResult(
+                status="error",
+                prompt_id=task_id,
+                msg=error_msg
+            )
+        finally:
+            if not future.done():
+                watcher.unwatch(task_id)
+
+        # RunningHub API only returns: ["QUEUED","RUNNING","FAILED","SUCCESS"]
+        if outcome.status == 'SUCCESS':
+            # Task completed - get results (unless the watcher already got them)
+            result_data = outcome.outputs
+            if result_data is None:
+                result_data = await self.client.query_task_result(task_id)
+            return await self._process_task_result(task_id, result_data, output_id_2_var)
+
+        # Task failed - use msg from status API (no additional query needed)
+        error_msg = f"RunningHub task {task_id} failed"
+        if outcome.msg:
+            error_msg += f": {outcome.msg}"
 
-        # Timeout
-        error_msg = f"RunningHub task {task_id} timeout after {max_wait_time} seconds"
         logger.error(error_msg)
         return ExecuteResult(
             status="error",
@@ -441,25 +527,22 @@ class RunningHubExecutor(ComfyUIExecutor):
             # If there is a mapping, map by variable name (following HTTP executor pattern)
             if output_id_2_images:
                 result.images_by_var = self._map_outputs_by_var(output_id_2_var or {}, output_id_2_images)
-                result.images = self._extend_flat_list_from_dict(result.images_by_var)
 
             if output_id_2_videos:
                 result.videos_by_var = self._map_outputs_by_var(output_id_2_var or {}, output_id_2_videos)
-                result.videos = self._extend_flat_list_from_dict(result.videos_by_var)
 
             if output_id_2_audios:
                 result.audios_by_var = self._map_outputs_by_var(output_id_2_var or {}, output_id_2_audios)
-                result.audios = self._extend_flat_list_from_dict(result.audios_by_var)
 
             # Process texts/texts_by_var
             if output_id_2_texts:
                 result.texts_by_var = self._map_outputs_by_var(output_id_2_var or {}, output_id_2_texts)
-                result.texts = self._extend_flat_list_from_dict(result.texts_by_var)
 
-            # Store raw data for debugging
-            result.outputs = {
-                "raw_data": result_data
-            }
+            # Store raw data for debugging (opt-in)
+            if self.keep_outputs:
+                result.outputs = {
+                    "raw_data": result_data
+                }
 
             logger.info(f"RunningHub task {task_id} completed successfully: {len(result.images)} images, {len(result.videos)} videos, {len(result.audios)} audios, {len(result.texts)} texts")
 
@@ -0,0 +1,331 @@
+"""RunningHub task watcher - one scheduler for the status checks of all tasks of a client"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from comfykit.logger import logger
+
+if TYPE_CHECKING:
+    from comfykit.comfyui.runninghub_client import RunningHubClient
+
+# Response codes of /task/openapi/outputs that describe the task state
+TASK_OUTPUT_CODES = {
+    804: "RUNNING",  # APIKEY_TASK_IS_RUNNING
+    813: "QUEUED",   # APIKEY_TASK_IS_QUEUED
+    805: "FAILED",   # APIKEY_TASK_STATUS_ERROR
+}
+
+
+@dataclass
+class TaskOutcome:
+    """Final state of a RunningHub task"""
+    status: str  # "SUCCESS" or "FAILED"
+    msg: str = ""
+    outputs: Optional[List[Dict[str, Any]]] = None  # Set when known from an outputs probe
+
+
+@dataclass
+class WatchedTask:
+    """Scheduling state of one watched task"""
+    task_id: str
+    future: asyncio.Future
+    status: str = "QUEUED"
+    watched_at: float = field(default_factory=time.monotonic)
+    last_pending_at: Optional[float] = None  # When a check last found it queued/running
+    unchanged_checks: int = 0
+    errors: int = 0
+    waiters: int = 1
+    webhook: bool = False  # Completion is pushed by a webhook, checks are only a safety net
+
+
+class RunningHubTaskWatcher:
+    """Watches all in-flight tasks of a RunningHub client
+
+    Instead of one polling loop per task, a single background loop schedules
+    the checks of every tracked task:
+
+    - The first check happens close to the expected completion time (moving
+      average of the observed task durations), or after `min_interval`.
+    - Queued tasks are then checked every `queued_interval`, running tasks every
+      `min_interval`, both backing off to `max_interval` while nothing changes.
+    - All checks share a budget of `max_requests_per_second` API calls.
+    - With `probe_outputs` a check is a single /task/openapi/outputs call, whose
+      response code tells queued/running/failed, and which returns the outputs
+      directly on success (no separate status call).
+
+    Callers get a future per task that resolves to a TaskOutcome. Tasks created
+    with a webhook are resolved by resolve() when the callback arrives, they are
+    only checked every `webhook_poll_interval` in case it gets lost.
+    """
+
+    def __init__(self, client: "RunningHubClient", min_interval: float = 1.0, max_interval: float = 30.0,
+                 queued_interval: float = 5.0, max_requests_per_second: Optional[float] = None,
+                 probe_outputs: Optional[bool] = None, webhook_poll_interval: float = 60.0,
+                 max_early_outcomes: int = 1024):
+        """Initialize task watcher
+
+        Args:
+            client: RunningHub client used for the checks
+            min_interval: Shortest delay between two checks of a task (seconds)
+            max_interval: Longest delay between two checks of a task (seconds)
+            queued_interval: Initial delay between checks of a queued task (seconds)
+            max_requests_per_second: Budget of check requests for all tasks together
+                                    (default: RUNNINGHUB_POLL_BUDGET env var or 10)
+            probe_outputs: Check tasks with the outputs endpoint only
+                          (default: RUNNINGHUB_PROBE_OUTPUTS env var or True)
+            webhook_poll_interval: Delay between safety net checks of webhook tasks (seconds)
+            max_early_outcomes: Webhook outcomes kept for tasks not watched yet
+        """
+        self.client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.queued_interval = queued_interval
+        if max_requests_per_second is None:
+            max_requests_per_second = float(os.getenv("RUNNINGHUB_POLL_BUDGET", "10"))
+        self.max_requests_per_second = max_requests_per_second
+        if probe_outputs is None:
+            probe_outputs = os.getenv("RUNNINGHUB_PROBE_OUTPUTS", "true").lower() in ("1", "true", "yes")
+        self.probe_outputs = probe_outputs
+        self.webhook_poll_interval = webhook_poll_interval
+        self.max_early_outcomes = max_early_outcomes
+
+        self._tasks: Dict[str, WatchedTask] = {}
+        self._schedule: List[Tuple[float, int, str]] = []
+        self._sequence = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop_task: Optional[asyncio.Task] = None
+        self._checks: set = set()
+        self._next_request_at = 0.0
+        self._expected_duration: Optional[float] = None
+        # Callbacks can arrive before the creator of the task starts watching it
+        self._early_outcomes: "OrderedDict[str, TaskOutcome]" = OrderedDict()
+        self.requests = 0
+
+    def _ensure_running(self):
+        """Start the background loop (again, if it belonged to another event loop)"""
+        loop = asyncio.get_running_loop()
+        if self._loop_task is not None and not self._loop_task.done() and self._loop_task.get_loop() is loop:
+            return
+        # Tasks of a finished event loop can't be resolved anymore
+        for task_id, watched in list(self._tasks.items()):
+            if watched.future.get_loop() is not loop:
+                del self._tasks[task_id]
+        self._schedule = [(due, seq, task_id) for due, seq, task_id in self._schedule if task_id in self._tasks]
+        heapq.heapify(self._schedule)
+        self._checks = set()
+        self._next_request_at = 0.0
+        self._wakeup = asyncio.Event()
+        self._loop_task = loop.create_task(self._run())
+
+    def watch(self, task_id: str, webhook: bool = False) -> asyncio.Future:
+        """Start watching a task
+
+        Watching an already watched task returns the same future.
+
+        Args:
+            task_id: Task ID
+            webhook: The task was created with a webhook (see resolve), check it rarely
+
+        Returns:
+            Future resolving to the TaskOutcome of the task
+        """
+        self._ensure_running()
+        watched = self._tasks.get(task_id)
+        if watched is not None:
+            watched.waiters += 1
+            return watched.future
+
+        future = asyncio.get_running_loop().create_future()
+        outcome = self._early_outcomes.pop(task_id, None)
+        if outcome is not None:
+            future.set_result(outcome)
+            return future
+
+        watched = WatchedTask(task_id=task_id, future=future, webhook=webhook)
+        self._tasks[task_id] = watched
+        self._reschedule(watched, self._next_interval(watched))
+        logger.debug(f"Watching RunningHub task {task_id} ({len(self._tasks)} tasks watched)")
+        return watched.future
+
+    def unwatch(self, task_id: str):
+        """Stop watching a task (e.g. the caller timed out); other waiters keep it watched"""
+        watched = self._tasks.get(task_id)
+        if watched is None:
+            return
+        watched.waiters -= 1
+        if watched.waiters <= 0:
+            del self._tasks[task_id]
+            if not watched.future.done():
+                watched.future.cancel()
+
+    def resolve(self, task_id: str, outcome: TaskOutcome) -> bool:
+        """Resolve a task from outside (webhook callback)
+
+        Outcomes of tasks that are not watched yet are kept for a later watch().
+
+        Returns:
+            True if a watched task was resolved
+        """
+        watched = self._tasks.pop(task_id, None)
+        if watched is None:
+            self._early_outcomes[task_id] = outcome
+            while len(self._early_outcomes) > self.max_early_outcomes:
+                self._early_outcomes.popitem(last=False)
+            return False
+        if not watched.future.done():
+            watched.future.set_result(outcome)
+        return True
+
+    @property
+    def watched_count(self) -> int:
+        return len(self._tasks)
+
+    def _reschedule(self, watched: WatchedTask, delay: float):
+        heapq.heappush(self._schedule, (time.monotonic() + delay, next(self._sequence), watched.task_id))
+        self._wakeup.set()
+
+    def _next_interval(self, watched: WatchedTask) -> float:
+        """Delay until the next check of a task"""
+        if watched.webhook:
+            return self.webhook_poll_interval
+        if watched.last_pending_at is None:
+            interval = self.min_interval
+        else:
+            backoff = 1.5 ** min(watched.unchanged_checks, 8)
+            interval = (self.min_interval if watched.status == "RUNNING" else self.queued_interval) * backoff
+        if self._expected_duration:
+            # Don't check before the task is likely done
+            remaining = watched.watched_at + self._expected_duration * 0.9 - time.monotonic()
+            interval = max(interval, remaining)
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    async def _acquire_request(self):
+        """Wait for the next request slot of the global budget"""
+        if self.max_requests_per_second <= 0:
+            return
+        now = time.monotonic()
+        start_at = max(now, self._next_request_at)
+        self._next_request_at = start_at + 1.0 / self.max_requests_per_second
+        if start_at > now:
+            await asyncio.sleep(start_at - now)
+        self.requests += 1
+
+    async def _run(self):
+        """Background loop: run the checks that are due"""
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            if not self._schedule:
+                await self._wakeup.wait()
+                continue
+            due, _, task_id = self._schedule[0]
+            if due > now:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), due - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._schedule)
+            watched = self._tasks.get(task_id)
+            if watched is None:
+                continue
+            await self._acquire_request()
+            check = asyncio.create_task(self._check(watched))
+            self._checks.add(check)
+            check.add_done_callback(self._checks.discard)
+
+    async def _check(self, watched: WatchedTask):
+        """Check one task, then resolve its future or schedule the next check"""
+        checked_at = time.monotonic()
+        try:
+            status, msg, outputs = await self._query(watched.task_id)
+        except Exception as e:
+            watched.errors += 1
+            logger.warning(f"Error checking RunningHub task {watched.task_id}: {e}")
+            if watched.task_id in self._tasks:
+                self._reschedule(watched, min(self.min_interval * 2 ** watched.errors, self.max_interval))
+            return
+
+        if self._tasks.get(watched.task_id) is not watched:
+            return  # Unwatched meanwhile
+
+        watched.errors = 0
+        if status in ("SUCCESS", "FAILED"):
+            if status == "SUCCESS" and watched.last_pending_at is not None:
+                # Completed between the last two checks, keep the lower bound: checking
+                # a bit early costs a request, checking late delays the result
+                self._record_duration(watched.last_pending_at - watched.watched_at)
+            del self._tasks[watched.task_id]
+            if not watched.future.done():
+                watched.future.set_result(TaskOutcome(status=status, msg=msg, outputs=outputs))
+            return
+
+        if status != watched.status:
+            logger.info(f"RunningHub task {watched.task_id} status: {status}")
+            watched.status = status
+            watched.unchanged_checks = 0
+        else:
+            watched.unchanged_checks += 1
+        watched.last_pending_at = checked_at
+        self._reschedule(watched, self._next_interval(watched))
+
+    async def _query(self, task_id: str) -> Tuple[str, str, Optional[List[Dict[str, Any]]]]:
+        """Query the state of a task
+
+        Returns:
+            (status, msg, outputs) - status is QUEUED, RUNNING, SUCCESS or FAILED,
+            outputs is set when they came with the response
+        """
+        if self.probe_outputs:
+            result = await self.client.probe_task_outputs(task_id)
+            code = result.get('code')
+            if code == 0:
+                return "SUCCESS", result.get('msg', ''), result.get('data') or []
+            if code in TASK_OUTPUT_CODES:
+                status = TASK_OUTPUT_CODES[code]
+                msg = result.get('msg', '')
+                data = result.get('data')
+                if status == "FAILED" and isinstance(data, dict) and data.get('failedReason'):
+                    msg = f"{msg}: {data['failedReason']}"
+                return status, msg, None
+            logger.debug(f"Unexpected outputs response for task {task_id}: {result.get('code')} {result.get('msg')}")
+
+        status_info = await self.client.query_task_status(task_id)
+        status = status_info['status']
+        if status not in ("QUEUED", "RUNNING", "SUCCESS", "FAILED"):
+            # Unknown state (e.g. transient API error), keep checking
+            raise Exception(f"Unexpected task status: {status} {status_info.get('msg', '')}")
+        return status, status_info.get('msg', ''), None
+
+    def _record_duration(self, duration: float):
+        """Update the moving average of observed run durations"""
+        if self._expected_duration is None:
+            self._expected_duration = duration
+        else:
+            self._expected_duration = 0.8 * self._expected_duration + 0.2 * duration
+
+    async def close(self):
+        """Stop the background loop and cancel all pending futures"""
+        tasks = [t for t in [self._loop_task, *self._checks] if t is not None]
+        for task in tasks:
+            task.cancel()
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        current = [t for t in tasks if t.get_loop() is loop]
+        if current:
+            await asyncio.gather(*current, return_exceptions=True)
+        for watched in self._tasks.values():
+            if not watched.future.done():
+                watched.future.cancel()
+        self._tasks.clear()
+        self._schedule.clear()
+        self._loop_task = None
@@ -0,0 +1,137 @@
+"""RunningHub webhook receiver - resolve task futures when RunningHub calls back"""
+
+import asyncio
+import secrets
+from typing import TYPE_CHECKING, Any, Dict, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from aiohttp import web
+
+from comfykit.comfyui.runninghub_watcher import TaskOutcome
+from comfykit.logger import logger
+from comfykit.utils import json_util
+
+if TYPE_CHECKING:
+    from comfykit.comfyui.runninghub_watcher import RunningHubTaskWatcher
+
+DEFAULT_WEBHOOK_PATH = "/runninghub/webhook"
+
+
+def parse_webhook_payload(payload: Dict[str, Any]) -> Optional[Tuple[str, TaskOutcome]]:
+    """Parse a RunningHub callback
+
+    RunningHub posts {"event": "TASK_END", "taskId": ..., "eventData": ...} where
+    eventData is (a JSON string of) the outputs response: code, msg and data.
+
+    Returns:
+        (task_id, outcome), or None if the payload is not a task end event
+    """
+    task_id = payload.get("taskId")
+    if not task_id or payload.get("event", "TASK_END") != "TASK_END":
+        return None
+
+    event_data = payload.get("eventData") or {}
+    if isinstance(event_data, str):
+        event_data = json_util.loads(event_data)
+
+    if event_data.get("code") == 0:
+        return str(task_id), TaskOutcome(status="SUCCESS", msg=event_data.get("msg", ""), outputs=event_data.get("data") or [])
+
+    msg = event_data.get("msg", "")
+    data = event_data.get("data")
+    if isinstance(data, dict) and data.get("failedReason"):
+        msg = f"{msg}: {data['failedReason']}"
+    return str(task_id), TaskOutcome(status="FAILED", msg=msg)
+
+
+class RunningHubWebhookReceiver:
+    """Embedded HTTP server receiving RunningHub task callbacks
+
+    Executors using a receiver pass its `url` as webhookUrl when creating tasks
+    and watch them with a slow safety-net poll only; the callback resolves the
+    task future right away.
+
+    The URL carries a random token, callbacks without it are rejected. If
+    callbacks reach another web server, forward their JSON body to
+    handle_payload() instead of starting the embedded one.
+    """
+
+    def __init__(self, public_url: Optional[str] = None, host: str = "0.0.0.0", port: Optional[int] = None,
+                 token: Optional[str] = None):
+        """Initialize webhook receiver
+
+        Args:
+            public_url: URL RunningHub can reach the receiver at, e.g. https://hooks.example.com/rh
+                       (default: http://127.0.0.1:<port>/runninghub/webhook, local testing only)
+            host: Interface to listen on
+            port: Port to listen on (default: port of public_url, or 8765)
+            token: Token required in callback URLs (default: random)
+        """
+        parsed = urlparse(public_url) if public_url else None
+        self.host = host
+        self.port = port or (parsed.port if parsed and parsed.port else 8765)
+        self.path = (parsed.path if parsed and parsed.path else DEFAULT_WEBHOOK_PATH)
+        self.public_url = public_url or f"http://127.0.0.1:{self.port}{self.path}"
+        self.token = token or secrets.token_urlsafe(16)
+        self._watchers: Set["RunningHubTaskWatcher"] = set()
+        self._runner: Optional[web.AppRunner] = None
+        self._start_lock = asyncio.Lock()
+        self.received = 0
+
+    @property
+    def url(self) -> str:
+        """Callback URL to pass as webhookUrl"""
+        separator = "&" if "?" in self.public_url else "?"
+        return f"{self.public_url}{separator}token={self.token}"
+
+    def register(self, watcher: "RunningHubTaskWatcher"):
+        """Resolve the tasks of a watcher from callbacks"""
+        self._watchers.add(watcher)
+
+    async def handle_payload(self, payload: Dict[str, Any]) -> bool:
+        """Handle a callback body
+
+        Returns:
+            True if a watched task was resolved
+        """
+        parsed = parse_webhook_payload(payload)
+        if parsed is None:
+            return False
+        task_id, outcome = parsed
+        self.received += 1
+        logger.info(f"RunningHub webhook: task {task_id} {outcome.status}")
+
+        resolved = False
+        for watcher in self._watchers:
+            resolved = watcher.resolve(task_id, outcome) or resolved
+        return resolved
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        if not secrets.compare_digest(request.query.get("token", ""), self.token):
+            return web.Response(status=403, text="invalid token")
+        try:
+            payload = await request.json(loads=json_util.loads)
+            await self.handle_payload(payload)
+        except (ValueError, AttributeError) as e:
+            logger.warning(f"Invalid RunningHub webhook payload: {e}")
+            return web.Response(status=400, text="invalid payload")
+        return web.json_response({"code": 0, "msg": "success"})
+
+    async def start(self):
+        """Start listening (no-op if already started)"""
+        async with self._start_lock:
+            if self._runner is not None:
+                return
+            app = web.Application()
+            app.router.add_post(self.path, self._handle)
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            await web.TCPSite(runner, self.host, self.port).start()
+            self._runner = runner
+            logger.info(f"RunningHub webhook receiver listening on {self.host}:{self.port}{self.path}")
+
+    async def close(self):
+        """Stop listening"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
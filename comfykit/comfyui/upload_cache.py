@@ -0,0 +1,183 @@
+"""Upload cache - upload each media input once per server/account"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from comfykit.logger import logger
+from comfykit.utils.os_util import get_cache_path
+
+# In-process memo key of file hashes: (absolute path, mtime in nanoseconds, size in bytes)
+FileHashKey = Tuple[str, int, int]
+
+
+class UploadCache:
+    """Persistent map of (content key, upload target) -> uploaded file name
+
+    Content keys are the sha256 of local files (memoized per file identity, so
+    a repeated input costs one stat) or the URL of remote inputs. Targets
+    identify where the file was uploaded (ComfyUI server, RunningHub account).
+
+    Entries are stored in a sqlite database shared by all processes, expire
+    after their TTL and are evicted least recently used first beyond
+    max_entries. Executors validate hits against the server when that is cheap.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_entries: int = 10000, max_hash_memo: int = 4096):
+        """Initialize upload cache
+
+        Args:
+            db_path: sqlite database path (default: <cache dir>/uploads.sqlite3)
+            max_entries: Maximum number of entries kept in the database
+            max_hash_memo: Maximum number of file hashes memoized in memory
+        """
+        self.db_path = db_path or get_cache_path("uploads.sqlite3")
+        self.max_entries = max_entries
+        self.max_hash_memo = max_hash_memo
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._hash_memo: "OrderedDict[FileHashKey, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _get_conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS uploads ("
+                " content_key TEXT NOT NULL,"
+                " target TEXT NOT NULL,"
+                " uploaded_name TEXT NOT NULL,"
+                " expires_at REAL,"
+                " last_used REAL NOT NULL,"
+                " PRIMARY KEY (content_key, target))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS uploads_last_used ON uploads (last_used)")
+            self._conn = conn
+        return self._conn
+
+    def _hash_file_sync(self, key: FileHashKey) -> str:
+        digest = hashlib.sha256()
+        with open(key[0], 'rb') as f:
+            while chunk := f.read(1024 * 1024):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    async def file_key(self, file_path: str) -> str:
+        """Get the content key of a local file (sha256, memoized by path/mtime/size)"""
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            file_hash = self._hash_memo.get(key)
+            if file_hash is not None:
+                self._hash_memo.move_to_end(key)
+                return f"sha256:{file_hash}"
+
+        file_hash = await asyncio.to_thread(self._hash_file_sync, key)
+        with self._lock:
+            self._hash_memo[key] = file_hash
+            while len(self._hash_memo) > self.max_hash_memo:
+                self._hash_memo.popitem(last=False)
+        return f"sha256:{file_hash}"
+
+    @staticmethod
+    def url_key(url: str) -> str:
+        """Get the content key of a remote input (the URL itself)"""
+        return f"url:{url}"
+
+    def get(self, content_key: str, target: str) -> Optional[str]:
+        """Get the uploaded file name, None if unknown or expired"""
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._get_conn()
+                row = conn.execute(
+                    "SELECT uploaded_name, expires_at FROM uploads WHERE content_key = ? AND target = ?",
+                    (content_key, target),
+                ).fetchone()
+                if row is None or (row[1] is not None and row[1] <= now):
+                    if row is not None:
+                        conn.execute("DELETE FROM uploads WHERE content_key = ? AND target = ?", (content_key, target))
+                    self.misses += 1
+                    return None
+                conn.execute(
+                    "UPDATE uploads SET last_used = ? WHERE content_key = ? AND target = ?",
+                    (now, content_key, target),
+                )
+                self.hits += 1
+                return row[0]
+        except sqlite3.Error as e:
+            logger.warning(f"Upload cache lookup failed: {e}")
+            return None
+
+    def put(self, content_key: str, target: str, uploaded_name: str, ttl: Optional[float] = None):
+        """Remember an upload
+
+        Args:
+            content_key: Content key (see file_key / url_key)
+            target: Upload target (server / account)
+            uploaded_name: File name returned by the upload
+            ttl: Seconds the entry is valid (None: until evicted or invalidated)
+        """
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        try:
+            with self._lock:
+                conn = self._get_conn()
+                conn.execute(
+                    "INSERT OR REPLACE INTO uploads (content_key, target, uploaded_name, expires_at, last_used)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (content_key, target, uploaded_name, expires_at, now),
+                )
+                conn.execute("DELETE FROM uploads WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+                conn.execute(
+                    "DELETE FROM uploads WHERE rowid IN ("
+                    " SELECT rowid FROM uploads ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Upload cache update failed: {e}")
+
+    def invalidate(self, content_key: str, target: str):
+        """Forget an upload (e.g. the file is gone from the server)"""
+        try:
+            with self._lock:
+                self._get_conn().execute(
+                    "DELETE FROM uploads WHERE content_key = ? AND target = ?", (content_key, target)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Upload cache update failed: {e}")
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._get_conn().execute("DELETE FROM uploads")
+            self._hash_memo.clear()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_upload_cache: Optional[UploadCache] = None
+
+
+def get_upload_cache() -> UploadCache:
+    """Get the process-wide upload cache
+
+    The database path can be configured with the COMFYKIT_UPLOAD_CACHE_PATH env var.
+    """
+    global _upload_cache
+    if _upload_cache is None:
+        _upload_cache = UploadCache(db_path=os.getenv("COMFYKIT_UPLOAD_CACHE_PATH") or None)
+    return _upload_cache
@@ -1,28 +1,84 @@
 import asyncio
-import json
-import os
+import logging
 import time
-import uuid
-from typing import Any, Dict, Optional
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, List, Optional
 from urllib.parse import urlparse, urlunparse
 
-import websockets
-
-from comfykit.comfyui.base_executor import ComfyUIExecutor
+from comfykit.comfyui.base_executor import ComfyUIExecutor, PreparedPrompt
+from comfykit.comfyui.models import (
+    CachedEvent,
+    CompletedEvent,
+    ExecuteResult,
+    NodeOutputEvent,
+    NodeStartedEvent,
+    PreviewEvent,
+    ProgressEvent,
+    QueuedEvent,
+    StreamEvent,
+)
+from comfykit.comfyui.websocket_manager import PREVIEW_MESSAGE_TYPE, RECONNECTED_MESSAGE_TYPE, WebSocketConnectionManager
 from comfykit.logger import logger
-from comfykit.comfyui.models import ExecuteResult
+from comfykit.utils import json_util
 
 
 class WebSocketExecutor(ComfyUIExecutor):
     """WebSocket executor for ComfyUI"""
 
-    def __init__(self, base_url: str = None, api_key: str = None, cookies: str = None):
-        super().__init__(base_url, api_key, cookies)
+    def __init__(self, base_url: str = None, api_key: str = None, cookies: str = None, **kwargs):
+        super().__init__(base_url, api_key, cookies, **kwargs)
         self._parse_ws_url()
 
         logger.info(f"HTTP Base URL: {self.http_base_url}")
         logger.info(f"WebSocket Base URL: {self.ws_base_url}")
 
+        self._ws_manager: Optional[WebSocketConnectionManager] = None
+        self._ws_manager_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_ws_manager(self) -> WebSocketConnectionManager:
+        """Get or create the connection manager shared by all executions"""
+        loop = asyncio.get_running_loop()
+        if self._ws_manager is None or self._ws_manager_loop is not loop:
+            self._ws_manager = WebSocketConnectionManager(
+                self.ws_base_url,
+                headers_provider=self._get_ws_headers,
+                on_auth_error=self._check_auth_status,
+            )
+            self._ws_manager_loop = loop
+        return self._ws_manager
+
+    async def _get_ws_headers(self) -> Dict[str, str]:
+        """Prepare extra headers for WebSocket connection, include cookies"""
+        additional_headers = {}
+        cookies = await self._parse_comfyui_cookies()
+        if cookies:
+            try:
+                if isinstance(cookies, dict):
+                    cookie_string = "; ".join([f"{k}={v}" for k, v in cookies.items()])
+                else:
+                    cookie_string = str(cookies)
+
+                additional_headers["Cookie"] = cookie_string
+                logger.debug(f"WebSocket connection will use cookies: {cookie_string[:50]}...")
+            except Exception as e:
+                logger.warning(f"Parse WebSocket cookies failed: {e}")
+        return additional_headers
+
+    async def close(self):
+        """Close the shared WebSocket and the pooled HTTP session"""
+        if self._ws_manager is not None:
+            await self._ws_manager.close()
+            self._ws_manager = None
+            self._ws_manager_loop = None
+        await super().close()
+
+    def _has_interesting_output(self, output: Dict[str, Any]) -> bool:
+        """Check if there are outputs we are interested in"""
+        return bool(output.get('images')
+                    or output.get('gifs')
+                    or output.get('audio')
+                    or output.get('text'))
+
     def _parse_ws_url(self):
         """Parse API URL and build WebSocket URL"""
         # Use standard URL parser to parse base_url
@@ -43,38 +99,6 @@ class WebSocketExecutor(ComfyUIExecutor):
         # Build HTTP URL, keep original structure
         self.http_base_url = urlunparse((http_scheme, ws_netloc, base_path, '', '', ''))
 
-    async def _queue_prompt(self, workflow: Dict[str, Any], client_id: str, prompt_ext_params: Optional[Dict[str, Any]] = None) -> str:
-        """Submit workflow to queue"""
-        prompt_data = {
-            "prompt": workflow,
-            "client_id": client_id
-        }
-
-        # Update all parameters of prompt_data and prompt_ext_params
-        if prompt_ext_params:
-            prompt_data.update(prompt_ext_params)
-
-        json_data = json.dumps(prompt_data)
-
-        # Use aiohttp to send request
-        prompt_url = f"{self.base_url}/prompt"
-        async with self.get_comfyui_session() as session:
-            async with session.post(
-                    prompt_url,
-                    data=json_data,
-                    headers={"Content-Type": "application/json"}
-                ) as response:
-                if response.status != 200:
-                    response_text = await response.text()
-                    raise Exception(f"Submit workflow failed: [{response.status}] {response_text}")
-
-                result = await response.json()
-                prompt_id = result.get("prompt_id")
-                if not prompt_id:
-                    raise Exception(f"Get prompt_id failed: {result}")
-                logger.info(f"Task submitted: {prompt_id}")
-                return prompt_id
-
     def _parse_ws_message(self, message: dict, prompt_id: str) -> tuple[bool, dict]:
         """
         Parse websocket message
@@ -117,36 +141,27 @@ class WebSocketExecutor(ComfyUIExecutor):
 
                 # Collect text outputs
                 if "text" in output:
-                    texts = output["text"]
-                    if isinstance(texts, str):
-                        texts = [texts]
-                    elif not isinstance(texts, list):
-                        texts = [str(texts)]
-                    output_id_2_texts[node_id] = texts
+                    output_id_2_texts[node_id] = self._get_output_texts(output)
 
             result = ExecuteResult(
                 status="completed",
                 prompt_id=prompt_id,
-                outputs=collected_outputs
+                outputs=collected_outputs if self.keep_outputs else None
             )
 
             # If there is a mapping, map by variable name
             if output_id_2_images:
                 result.images_by_var = self._map_outputs_by_var(output_id_2_var or {}, output_id_2_images)
-                result.images = self._extend_flat_list_from_dict(result.images_by_var)
 
             if output_id_2_videos:
                 result.videos_by_var = self._map_outputs_by_var(output_id_2_var or {}, output_id_2_videos)
-                result.videos = self._extend_flat_list_from_dict(result.videos_by_var)
 
             if output_id_2_audios:
                 result.audios_by_var = self._map_outputs_by_var(output_id_2_var or {}, output_id_2_audios)
-                result.audios = self._extend_flat_list_from_dict(result.audios_by_var)
 
             # Process texts/texts_by_var
             if output_id_2_texts:
                 result.texts_by_var = self._map_outputs_by_var(output_id_2_var or {}, output_id_2_texts)
-                result.texts = self._extend_flat_list_from_dict(result.texts_by_var)
 
             if not (result.images or result.videos or result.audios or result.texts):
                 logger.warning("No outputs found")
@@ -164,211 +179,247 @@ class WebSocketExecutor(ComfyUIExecutor):
                 msg=f"Build execution result from collected WebSocket outputs failed: {str(e)}"
             )
 
-    async def execute_workflow(self, workflow_file: str, params: Dict[str, Any] = None) -> ExecuteResult:
-        """Execute workflow (WebSocket way)"""
+    def _get_output_texts(self, output: Dict[str, Any]) -> List[str]:
+        """Get text outputs of a node as a list of strings"""
+        texts = output["text"]
+        if isinstance(texts, str):
+            return [texts]
+        elif not isinstance(texts, list):
+            return [str(texts)]
+        return texts
+
+    def _build_node_output_event(self, prompt_id: str, node_id: str, output: Dict[str, Any], output_id_2_var: Dict[str, str]) -> NodeOutputEvent:
+        """Build the event announcing outputs of one node"""
+        images, videos, audios = self._split_media_by_suffix(output, self.http_base_url)
+        # Outputs are final once the node finished, start downloading before the prompt completes
+        self._prefetch_media(images + videos + audios)
+        return NodeOutputEvent(
+            prompt_id=prompt_id,
+            node=str(node_id),
+            var=output_id_2_var.get(node_id),
+            images=images,
+            videos=videos,
+            audios=audios,
+            texts=self._get_output_texts(output) if "text" in output else [],
+        )
+
+    async def execute_prepared(self, prepared: PreparedPrompt) -> ExecuteResult:
+        """Submit a prepared workflow and wait for its result (WebSocket way)"""
+        result = None
+        async for event in self.stream_prepared(prepared):
+            if isinstance(event, CompletedEvent):
+                result = event.result
+        return result
+
+    async def stream_prepared(self, prepared: PreparedPrompt, previews: bool = False) -> AsyncIterator[StreamEvent]:
+        """Submit a prepared workflow and yield its execution events (WebSocket way)
+
+        Args:
+            prepared: Prepared workflow
+            previews: Also yield latent preview images (PreviewEvent) sent while sampling
+        """
+        cached = await self._get_cached_result(prepared.cache_key)
+        if cached is not None:
+            yield CompletedEvent(prompt_id=cached.prompt_id, result=cached)
+            return
+
+        start_time = time.time()
+
+        # All executions share the manager's persistent socket and stable client ID
+        ws_manager = self._get_ws_manager()
+        client_id = ws_manager.client_id
+
+        # First establish WebSocket connection, then submit task
+        timeout = 30 * 60  # Default 30 minutes timeout
+
+        # For collecting nodes with outputs
+        collected_outputs = {}
+        prompt_id = None
+
         try:
-            start_time = time.time()
-
-            if not os.path.exists(workflow_file):
-                logger.error(f"Workflow file does not exist: {workflow_file}")
-                return ExecuteResult(status="error", msg=f"Workflow file does not exist: {workflow_file}")
-
-            # Get workflow metadata
-            metadata = self.get_workflow_metadata(workflow_file)
-            if not metadata:
-                return ExecuteResult(status="error", msg="Cannot parse workflow metadata")
-
-            # Load workflow JSON
-            with open(workflow_file, 'r', encoding='utf-8') as f:
-                workflow_data = json.load(f)
-
-            if not workflow_data:
-                return ExecuteResult(status="error", msg="Workflow data is missing")
-
-            # Use new parameter mapping logic
-            if params:
-                workflow_data = await self._apply_params_to_workflow(workflow_data, metadata, params)
-            else:
-                # Even if no parameters are passed, default values need to be applied
-                workflow_data = await self._apply_params_to_workflow(workflow_data, metadata, {})
-
-            # Replace any seed == 0 with a random 63-bit seed before submission
-            workflow_data, _ = self._randomize_seed_in_workflow(workflow_data)
-
-            # Extract output node information from metadata
-            output_id_2_var = self._extract_output_nodes(metadata)
-
-            # Generate client ID
-            client_id = str(uuid.uuid4())
-
-            # Prepare extra parameters
-            prompt_ext_params = {}
-            if self.api_key:
-                prompt_ext_params = {
-                    "extra_data": {
-                        "api_key_comfy_org": self.api_key
-                    }
-                }
-            else:
-                logger.debug("COMFYUI_API_KEY is not set")
-
-            # First establish WebSocket connection, then submit task
-            timeout = 30 * 60  # Default 30 minutes timeout
-
-            # Build WebSocket URL
-            ws_url = f"{self.ws_base_url}?clientId={client_id}"
-            logger.info(f"WebSocket URL: {ws_url}")
-            logger.info("Prepare to connect websocket service")
-
-            # For collecting nodes with outputs
-            collected_outputs = {}
-            prompt_id = None
+            # Establish (or reuse) WebSocket connection
+            await ws_manager.ensure_connected()
+            logger.info('WebSocket connection established, now submit workflow')
 
+            # After connection established, immediately submit workflow
             try:
-                # Prepare extra headers for WebSocket connection, include cookies
-                additional_headers = {}
-                cookies = await self._parse_comfyui_cookies()
-                if cookies:
-                    try:
-                        if isinstance(cookies, dict):
-                            cookie_string = "; ".join([f"{k}={v}" for k, v in cookies.items()])
-                        else:
-                            cookie_string = str(cookies)
+                prompt_id = await self._queue_prompt(prepared.workflow_data, client_id, prepared.prompt_ext_params)
+            except Exception as e:
+                error_message = f"Submit workflow failed: [{type(e)}] {str(e)}"
+                logger.error(error_message)
+                yield CompletedEvent(result=ExecuteResult(status="error", msg=error_message))
+                return
 
-                        additional_headers["Cookie"] = cookie_string
-                        logger.debug(f"WebSocket connection will use cookies: {cookie_string[:50]}...")
-                    except Exception as e:
-                        logger.warning(f"Parse WebSocket cookies failed: {e}")
+            logger.info(f"Workflow submitted, prompt_id: {prompt_id}, now wait for result")
+            queue = ws_manager.subscribe(prompt_id, previews=previews)
+            yield QueuedEvent(prompt_id=prompt_id)
 
-                # Establish WebSocket connection
-                async with websockets.connect(ws_url, additional_headers=additional_headers) as websocket:
-                    logger.info('WebSocket connection established, now submit workflow')
+            try:
+                while True:
+                    # Check timeout
+                    elapsed = time.time() - start_time
+                    if elapsed > timeout:
+                        logger.warning(f"WebSocket timeout ({timeout} seconds)")
+                        result = ExecuteResult(
+                            status="timeout",
+                            prompt_id=prompt_id,
+                            msg=f"WebSocket timeout ({timeout} seconds)",
+                            duration=elapsed
+                        )
+                        yield CompletedEvent(prompt_id=prompt_id, result=result)
+                        return
 
-                    # After connection established, immediately submit workflow
                     try:
-                        prompt_id = await self._queue_prompt(workflow_data, client_id, prompt_ext_params)
-                    except Exception as e:
-                        error_message = f"Submit workflow failed: [{type(e)}] {str(e)}"
-                        logger.error(error_message)
-                        return ExecuteResult(status="error", msg=error_message)
-
-                    logger.info(f"Workflow submitted, prompt_id: {prompt_id}, now wait for result")
-
-                    while True:
-                        # Check timeout
-                        elapsed = time.time() - start_time
-                        if elapsed > timeout:
-                            logger.warning(f"WebSocket timeout ({timeout} seconds)")
+                        # Wait for message, set shorter timeout to check total timeout
+                        message = await asyncio.wait_for(queue.get(), timeout=3.0)
+                    except asyncio.TimeoutError:
+                        # Wait for message timeout, continue loop to check total timeout
+                        continue
+
+                    # Process different types of messages
+                    msg_type = message.get('type')
+                    data = message.get('data', {})
+
+                    if msg_type == PREVIEW_MESSAGE_TYPE:
+                        yield PreviewEvent(prompt_id=prompt_id, node=data['node'], mime_type=data['mime_type'], image=data['image'])
+                        continue
+
+                    if msg_type == RECONNECTED_MESSAGE_TYPE:
+                        # Messages may have been lost while disconnected, check history
+                        prompt_history = await self._get_prompt_history(prompt_id)
+                        if prompt_history is None:
+                            continue
+                        status = prompt_history.get("status") or {}
+                        if status.get("status_str") == "error":
                             result = ExecuteResult(
-                                status="timeout",
+                                status="error",
                                 prompt_id=prompt_id,
-                                msg=f"WebSocket timeout ({timeout} seconds)",
-                                duration=elapsed
+                                msg="Execution failed while WebSocket was disconnected",
+                                duration=time.time() - start_time
                             )
-                            return result
-
-                        try:
-                            # Wait for message, set shorter timeout to check total timeout
-                            message_str = await asyncio.wait_for(websocket.recv(), timeout=3.0)
-
-                            if not isinstance(message_str, str):
-                                continue
-
-                            message = json.loads(message_str)
-
-                            # Print full message for target prompt_id for debugging
-                            if message.get('data', {}).get('prompt_id') == prompt_id:
-                                logger.debug(f'Received target WebSocket message (prompt_id: {prompt_id}): {json.dumps(message, ensure_ascii=False)}')
-
-                                # Process different types of messages
-                                msg_type = message.get('type')
-                                data = message.get('data', {})
-
-                                if msg_type == 'execution_cached':
-                                    # Process cached execution message
-                                    cached_nodes = data.get('nodes', [])
-                                    logger.debug(f"Detected cached execution, skip nodes: {cached_nodes}")
-
-                                elif msg_type == 'executed':
-                                    # Collect nodes with outputs
-                                    node_id = data.get('node')
-                                    output = data.get('output')
-                                    if output and node_id:
-                                        # Check if there are outputs we are interested in
-                                        has_media = output.get('images') \
-                                            or output.get('gifs') \
-                                            or output.get('audio') \
-                                            or output.get('text')
-                                        if has_media:
-                                            logger.info(f"Collected outputs from node {node_id}")
-                                            collected_outputs[node_id] = output
-
-                                elif msg_type == 'execution_error':
-                                    # Process execution error
-                                    error_message = data.get('exception_message', 'Unknown error')
-                                    logger.error(f"Execution error: {error_message}")
-                                    return ExecuteResult(
-                                        status="error",
-                                        prompt_id=prompt_id,
-                                        msg=error_message,
-                                        duration=time.time() - start_time
-                                    )
-                            else:
-                                # For status message, record queue status
-                                if message.get('type') == 'status':
-                                    queue_remaining = message.get('data', {}).get('status', {}).get('exec_info', {}).get('queue_remaining', 'unknown')
-                                    logger.debug(f'Queue status updated: remaining tasks {queue_remaining} ')
-                                else:
-                                    logger.debug(f'Received other WebSocket message: {message}')
-
-                            # Parse message
-                            invoke_completed, parsed_message = self._parse_ws_message(message, prompt_id)
-
-                            if invoke_completed:
-                                logger.info('WebSocket detected execution completed')
-
-                                # Set execution duration
-                                duration = time.time() - start_time
-
-                                # If there are collected outputs, use them to build result
-                                if collected_outputs:
-                                    result = self._build_result_from_collected_outputs(collected_outputs, prompt_id, output_id_2_var)
-                                    result.duration = duration
-                                    return result
-                                else:
-                                    # WebSocket way did not collect any outputs, return error
-                                    logger.warning("WebSocket did not collect any outputs")
-                                    result = ExecuteResult(
-                                        status="error",
-                                        prompt_id=prompt_id,
-                                        msg="WebSocket did not collect any outputs",
-                                        duration=duration
-                                    )
-                                    return result
-
-                        except asyncio.TimeoutError:
-                            # Wait for message timeout, continue loop to check total timeout
+                            yield CompletedEvent(prompt_id=prompt_id, result=result)
+                            return
+                        if "outputs" not in prompt_history:
                             continue
-                        except websockets.exceptions.ConnectionClosed:
-                            logger.warning("WebSocket connection closed")
+                        logger.info("Execution completed while WebSocket was disconnected, using history outputs")
+                        for node_id, output in prompt_history["outputs"].items():
+                            if self._has_interesting_output(output) and node_id not in collected_outputs:
+                                collected_outputs[node_id] = output
+                                yield self._build_node_output_event(prompt_id, node_id, output, prepared.output_id_2_var)
+                        # Treat as completed
+                        message = {'type': 'executing', 'data': {'node': None, 'prompt_id': prompt_id}}
+
+                    # Print full message for target prompt_id for debugging
+                    # Serializing every message is costly, only do it when it is logged
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(f'Received target WebSocket message (prompt_id: {prompt_id}): {json_util.dumps(message)}')
+
+                    if msg_type == 'execution_cached':
+                        # Process cached execution message
+                        cached_nodes = data.get('nodes', [])
+                        logger.debug(f"Detected cached execution, skip nodes: {cached_nodes}")
+                        if cached_nodes:
+                            yield CachedEvent(prompt_id=prompt_id, nodes=[str(node) for node in cached_nodes])
+
+                    elif msg_type == 'executing':
+                        node_id = data.get('node')
+                        if node_id is not None:
+                            yield NodeStartedEvent(prompt_id=prompt_id, node=str(node_id))
+
+                    elif msg_type == 'progress':
+                        node_id = data.get('node')
+                        yield ProgressEvent(
+                            prompt_id=prompt_id,
+                            node=str(node_id) if node_id is not None else None,
+                            value=data.get('value', 0),
+                            max=data.get('max', 0),
+                        )
+
+                    elif msg_type == 'executed':
+                        # Collect nodes with outputs
+                        node_id = data.get('node')
+                        output = data.get('output')
+                        if output and node_id and self._has_interesting_output(output):
+                            logger.info(f"Collected outputs from node {node_id}")
+                            collected_outputs[node_id] = output
+                            yield self._build_node_output_event(prompt_id, node_id, output, prepared.output_id_2_var)
+
+                    elif msg_type == 'execution_error':
+                        # Process execution error
+                        error_message = data.get('exception_message', 'Unknown error')
+                        logger.error(f"Execution error: {error_message}")
+                        result = ExecuteResult(
+                            status="error",
+                            prompt_id=prompt_id,
+                            msg=error_message,
+                            duration=time.time() - start_time
+                        )
+                        yield CompletedEvent(prompt_id=prompt_id, result=result)
+                        return
+
+                    # Parse message
+                    invoke_completed, parsed_message = self._parse_ws_message(message, prompt_id)
+
+                    if invoke_completed:
+                        logger.info('WebSocket detected execution completed')
+
+                        # Set execution duration
+                        duration = time.time() - start_time
+
+                        # If there are collected outputs, use them to build result
+                        if collected_outputs:
+                            result = self._build_result_from_collected_outputs(collected_outputs, prompt_id, prepared.output_id_2_var)
+                            result.duration = duration
+                            self._attach_media(result)
+                            await self._store_result(prepared.cache_key, result)
+                        else:
+                            # WebSocket way did not collect any outputs, return error
+                            logger.warning("WebSocket did not collect any outputs")
                             result = ExecuteResult(
                                 status="error",
                                 prompt_id=prompt_id,
-                                msg="WebSocket connection closed",
-                                duration=time.time() - start_time
+                                msg="WebSocket did not collect any outputs",
+                                duration=duration
                             )
-                            return result
+                        yield CompletedEvent(prompt_id=prompt_id, result=result)
+                        return
+            finally:
+                ws_manager.unsubscribe(prompt_id)
+
+        except Exception as e:
+            logger.error(f"WebSocket connection or execution exception: {str(e)}")
+            result = ExecuteResult(
+                status="error",
+                prompt_id=prompt_id,
+                msg=f"WebSocket connection or execution exception: {str(e)}",
+                duration=time.time() - start_time
+            )
+            yield CompletedEvent(prompt_id=prompt_id, result=result)
 
+    async def execute_workflow(self, workflow_file: str, params: Dict[str, Any] = None) -> ExecuteResult:
+        """Execute workflow (WebSocket way)"""
+        try:
+            try:
+                prepared = await self.prepare_workflow(workflow_file, params)
             except Exception as e:
-                logger.error(f"WebSocket connection or execution exception: {str(e)}")
-                result = ExecuteResult(
-                    status="error",
-                    prompt_id=prompt_id,
-                    msg=f"WebSocket connection or execution exception: {str(e)}",
-                    duration=time.time() - start_time
-                )
-                return result
+                logger.error(f"Prepare workflow failed: {str(e)}")
+                return ExecuteResult(status="error", msg=str(e))
+
+            return await self.execute_prepared(prepared)
 
         except Exception as e:
             logger.error(f"Execute workflow failed: {str(e)}", exc_info=True)
             return ExecuteResult(status="error", msg=str(e))
+
+    async def stream_workflow(self, workflow_file: str, params: Dict[str, Any] = None, previews: bool = False) -> AsyncIterator[StreamEvent]:
+        """Execute workflow and yield execution events as they arrive (WebSocket way)"""
+        try:
+            prepared = await self.prepare_workflow(workflow_file, params)
+        except Exception as e:
+            logger.error(f"Prepare workflow failed: {str(e)}")
+            yield CompletedEvent(result=ExecuteResult(status="error", msg=str(e)))
+            return
+
+        async with aclosing(self.stream_prepared(prepared, previews=previews)) as events:
+            async for event in events:
+                yield event
@@ -0,0 +1,368 @@
+"""WebSocket connection manager - one persistent ComfyUI socket shared by all executions"""
+
+import asyncio
+import logging
+import re
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
+
+import websockets
+
+from comfykit.logger import logger
+from comfykit.utils import json_util
+
+# Synthetic message put into every subscriber queue after the socket reconnected.
+# Messages sent while disconnected are lost, so subscribers should re-check /history.
+RECONNECTED_MESSAGE_TYPE = "comfykit_reconnected"
+
+# Synthetic message carrying a decoded binary preview frame, only delivered to
+# subscribers that asked for previews. data.image is a memoryview into the frame.
+PREVIEW_MESSAGE_TYPE = "comfykit_preview"
+
+# Binary frame event types (comfy_execution BinaryEventTypes)
+BINARY_PREVIEW_IMAGE = 1
+BINARY_PREVIEW_IMAGE_WITH_METADATA = 4
+
+# Image format codes of BINARY_PREVIEW_IMAGE frames
+PREVIEW_IMAGE_FORMATS = {1: "image/jpeg", 2: "image/png"}
+
+# Frame types whose only prompt_id is data.prompt_id (no free-form payload that
+# could contain one), safe to route by a peeked prompt_id without decoding
+PEEKABLE_MESSAGE_TYPES = {
+    "execution_start", "execution_cached", "executing", "progress", "progress_state",
+    "execution_success", "execution_interrupted",
+}
+
+# Type and prompt_id of a text frame, as serialized by ComfyUI
+_FRAME_TYPE_PATTERN = re.compile(r'\{\s*"type"\s*:\s*"([^"\\]*)"')
+_FRAME_PROMPT_ID_PATTERN = re.compile(r'"prompt_id"\s*:\s*"([^"\\]*)"')
+
+
+class WebSocketConnectionManager:
+    """Keeps one WebSocket to ComfyUI open with a stable client_id
+
+    ComfyUI routes execution messages to the client_id a prompt was submitted
+    with, so every execution of the executor can submit with the same client_id
+    and share this socket. Incoming messages are demultiplexed by prompt_id into
+    per-prompt queues (see subscribe()).
+
+    Messages for a prompt_id that nobody subscribed to yet are buffered for a
+    short while, because ComfyUI may start executing (and sending messages)
+    before the /prompt response carrying the prompt_id arrives.
+
+    Binary latent preview frames are only decoded while at least one
+    subscriber asked for previews, and are attributed to the prompt that is
+    currently executing. They are not buffered for unsubscribed prompts.
+
+    Text frames are pre-filtered before JSON decoding: frames without a
+    prompt_id (status broadcasts, monitoring plugins) are only decoded for
+    debug logging, and progress/lifecycle frames of unsubscribed prompts are
+    buffered raw and decoded only if their prompt gets subscribed.
+    """
+
+    def __init__(
+        self,
+        ws_base_url: str,
+        headers_provider: Optional[Callable[[], Awaitable[Dict[str, str]]]] = None,
+        client_id: Optional[str] = None,
+        connect_timeout: float = 10.0,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+        orphan_ttl: float = 60.0,
+        on_auth_error: Optional[Callable[[int], None]] = None,
+        prefilter: bool = True,
+    ):
+        """Initialize connection manager
+
+        Args:
+            ws_base_url: ComfyUI WebSocket URL (e.g. ws://127.0.0.1:8188/ws)
+            headers_provider: Async callable returning extra handshake headers (e.g. cookies),
+                              called on every (re)connect
+            client_id: Stable client ID used for the socket and all submissions (default: random)
+            connect_timeout: Seconds ensure_connected() waits for the socket
+            reconnect_delay: Initial delay between reconnect attempts (doubles up to max_reconnect_delay)
+            max_reconnect_delay: Maximum delay between reconnect attempts
+            orphan_ttl: Seconds messages for unsubscribed prompts are kept
+            on_auth_error: Called with the HTTP status when the handshake is rejected with 401/403
+            prefilter: Skip decoding frames that are not needed (see class docstring)
+        """
+        self.ws_base_url = ws_base_url
+        self.client_id = client_id or str(uuid.uuid4())
+        self.connect_timeout = connect_timeout
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.orphan_ttl = orphan_ttl
+        self._headers_provider = headers_provider
+        self._on_auth_error = on_auth_error
+        self.prefilter = prefilter
+
+        self._subscribers: Dict[str, asyncio.Queue] = {}
+        self._preview_subscribers: Set[str] = set()
+        self._executing_prompt_id: Optional[str] = None
+        # Buffered messages of unsubscribed prompts, decoded or still raw (str)
+        self._orphans: "OrderedDict[str, Tuple[float, List[Union[str, Dict[str, Any]]]]]" = OrderedDict()
+        self._connected = asyncio.Event()
+        self._reader_task: Optional[asyncio.Task] = None
+        self._websocket = None
+        self._last_error: Optional[Exception] = None
+        self._closed = False
+
+    @property
+    def ws_url(self) -> str:
+        """WebSocket URL including the client ID"""
+        return f"{self.ws_base_url}?clientId={self.client_id}"
+
+    @property
+    def is_connected(self) -> bool:
+        return self._connected.is_set()
+
+    async def ensure_connected(self):
+        """Start the background reader if needed and wait until the socket is open"""
+        if self._closed:
+            raise Exception("WebSocket connection manager is closed")
+        if self._reader_task is None or self._reader_task.done():
+            self._reader_task = asyncio.create_task(self._run())
+        if self._connected.is_set():
+            return
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout=self.connect_timeout)
+        except asyncio.TimeoutError:
+            raise Exception(f"WebSocket connection failed: {self._last_error or 'timeout'}")
+
+    def subscribe(self, prompt_id: str, previews: bool = False) -> asyncio.Queue:
+        """Register a prompt and get the queue its messages are delivered to
+
+        Messages that arrived before subscribing are delivered first.
+
+        Args:
+            prompt_id: Prompt to receive messages for
+            previews: Also deliver decoded binary preview frames (PREVIEW_MESSAGE_TYPE)
+        """
+        queue = asyncio.Queue()
+        self._subscribers[prompt_id] = queue
+        if previews:
+            self._preview_subscribers.add(prompt_id)
+        orphan = self._orphans.pop(prompt_id, None)
+        if orphan:
+            for message in orphan[1]:
+                if isinstance(message, str):
+                    message = self._decode(message)
+                    if message is None:
+                        continue
+                    self._track_executing_prompt(message, prompt_id)
+                queue.put_nowait(message)
+        return queue
+
+    def unsubscribe(self, prompt_id: str):
+        """Stop delivering messages for a prompt"""
+        self._subscribers.pop(prompt_id, None)
+        self._preview_subscribers.discard(prompt_id)
+
+    def _get_prompt_id(self, message: Dict[str, Any]) -> Optional[str]:
+        """Extract prompt_id from a ComfyUI message"""
+        data = message.get('data')
+        if isinstance(data, dict):
+            return data.get('prompt_id')
+        return None
+
+    def _add_orphan(self, prompt_id: str, message: Union[str, Dict[str, Any]]):
+        """Buffer a message for a prompt nobody subscribed to yet"""
+        now = time.monotonic()
+        entry = self._orphans.get(prompt_id)
+        if entry is None:
+            entry = (now, [])
+            self._orphans[prompt_id] = entry
+        entry[1].append(message)
+
+        # Drop buffers of prompts that were never subscribed (oldest first)
+        while self._orphans:
+            oldest_id, (created_at, _) = next(iter(self._orphans.items()))
+            if now - created_at <= self.orphan_ttl:
+                break
+            del self._orphans[oldest_id]
+
+    def _decode(self, message_str: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json_util.loads(message_str)
+        except ValueError:
+            logger.warning(f"Received invalid WebSocket message: {message_str[:200]}")
+            return None
+
+    def _prefilter(self, message_str: str) -> bool:
+        """Handle a text frame without decoding it if possible
+
+        Only skips work: frames that cannot be classified reliably are left
+        to the full decode.
+
+        Returns:
+            True if the frame was handled (skipped or buffered raw)
+        """
+        if '"prompt_id"' not in message_str:
+            # Status broadcasts and plugin messages are only logged
+            return not logger.isEnabledFor(logging.DEBUG)
+
+        type_match = _FRAME_TYPE_PATTERN.match(message_str)
+        if type_match is None or type_match.group(1) not in PEEKABLE_MESSAGE_TYPES:
+            return False
+        prompt_match = _FRAME_PROMPT_ID_PATTERN.search(message_str)
+        if prompt_match is None:
+            return False
+        prompt_id = prompt_match.group(1)
+        if prompt_id in self._subscribers:
+            return False
+
+        # Unsubscribed prompt (ours before /prompt returned, or another client's)
+        self._add_orphan(prompt_id, message_str)
+        return True
+
+    def _dispatch(self, message_str: str):
+        """Route a text message to the subscriber of its prompt_id"""
+        if self.prefilter and self._prefilter(message_str):
+            return
+
+        message = self._decode(message_str)
+        if message is None:
+            return
+
+        prompt_id = self._get_prompt_id(message)
+        self._track_executing_prompt(message, prompt_id)
+        if prompt_id is None:
+            # For status message, record queue status
+            if message.get('type') == 'status':
+                queue_remaining = message.get('data', {}).get('status', {}).get('exec_info', {}).get('queue_remaining', 'unknown')
+                logger.debug(f'Queue status updated: remaining tasks {queue_remaining} ')
+            else:
+                logger.debug(f'Received other WebSocket message: {message}')
+            return
+
+        queue = self._subscribers.get(prompt_id)
+        if queue is not None:
+            queue.put_nowait(message)
+        else:
+            self._add_orphan(prompt_id, message)
+
+    def _track_executing_prompt(self, message: Dict[str, Any], prompt_id: Optional[str]):
+        """Remember which prompt is executing, binary preview frames carry no prompt_id"""
+        msg_type = message.get('type')
+        if prompt_id is None:
+            return
+        if msg_type == 'execution_start':
+            self._executing_prompt_id = prompt_id
+        elif msg_type == 'executing':
+            if message['data'].get('node') is None:
+                if self._executing_prompt_id == prompt_id:
+                    self._executing_prompt_id = None
+            else:
+                self._executing_prompt_id = prompt_id
+        elif msg_type in ('execution_success', 'execution_error', 'execution_interrupted'):
+            if self._executing_prompt_id == prompt_id:
+                self._executing_prompt_id = None
+
+    def _dispatch_binary(self, frame: bytes):
+        """Decode a binary preview frame and deliver it to the executing prompt, if it asked for previews"""
+        if len(frame) < 8:
+            return
+        view = memoryview(frame)
+        event_type = int.from_bytes(view[0:4], 'big')
+
+        prompt_id = self._executing_prompt_id
+        node = None
+        if event_type == BINARY_PREVIEW_IMAGE:
+            mime_type = PREVIEW_IMAGE_FORMATS.get(int.from_bytes(view[4:8], 'big'), "application/octet-stream")
+            image = view[8:]
+        elif event_type == BINARY_PREVIEW_IMAGE_WITH_METADATA:
+            metadata_length = int.from_bytes(view[4:8], 'big')
+            try:
+                metadata = json_util.loads(view[8:8 + metadata_length])
+            except ValueError:
+                logger.warning("Received preview frame with invalid metadata")
+                return
+            prompt_id = metadata.get('prompt_id') or prompt_id
+            node = metadata.get('node_id')
+            mime_type = metadata.get('image_type', "application/octet-stream")
+            image = view[8 + metadata_length:]
+        else:
+            logger.debug(f"Skip binary WebSocket message of type {event_type}")
+            return
+
+        if prompt_id not in self._preview_subscribers:
+            return
+        queue = self._subscribers.get(prompt_id)
+        if queue is not None:
+            queue.put_nowait({
+                "type": PREVIEW_MESSAGE_TYPE,
+                "data": {"prompt_id": prompt_id, "node": node, "mime_type": mime_type, "image": image},
+            })
+
+    async def _get_headers(self) -> Dict[str, str]:
+        if self._headers_provider is None:
+            return {}
+        return await self._headers_provider() or {}
+
+    async def _run(self):
+        """Reader loop: keep the socket open and dispatch messages, reconnecting on failure"""
+        delay = self.reconnect_delay
+        was_connected = False
+        while not self._closed:
+            try:
+                headers = await self._get_headers()
+                logger.info(f"Connecting WebSocket: {self.ws_url}")
+                async with websockets.connect(self.ws_url, additional_headers=headers, max_size=None) as websocket:
+                    self._websocket = websocket
+                    self._last_error = None
+                    self._connected.set()
+                    delay = self.reconnect_delay
+                    logger.info(f"WebSocket connection established (client_id: {self.client_id})")
+
+                    if was_connected:
+                        # Let in-flight executions know they may have missed messages
+                        for queue in self._subscribers.values():
+                            queue.put_nowait({"type": RECONNECTED_MESSAGE_TYPE, "data": {}})
+                    was_connected = True
+
+                    async for message_str in websocket:
+                        if not isinstance(message_str, str):
+                            # Preview frames, only decoded when someone wants them
+                            if self._preview_subscribers:
+                                self._dispatch_binary(message_str)
+                            continue
+                        self._dispatch(message_str)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._last_error = e
+                # InvalidStatus (new client) exposes response.status_code, InvalidStatusCode (legacy) status_code
+                status = getattr(getattr(e, 'response', None), 'status_code', None) or getattr(e, 'status_code', None)
+                if status and self._on_auth_error:
+                    self._on_auth_error(status)
+                logger.warning(f"WebSocket connection error: {e}")
+            finally:
+                self._websocket = None
+                self._connected.clear()
+
+            if self._closed:
+                break
+            logger.info(f"WebSocket disconnected, reconnecting in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def close(self):
+        """Close the socket and stop reconnecting"""
+        self._closed = True
+        if self._websocket is not None:
+            try:
+                await self._websocket.close()
+            except Exception:
+                pass
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._reader_task = None
+        self._subscribers.clear()
+        self._preview_subscribers.clear()
+        self._orphans.clear()
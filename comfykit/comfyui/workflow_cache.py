@@ -0,0 +1,294 @@
+"""Workflow cache - parse each workflow file once and reuse it across executions"""
+
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from comfykit.comfyui.workflow_parser import WorkflowMetadata, WorkflowParser
+from comfykit.logger import logger
+from comfykit.utils import json_util
+from comfykit.utils.os_util import get_cache_path
+
+# Cache key: (absolute path, mtime in nanoseconds, size in bytes)
+WorkflowFileKey = Tuple[str, int, int]
+
+
+@dataclass
+class CachedWorkflow:
+    """Raw workflow data and its parsed metadata (parsed lazily)"""
+    workflow_data: Dict[str, Any]
+    metadata: Optional[WorkflowMetadata] = None
+    fetched_at: Optional[float] = None  # Remote workflows only (time.time() of the fetch)
+
+
+class WorkflowCache:
+    """LRU cache of workflow files keyed by file identity (path, mtime, size)
+
+    Editing a workflow file changes its mtime/size, so stale entries are never
+    returned; they simply age out of the LRU.
+
+    Cached objects are shared between callers and must be treated as read-only.
+    Executors deep-copy the workflow data before applying parameters.
+    """
+
+    def __init__(self, max_entries: int = 128):
+        """Initialize workflow cache
+
+        Args:
+            max_entries: Maximum number of workflow files kept in memory
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[WorkflowFileKey, CachedWorkflow]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _file_key(workflow_file: str | Path) -> WorkflowFileKey:
+        """Build the cache key from the file identity"""
+        path = os.path.abspath(workflow_file)
+        stat = os.stat(path)
+        return path, stat.st_mtime_ns, stat.st_size
+
+    def _get_entry(self, workflow_file: str | Path) -> CachedWorkflow:
+        """Get cached entry, loading the file on miss"""
+        key = self._file_key(workflow_file)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        # Load outside the lock, file reads may be slow
+        workflow_data = json_util.load_file(key[0])
+        entry = CachedWorkflow(workflow_data=workflow_data)
+
+        with self._lock:
+            self.misses += 1
+            # Another caller may have loaded the same file concurrently
+            existing = self._entries.get(key)
+            if existing is not None:
+                self._entries.move_to_end(key)
+                return existing
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get_workflow_data(self, workflow_file: str | Path) -> Dict[str, Any]:
+        """Get raw workflow JSON (shared, do not mutate)"""
+        return self._get_entry(workflow_file).workflow_data
+
+    def get_metadata(self, workflow_file: str | Path) -> Optional[WorkflowMetadata]:
+        """Get parsed workflow metadata (shared, do not mutate)"""
+        entry = self._get_entry(workflow_file)
+        if entry.metadata is None:
+            parser = WorkflowParser()
+            entry.metadata = parser.parse_workflow(entry.workflow_data, Path(workflow_file).stem)
+        return entry.metadata
+
+    def get(self, workflow_file: str | Path) -> Tuple[Optional[WorkflowMetadata], Dict[str, Any]]:
+        """Get (metadata, workflow_data) for a workflow file"""
+        metadata = self.get_metadata(workflow_file)
+        return metadata, self.get_workflow_data(workflow_file)
+
+    def invalidate(self, workflow_file: Optional[str | Path] = None):
+        """Drop cached entries for one workflow file, or everything if not specified"""
+        with self._lock:
+            if workflow_file is None:
+                self._entries.clear()
+                return
+            path = os.path.abspath(workflow_file)
+            for key in [k for k in self._entries if k[0] == path]:
+                del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_workflow_cache: Optional[WorkflowCache] = None
+
+
+def get_workflow_cache() -> WorkflowCache:
+    """Get the process-wide workflow cache
+
+    Size can be configured with the COMFYKIT_WORKFLOW_CACHE_SIZE env var.
+    """
+    global _workflow_cache
+    if _workflow_cache is None:
+        _workflow_cache = WorkflowCache(max_entries=int(os.getenv("COMFYKIT_WORKFLOW_CACHE_SIZE", "128")))
+    return _workflow_cache
+
+
+class RemoteWorkflowCache:
+    """Cache of workflow definitions fetched from an API (e.g. RunningHub workflow IDs)
+
+    Entries expire after `ttl` seconds. With `disk=True` the raw definitions are
+    also stored under the cache directory, so new processes skip the fetch too.
+    Concurrent requests for the same key share a single fetch.
+
+    Like WorkflowCache, cached objects are shared and must be treated as read-only.
+    """
+
+    def __init__(self, ttl: Optional[float] = 3600.0, max_entries: int = 128, disk: bool = False,
+                 disk_dir: Optional[str] = None):
+        """Initialize remote workflow cache
+
+        Args:
+            ttl: Seconds a definition is reused (None: until evicted, 0: always fetch)
+            max_entries: Maximum number of definitions kept in memory
+            disk: Also keep definitions on disk
+            disk_dir: Directory of the disk tier (default: <cache dir>/workflows)
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.disk = disk
+        self.disk_dir = disk_dir or get_cache_path("workflows")
+        self._entries: "OrderedDict[str, CachedWorkflow]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _is_fresh(self, entry: CachedWorkflow) -> bool:
+        if self.ttl is None:
+            return True
+        return entry.fetched_at is not None and time.time() - entry.fetched_at < self.ttl
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, hashlib.sha256(key.encode()).hexdigest() + ".json")
+
+    def _load_from_disk(self, key: str) -> Optional[CachedWorkflow]:
+        try:
+            stored = json_util.load_file(self._disk_path(key))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cached workflow for {key}: {e}")
+            return None
+        if stored.get("key") != key:
+            return None
+        return CachedWorkflow(workflow_data=stored["workflow"], fetched_at=stored.get("fetched_at"))
+
+    def _save_to_disk(self, key: str, entry: CachedWorkflow):
+        path = self._disk_path(key)
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            json_util.dump_file({"key": key, "fetched_at": entry.fetched_at, "workflow": entry.workflow_data}, temp_path)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to store workflow {key} on disk: {e}")
+
+    def _store(self, key: str, entry: CachedWorkflow):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def get(self, key: str, fetch: Callable[[], Awaitable[Dict[str, Any]]], name: Optional[str] = None,
+                  refresh: bool = False) -> CachedWorkflow:
+        """Get a workflow definition and its parsed metadata
+
+        Args:
+            key: Cache key (e.g. API base URL + workflow ID)
+            fetch: Coroutine function returning the raw workflow JSON
+            name: Workflow name used when parsing metadata (default: key)
+            refresh: Ignore cached entries and fetch again
+
+        Returns:
+            Cached entry (shared, do not mutate)
+        """
+        if not refresh:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and self._is_fresh(entry):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry
+
+            if self.disk:
+                entry = await asyncio.to_thread(self._load_from_disk, key)
+                if entry is not None and self._is_fresh(entry):
+                    entry.metadata = WorkflowParser().parse_workflow(entry.workflow_data, name or key)
+                    self._store(key, entry)
+                    self.hits += 1
+                    return entry
+
+        # Single flight: concurrent callers wait for the same fetch
+        task = self._inflight.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.create_task(self._fetch(key, fetch, name))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._fetch_done(key, t))
+        return await asyncio.shield(task)
+
+    def _fetch_done(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Waiters may all be gone, don't leave the exception unretrieved
+        if not task.cancelled():
+            task.exception()
+
+    async def _fetch(self, key: str, fetch: Callable[[], Awaitable[Dict[str, Any]]], name: Optional[str]) -> CachedWorkflow:
+        workflow_data = await fetch()
+        entry = CachedWorkflow(
+            workflow_data=workflow_data,
+            metadata=WorkflowParser().parse_workflow(workflow_data, name or key),
+            fetched_at=time.time(),
+        )
+        with self._lock:
+            self.misses += 1
+        self._store(key, entry)
+        if self.disk:
+            await asyncio.to_thread(self._save_to_disk, key, entry)
+        return entry
+
+    def invalidate(self, key: Optional[str] = None):
+        """Drop one cached definition (memory and disk), or everything if not specified"""
+        with self._lock:
+            keys = list(self._entries) if key is None else [key]
+            for k in keys:
+                self._entries.pop(k, None)
+        if not self.disk:
+            return
+        if key is not None:
+            paths = [self._disk_path(key)]
+        else:
+            paths = [os.path.join(self.disk_dir, f) for f in os.listdir(self.disk_dir)] if os.path.isdir(self.disk_dir) else []
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_remote_workflow_cache: Optional[RemoteWorkflowCache] = None
+
+
+def get_remote_workflow_cache() -> RemoteWorkflowCache:
+    """Get the process-wide remote workflow cache
+
+    Configured with the RUNNINGHUB_WORKFLOW_CACHE_TTL (seconds, 0 disables reuse)
+    and RUNNINGHUB_WORKFLOW_CACHE_DISK (true/false) env vars.
+    """
+    global _remote_workflow_cache
+    if _remote_workflow_cache is None:
+        _remote_workflow_cache = RemoteWorkflowCache(
+            ttl=float(os.getenv("RUNNINGHUB_WORKFLOW_CACHE_TTL", "3600")),
+            max_entries=int(os.getenv("COMFYKIT_WORKFLOW_CACHE_SIZE", "128")),
+            disk=os.getenv("RUNNINGHUB_WORKFLOW_CACHE_DISK", "false").lower() in ("1", "true", "yes"),
+        )
+    return _remote_workflow_cache
@@ -1,4 +1,3 @@
-import json
 import re
 from pathlib import Path
 from typing import Any, Dict, List, Optional
@@ -6,6 +5,7 @@ from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 
 from comfykit.logger import logger
+from comfykit.utils import json_util
 
 
 class WorkflowParam(BaseModel):
@@ -314,8 +314,7 @@ class WorkflowParser:
 
     def parse_workflow_file(self, file_path: str, tool_name: Optional[str] = None) -> Optional[WorkflowMetadata]:
         """Parse workflow file"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            workflow_data = json.load(f)
+        workflow_data = json_util.load_file(file_path)
 
         # Extract title from file name (remove suffix)
         title = tool_name or Path(file_path).stem
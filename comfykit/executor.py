@@ -1,19 +1,28 @@
 """ComfyKit - Unified API for executing ComfyUI workflows"""
 
+import asyncio
 import os
 import re
 import tempfile
+from contextlib import aclosing
 from pathlib import Path
-from typing import Any, Dict, Literal, Optional, Union
+from typing import (TYPE_CHECKING, Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Iterable, List,
+                    Literal, Optional, Union)
 
-from comfykit.comfyui.http_executor import HttpExecutor
-from comfykit.comfyui.models import ExecuteResult
-from comfykit.comfyui.runninghub_executor import RunningHubExecutor
-from comfykit.comfyui.websocket_executor import WebSocketExecutor
+from comfykit.comfyui.models import CompletedEvent, ExecuteResult, StreamEvent
 from comfykit.logger import logger
+from comfykit.utils import json_util
 from comfykit.utils.file_util import download_files
 from comfykit.utils.runninghub_util import is_runninghub_workflow
 
+# Executors are imported when first used, they pull in aiohttp / websockets
+if TYPE_CHECKING:
+    from comfykit.comfyui.http_executor import HttpExecutor
+    from comfykit.comfyui.pool_executor import ComfyUIPoolExecutor
+    from comfykit.comfyui.runninghub_executor import RunningHubExecutor
+    from comfykit.comfyui.runninghub_webhook import RunningHubWebhookReceiver
+    from comfykit.comfyui.websocket_executor import WebSocketExecutor
+
 
 class ComfyKit:
     """ComfyUI Workflow Executor - Intelligent execution for any workflow source
@@ -39,16 +48,29 @@ class ComfyKit:
     def __init__(
         self,
         # ComfyUI configuration (local execution)
-        comfyui_url: Optional[str] = None,
+        comfyui_url: Optional[Union[str, List[str]]] = None,
         executor_type: Literal["http", "websocket"] = "http",
         api_key: Optional[str] = None,
         cookies: Optional[str] = None,
+        cookies_ttl: Optional[float] = None,
+        comfyui_connection_limit: Optional[int] = None,
+        comfyui_connection_limit_per_host: Optional[int] = None,
+        prefetch_media: Optional[bool] = None,
+        upload_cache: Optional[bool] = None,
+        result_cache: Optional[bool] = None,
+        keep_outputs: Optional[bool] = None,
+        upload_concurrency: Optional[int] = None,
+        max_concurrent_uploads: Optional[int] = None,
+        comfyui_retry_count: Optional[int] = None,
         # RunningHub configuration (cloud execution)
         runninghub_url: Optional[str] = None,
         runninghub_api_key: Optional[str] = None,
         runninghub_timeout: Optional[int] = None,
         runninghub_retry_count: int = 3,
         runninghub_instance_type: Optional[str] = None,
+        runninghub_max_concurrent_tasks: Optional[int] = None,
+        runninghub_webhook_url: Optional[str] = None,
+        runninghub_webhook_port: Optional[int] = None,
     ):
         """Initialize ComfyKit with flexible configuration
         
@@ -65,6 +87,9 @@ class ComfyKit:
                         Default: "http://127.0.0.1:8188"
                         Env var: COMFYUI_BASE_URL
                         Example: "http://my-server:8188"
+                        Pass a list (or a comma-separated env value) to run on a pool
+                        of servers: each execution goes to the healthy server with the
+                        shortest queue, and result.server_url records which one served it
             
             executor_type: Execution mode for local ComfyUI
                           Options: "http" (recommended) or "websocket"
@@ -84,6 +109,64 @@ class ComfyKit:
                       - Key-value pairs: "key1=value1; key2=value2"
                       - URL to fetch cookies from
             
+            cookies_ttl: Seconds cookies fetched from a URL are reused before refetching
+                        Default: 300
+                        Env var: COMFYUI_COOKIES_TTL
+                        Cached cookies are also dropped on any 401/403 response
+            
+            comfyui_connection_limit: Max open connections in the pooled ComfyUI session
+                                     Default: 100 (0 = unlimited)
+                                     Env var: COMFYUI_CONNECTION_LIMIT
+                                     Connections are kept alive and reused across
+                                     submissions, uploads and history polling
+            
+            comfyui_connection_limit_per_host: Max open connections per ComfyUI host
+                                              Default: 0 (unlimited)
+                                              Env var: COMFYUI_CONNECTION_LIMIT_PER_HOST
+            
+            prefetch_media: Download output media in the background as soon as a node
+                           produces it, so result.media() / result.save_all() are served
+                           from local files
+                           Default: False
+                           Env var: COMFYUI_PREFETCH_MEDIA
+            
+            upload_cache: Reuse previous uploads of identical media inputs (local ComfyUI
+                         and RunningHub), keyed by file content hash (or URL) plus target
+                         server/account and stored in an sqlite database under
+                         COMFYKIT_CACHE_DIR (default ~/.cache/comfykit)
+                         Default: False
+                         Env var: COMFYKIT_UPLOAD_CACHE
+            
+            result_cache: Reuse results of exact repeats (same workflow, params and fixed
+                         seeds, submitted to the same server/account) instead of running
+                         them again. Executions with randomized seeds are never cached.
+                         Results are kept in memory and under COMFYKIT_CACHE_DIR, see
+                         COMFYKIT_RESULT_CACHE_TTL / _SIZE / _DISK_SIZE / _MEDIA
+                         Default: False
+                         Env var: COMFYKIT_RESULT_CACHE
+            
+            keep_outputs: Keep the raw outputs (ComfyUI history / RunningHub task outputs)
+                         in result.outputs. Off by default to keep results small when
+                         many are held in memory
+                         Default: False
+                         Env var: COMFYKIT_KEEP_OUTPUTS
+            
+            upload_concurrency: Max media inputs of one execution uploaded concurrently
+                               Default: 4
+                               Env var: COMFYKIT_UPLOAD_CONCURRENCY
+            
+            max_concurrent_uploads: Max concurrent uploads across all executions, per
+                                   server (local ComfyUI) or account (RunningHub)
+                                   Default: 8
+                                   Env var: COMFYKIT_MAX_CONCURRENT_UPLOADS
+            
+            comfyui_retry_count: Retries of transient ComfyUI failures (connection errors,
+                                429/5xx) on workflow submission and media uploads, with
+                                jittered backoff and a circuit breaker per endpoint.
+                                A submission is only resent if it surely wasn't queued.
+                                Default: 2
+                                Env var: COMFYUI_RETRY_COUNT
+            
             # RunningHub Cloud Settings
             runninghub_url: RunningHub API base URL
                            Default: "https://www.runninghub.ai"
@@ -107,6 +190,23 @@ class ComfyKit:
                                      Default: None (uses RunningHub default instance)
                                      Set to "plus" to use 48GB VRAM machine
                                      Env var: RUNNINGHUB_INSTANCE_TYPE
+            
+            runninghub_max_concurrent_tasks: Tasks run on RunningHub at once, set it to
+                                            the account's parallelism so extra tasks wait
+                                            locally instead of being rejected
+                                            Default: None (unlimited)
+                                            Env var: RUNNINGHUB_MAX_CONCURRENT_TASKS
+                                            Per-endpoint request rates: RUNNINGHUB_RATE_LIMITS
+            
+            runninghub_webhook_url: Public URL of an embedded webhook receiver; tasks
+                                   are completed by RunningHub's callback instead of
+                                   polling (polled every minute as a safety net)
+                                   Default: None (polling only)
+                                   Env var: RUNNINGHUB_WEBHOOK_URL
+            
+            runninghub_webhook_port: Local port the webhook receiver listens on
+                                    Default: port of runninghub_webhook_url, or 8765
+                                    Env var: RUNNINGHUB_WEBHOOK_PORT
         
         Examples:
             # Example 1: Default configuration (local ComfyUI)
@@ -136,10 +236,56 @@ class ComfyKit:
             >>> # Automatically reads from environment
         """
         # ComfyUI configuration (priority: param > env > default)
-        self.comfyui_url = comfyui_url or os.getenv("COMFYUI_BASE_URL", "http://127.0.0.1:8188")
+        comfyui_url = comfyui_url or os.getenv("COMFYUI_BASE_URL", "http://127.0.0.1:8188")
+        if isinstance(comfyui_url, str):
+            comfyui_url = comfyui_url.split(",")
+        self.comfyui_urls = [url.strip() for url in comfyui_url if url and url.strip()]
+        if not self.comfyui_urls:
+            raise ValueError("comfyui_url must contain at least one URL")
+        self.comfyui_url = self.comfyui_urls[0]
         self.executor_type = executor_type or os.getenv("COMFYUI_EXECUTOR_TYPE", "http")
         self.api_key = api_key or os.getenv("COMFYUI_API_KEY")
         self.cookies = cookies or os.getenv("COMFYUI_COOKIES")
+        if cookies_ttl is not None:
+            self.cookies_ttl = cookies_ttl
+        else:
+            self.cookies_ttl = float(os.getenv("COMFYUI_COOKIES_TTL", "300"))
+        if comfyui_connection_limit is not None:
+            self.comfyui_connection_limit = comfyui_connection_limit
+        else:
+            self.comfyui_connection_limit = int(os.getenv("COMFYUI_CONNECTION_LIMIT", "100"))
+        if comfyui_connection_limit_per_host is not None:
+            self.comfyui_connection_limit_per_host = comfyui_connection_limit_per_host
+        else:
+            self.comfyui_connection_limit_per_host = int(os.getenv("COMFYUI_CONNECTION_LIMIT_PER_HOST", "0"))
+        if prefetch_media is not None:
+            self.prefetch_media = prefetch_media
+        else:
+            self.prefetch_media = os.getenv("COMFYUI_PREFETCH_MEDIA", "false").lower() in ("1", "true", "yes")
+        if upload_cache is not None:
+            self.upload_cache = upload_cache
+        else:
+            self.upload_cache = os.getenv("COMFYKIT_UPLOAD_CACHE", "false").lower() in ("1", "true", "yes")
+        if result_cache is not None:
+            self.result_cache = result_cache
+        else:
+            self.result_cache = os.getenv("COMFYKIT_RESULT_CACHE", "false").lower() in ("1", "true", "yes")
+        if keep_outputs is not None:
+            self.keep_outputs = keep_outputs
+        else:
+            self.keep_outputs = os.getenv("COMFYKIT_KEEP_OUTPUTS", "false").lower() in ("1", "true", "yes")
+        if upload_concurrency is not None:
+            self.upload_concurrency = upload_concurrency
+        else:
+            self.upload_concurrency = int(os.getenv("COMFYKIT_UPLOAD_CONCURRENCY", "4"))
+        if max_concurrent_uploads is not None:
+            self.max_concurrent_uploads = max_concurrent_uploads
+        else:
+            self.max_concurrent_uploads = int(os.getenv("COMFYKIT_MAX_CONCURRENT_UPLOADS", "8"))
+        if comfyui_retry_count is not None:
+            self.comfyui_retry_count = comfyui_retry_count
+        else:
+            self.comfyui_retry_count = int(os.getenv("COMFYUI_RETRY_COUNT", "2"))
         
         # RunningHub configuration (priority: param > env > default)
         self.runninghub_url = runninghub_url or os.getenv("RUNNINGHUB_BASE_URL", "https://www.runninghub.ai")
@@ -153,6 +299,11 @@ class ComfyKit:
             self.runninghub_timeout = int(env_timeout) if env_timeout else None
         self.runninghub_retry_count = runninghub_retry_count if runninghub_retry_count != 3 else int(os.getenv("RUNNINGHUB_RETRY_COUNT", "3"))
         self.runninghub_instance_type = runninghub_instance_type or os.getenv("RUNNINGHUB_INSTANCE_TYPE")
+        self.runninghub_max_concurrent_tasks = runninghub_max_concurrent_tasks
+        self.runninghub_webhook_url = runninghub_webhook_url or os.getenv("RUNNINGHUB_WEBHOOK_URL")
+        if runninghub_webhook_port is None and os.getenv("RUNNINGHUB_WEBHOOK_PORT"):
+            runninghub_webhook_port = int(os.getenv("RUNNINGHUB_WEBHOOK_PORT"))
+        self.runninghub_webhook_port = runninghub_webhook_port
         
         # Normalize executor type
         self.executor_type = self.executor_type.lower()
@@ -160,7 +311,9 @@ class ComfyKit:
         # Lazy initialization of executors
         self._http_executor = None
         self._websocket_executor = None
+        self._pool_executor = None
         self._runninghub_executor = None
+        self._webhook_receiver = None
 
     async def close(self):
         """Close all executors and cleanup resources
@@ -179,11 +332,17 @@ class ComfyKit:
         if self._runninghub_executor is not None:
             await self._runninghub_executor.close()
         
+        if self._webhook_receiver is not None:
+            await self._webhook_receiver.close()
+        
         if self._http_executor is not None:
             await self._http_executor.close()
         
         if self._websocket_executor is not None:
             await self._websocket_executor.close()
+        
+        if self._pool_executor is not None:
+            await self._pool_executor.close()
 
     async def __aenter__(self):
         """Async context manager entry"""
@@ -193,40 +352,120 @@ class ComfyKit:
         """Async context manager exit"""
         await self.close()
 
-    def _get_http_executor(self) -> HttpExecutor:
+    def _get_http_executor(self) -> "HttpExecutor":
         """Get or create HTTP executor"""
         if self._http_executor is None:
+            from comfykit.comfyui.http_executor import HttpExecutor
+
             self._http_executor = HttpExecutor(
                 base_url=self.comfyui_url,
                 api_key=self.api_key,
-                cookies=self.cookies
+                cookies=self.cookies,
+                cookies_ttl=self.cookies_ttl,
+                connection_limit=self.comfyui_connection_limit,
+                connection_limit_per_host=self.comfyui_connection_limit_per_host,
+                prefetch_media=self.prefetch_media,
+                upload_cache=self.upload_cache,
+                result_cache=self.result_cache,
+                keep_outputs=self.keep_outputs,
+                upload_concurrency=self.upload_concurrency,
+                max_concurrent_uploads=self.max_concurrent_uploads,
+                retry_count=self.comfyui_retry_count
             )
         return self._http_executor
 
-    def _get_websocket_executor(self) -> WebSocketExecutor:
+    def _get_websocket_executor(self) -> "WebSocketExecutor":
         """Get or create WebSocket executor"""
         if self._websocket_executor is None:
+            from comfykit.comfyui.websocket_executor import WebSocketExecutor
+
             self._websocket_executor = WebSocketExecutor(
                 base_url=self.comfyui_url,
                 api_key=self.api_key,
-                cookies=self.cookies
+                cookies=self.cookies,
+                cookies_ttl=self.cookies_ttl,
+                connection_limit=self.comfyui_connection_limit,
+                connection_limit_per_host=self.comfyui_connection_limit_per_host,
+                prefetch_media=self.prefetch_media,
+                upload_cache=self.upload_cache,
+                result_cache=self.result_cache,
+                keep_outputs=self.keep_outputs,
+                upload_concurrency=self.upload_concurrency,
+                max_concurrent_uploads=self.max_concurrent_uploads,
+                retry_count=self.comfyui_retry_count
             )
         return self._websocket_executor
 
-    def _get_runninghub_executor(self) -> RunningHubExecutor:
+    def _get_pool_executor(self) -> "ComfyUIPoolExecutor":
+        """Get or create pool executor (multiple ComfyUI servers)"""
+        if self._pool_executor is None:
+            from comfykit.comfyui.pool_executor import ComfyUIPoolExecutor
+
+            self._pool_executor = ComfyUIPoolExecutor(
+                base_urls=self.comfyui_urls,
+                executor_type=self.executor_type,
+                api_key=self.api_key,
+                cookies=self.cookies,
+                cookies_ttl=self.cookies_ttl,
+                connection_limit=self.comfyui_connection_limit,
+                connection_limit_per_host=self.comfyui_connection_limit_per_host,
+                prefetch_media=self.prefetch_media,
+                upload_cache=self.upload_cache,
+                result_cache=self.result_cache,
+                keep_outputs=self.keep_outputs,
+                upload_concurrency=self.upload_concurrency,
+                max_concurrent_uploads=self.max_concurrent_uploads,
+                retry_count=self.comfyui_retry_count
+            )
+        return self._pool_executor
+
+    def _get_runninghub_executor(self) -> "RunningHubExecutor":
         """Get or create RunningHub executor"""
         if self._runninghub_executor is None:
+            from comfykit.comfyui.runninghub_executor import RunningHubExecutor
+
             self._runninghub_executor = RunningHubExecutor(
                 base_url=self.runninghub_url,
                 api_key=self.runninghub_api_key,
                 timeout=self.runninghub_timeout,
                 retry_count=self.runninghub_retry_count,
-                instance_type=self.runninghub_instance_type
+                instance_type=self.runninghub_instance_type,
+                upload_cache=self.upload_cache,
+                result_cache=self.result_cache,
+                keep_outputs=self.keep_outputs,
+                upload_concurrency=self.upload_concurrency,
+                max_concurrent_uploads=self.max_concurrent_uploads,
+                max_concurrent_tasks=self.runninghub_max_concurrent_tasks,
+                webhook_receiver=self._get_webhook_receiver()
             )
         return self._runninghub_executor
 
+    def _get_webhook_receiver(self) -> Optional["RunningHubWebhookReceiver"]:
+        """Get or create the RunningHub webhook receiver (None if not configured)"""
+        if self._webhook_receiver is None and self.runninghub_webhook_url:
+            from comfykit.comfyui.runninghub_webhook import RunningHubWebhookReceiver
+
+            self._webhook_receiver = RunningHubWebhookReceiver(
+                public_url=self.runninghub_webhook_url,
+                port=self.runninghub_webhook_port
+            )
+        return self._webhook_receiver
+
+    def get_runninghub_stats(self) -> Dict[str, Any]:
+        """Get RunningHub rate limit and task cap wait metrics
+
+        Useful to size the RunningHub plan: long task waits mean more parallelism
+        would help, long endpoint waits mean the request rates are the bottleneck.
+
+        Returns:
+            {"endpoints": {class: wait metrics}, "tasks": task cap usage and wait metrics}
+        """
+        return self._get_runninghub_executor().get_rate_limit_stats()
+
     def _get_local_executor(self):
         """Get local ComfyUI executor based on executor_type"""
+        if len(self.comfyui_urls) > 1:
+            return self._get_pool_executor()
         if self.executor_type == "websocket":
             return self._get_websocket_executor()
         else:
@@ -327,6 +566,247 @@ class ComfyKit:
             executor = self._get_local_executor()
             return await executor.execute_workflow(workflow_str, params or {})
 
+    async def execute_many(
+        self,
+        workflow: Union[str, Path],
+        params: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]], Dict[str, Any]],
+        concurrency: int = 4,
+    ) -> AsyncIterator[ExecuteResult]:
+        """Execute one workflow with many parameter sets, yielding results as they complete
+        
+        The workflow source is resolved once for the whole batch (URLs are downloaded
+        once, local files parsed once). For local ComfyUI, preparing the next items
+        (applying params, uploading media) overlaps with the execution of earlier
+        items, while at most `concurrency` prompts are in flight on ComfyUI.
+        
+        Args:
+            workflow: Workflow source, same as execute()
+            params: Parameter sets, can be:
+                   - (async) iterable of param dicts, consumed lazily
+                   - vectorized dict: list values are zipped into one param dict
+                     per position, scalar values are shared by all items
+                     Example: {"prompt": ["a cat", "a dog"], "steps": 20}
+            concurrency: Maximum number of executions in flight (default: 4)
+        
+        Yields:
+            ExecuteResult: In completion order, `index` is the position of its params
+        
+        Example:
+            >>> async for result in kit.execute_many(
+            ...     "workflow.json",
+            ...     {"prompt": ["a cat", "a dog", "a bird"]},
+            ...     concurrency=2,
+            ... ):
+            ...     print(result.index, result.status, result.images)
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+
+        workflow_str = str(workflow)
+
+        # Case 1: RunningHub workflow ID (numeric string)
+        if self._is_runninghub_workflow_id(workflow_str):
+            logger.info(f"Detected RunningHub workflow ID: {workflow_str}")
+            executor = self._get_runninghub_executor()
+            async for result in self._run_many(
+                params, concurrency,
+                execute=lambda item_params: executor.execute_by_id(workflow_str, item_params),
+            ):
+                yield result
+
+        # Case 2: URL - download once and execute as local workflow
+        elif self._is_url(workflow_str):
+            logger.info(f"Detected workflow URL: {workflow_str}")
+            async with download_files(workflow_str) as temp_file_path:
+                async for result in self._run_many_local(temp_file_path, params, concurrency):
+                    yield result
+
+        # Case 3: RunningHub workflow file
+        elif os.path.exists(workflow_str) and is_runninghub_workflow(workflow_str):
+            logger.info(f"Detected RunningHub workflow file: {workflow_str}")
+            executor = self._get_runninghub_executor()
+            async for result in self._run_many(
+                params, concurrency,
+                execute=lambda item_params: executor.execute_workflow(workflow_str, item_params),
+            ):
+                yield result
+
+        # Case 4: Local ComfyUI workflow
+        else:
+            logger.info(f"Detected local workflow file: {workflow_str}")
+            async for result in self._run_many_local(workflow_str, params, concurrency):
+                yield result
+
+    async def stream(
+        self,
+        workflow: Union[str, Path],
+        params: Optional[Dict[str, Any]] = None,
+        previews: bool = False,
+    ) -> AsyncIterator[StreamEvent]:
+        """Execute a workflow and yield execution events as they happen
+        
+        Events (see comfykit.comfyui.models):
+        - QueuedEvent: workflow accepted by ComfyUI
+        - NodeStartedEvent: a node started executing
+        - ProgressEvent: step progress (value/max) of the executing node
+        - PreviewEvent: latent preview image while sampling (only with previews=True)
+        - CachedEvent: nodes skipped because their outputs were cached
+        - NodeOutputEvent: a node finished, with its media URLs and texts
+        - CompletedEvent: always last, `event.result` is the ExecuteResult
+        
+        Local workflows on a single server are streamed over WebSocket regardless
+        of executor_type. RunningHub workflows, and server pools using the http
+        executor, only yield the final CompletedEvent.
+        
+        Args:
+            workflow: Workflow source, same as execute()
+            params: Workflow parameters, same as execute()
+            previews: Decode the binary latent previews ComfyUI sends while sampling
+                      and yield them as PreviewEvent (default: False, frames are skipped)
+        
+        Example:
+            >>> async for event in kit.stream("workflow.json", {"prompt": "a cat"}):
+            ...     if event.type == "progress":
+            ...         print(f"{event.value}/{event.max}")
+            ...     elif event.type == "node_output":
+            ...         print(event.var, event.images)
+            ...     elif event.type == "completed":
+            ...         print(event.result.status)
+        """
+        workflow_str = str(workflow)
+        
+        # Case 1: RunningHub workflow ID (numeric string)
+        if self._is_runninghub_workflow_id(workflow_str):
+            logger.info(f"Detected RunningHub workflow ID: {workflow_str}")
+            executor = self._get_runninghub_executor()
+            result = await executor.execute_by_id(workflow_str, params or {})
+            yield CompletedEvent(prompt_id=result.prompt_id, result=result)
+            return
+        
+        # Case 2: URL - download and stream as local workflow
+        if self._is_url(workflow_str):
+            logger.info(f"Detected workflow URL: {workflow_str}")
+            async with download_files(workflow_str) as temp_file_path:
+                async with aclosing(self._get_stream_executor().stream_workflow(temp_file_path, params or {}, previews=previews)) as events:
+                    async for event in events:
+                        yield event
+            return
+        
+        # Case 3: RunningHub workflow file
+        if os.path.exists(workflow_str) and is_runninghub_workflow(workflow_str):
+            logger.info(f"Detected RunningHub workflow file: {workflow_str}")
+            executor = self._get_runninghub_executor()
+        else:
+            # Case 4: Local ComfyUI workflow
+            logger.info(f"Detected local workflow file: {workflow_str}")
+            executor = self._get_stream_executor()
+        async with aclosing(executor.stream_workflow(workflow_str, params or {}, previews=previews)) as events:
+            async for event in events:
+                yield event
+
+    def _get_stream_executor(self):
+        """Get local executor for streaming (WebSocket reports progress, HTTP polling cannot)"""
+        if len(self.comfyui_urls) > 1:
+            return self._get_pool_executor()
+        return self._get_websocket_executor()
+
+    def _run_many_local(self, workflow_file: str, params, concurrency: int) -> AsyncIterator[ExecuteResult]:
+        """Batch execution on local ComfyUI with preparation ahead of execution"""
+        executor = self._get_local_executor()
+        return self._run_many(
+            params, concurrency,
+            prepare=lambda item_params: executor.prepare_workflow(workflow_file, item_params),
+            execute=executor.execute_prepared,
+        )
+
+    async def _iter_params(self, params) -> AsyncIterator[Dict[str, Any]]:
+        """Iterate parameter sets of a batch (see execute_many)"""
+        if isinstance(params, dict):
+            vectorized = {k: v for k, v in params.items() if isinstance(v, (list, tuple))}
+            if not vectorized:
+                yield params
+                return
+            lengths = {len(v) for v in vectorized.values()}
+            if len(lengths) > 1:
+                raise ValueError(f"Vectorized params must have the same length, got: { {k: len(v) for k, v in vectorized.items()} }")
+            for i in range(lengths.pop()):
+                yield {k: (v[i] if k in vectorized else v) for k, v in params.items()}
+        elif hasattr(params, '__aiter__'):
+            async for item_params in params:
+                yield item_params
+        else:
+            for item_params in params:
+                yield item_params
+
+    async def _run_many(
+        self,
+        params,
+        concurrency: int,
+        execute: Callable[[Any], Awaitable[ExecuteResult]],
+        prepare: Optional[Callable[[Dict[str, Any]], Awaitable[Any]]] = None,
+    ) -> AsyncIterator[ExecuteResult]:
+        """Run a batch with bounded concurrency and yield results as they complete
+        
+        With `prepare`, items are prepared outside the execution slots, so up to
+        `concurrency` further items get ready while earlier ones execute.
+        Parameter sets are pulled lazily and an item holds its slot until its
+        result is handed to the consumer, so at most 2 * concurrency items
+        (pending or finished) are in memory even if the consumer is slow.
+        """
+        results: asyncio.Queue = asyncio.Queue()
+        execution_slots = asyncio.Semaphore(concurrency)
+        item_slots = asyncio.Semaphore(concurrency * 2 if prepare else concurrency)
+        tasks = set()
+        batch_done = object()
+        batch_state: Dict[str, Any] = {"total": None, "error": None}
+
+        async def run_item(index: int, item_params: Dict[str, Any]):
+            try:
+                if prepare:
+                    item = await prepare(item_params)
+                else:
+                    item = item_params
+                async with execution_slots:
+                    result = await execute(item)
+            except Exception as e:
+                logger.error(f"Batch item {index} failed: {str(e)}")
+                result = ExecuteResult(status="error", msg=str(e))
+            result.index = index
+            results.put_nowait(result)
+
+        async def produce():
+            index = 0
+            try:
+                async for item_params in self._iter_params(params):
+                    await item_slots.acquire()
+                    task = asyncio.create_task(run_item(index, item_params))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                    index += 1
+            except Exception as e:
+                batch_state["error"] = e
+            batch_state["total"] = index
+            results.put_nowait(batch_done)
+
+        producer = asyncio.create_task(produce())
+        try:
+            yielded = 0
+            while batch_state["total"] is None or yielded < batch_state["total"]:
+                result = await results.get()
+                if result is batch_done:
+                    if batch_state["error"] is not None:
+                        raise batch_state["error"]
+                    continue
+                # The item's slot is free once the consumer has its result
+                item_slots.release()
+                yielded += 1
+                yield result
+        finally:
+            # Consumer stopped early (or failed), cancel everything still running
+            producer.cancel()
+            for task in list(tasks):
+                task.cancel()
+
     async def execute_json(
         self,
         workflow_json: Dict[str, Any],
@@ -345,16 +825,15 @@ class ComfyKit:
             >>> workflow = {"nodes": [...], "edges": [...]}
             >>> result = await kit.execute_json(workflow, {"prompt": "a cat"})
         """
-        import json
         import tempfile
 
         # Save to temp file and execute
         with tempfile.NamedTemporaryFile(
-            mode='w',
+            mode='wb',
             suffix='.json',
             delete=False
         ) as f:
-            json.dump(workflow_json, f)
+            f.write(json_util.dumpb(workflow_json))
             temp_path = f.name
 
         try:
@@ -23,12 +23,26 @@ logging.getLogger("numexpr").setLevel(logging.WARNING)
 
 # log config
 logger_level = logging.INFO
-logging.basicConfig(
-    level=logger_level,
-    format='%(asctime)s- %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(funcName)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S',
-    force=True
-)
+LOG_FORMAT = '%(asctime)s- %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(funcName)s - %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class DefaultHandler(logging.StreamHandler):
+    """Print ComfyKit logs until the application configures logging
+
+    Once the root logger has handlers (logging.basicConfig, dictConfig...),
+    records only propagate there, the application's configuration is never
+    overridden.
+    """
+
+    def emit(self, record):
+        if logging.getLogger().handlers:
+            return
+        super().emit(record)
+
 
 logger = logging.getLogger("PM")
 logger.setLevel(logger_level)
+_default_handler = DefaultHandler()
+_default_handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT))
+logger.addHandler(_default_handler)
@@ -5,8 +5,6 @@ from contextlib import asynccontextmanager, contextmanager
 from typing import AsyncGenerator, Generator, List, Union, overload
 from urllib.parse import urlparse
 
-import aiohttp
-
 from comfykit.logger import logger
 from comfykit.utils.os_util import get_data_path
 
@@ -38,6 +36,8 @@ async def download_files(file_urls: Union[str, List[str]], suffix: str = None, a
         
     Automatically clean up all temporary files
     """
+    import aiohttp
+
     is_single_url = isinstance(file_urls, str)
     url_list = [file_urls] if is_single_url else file_urls
 
@@ -117,6 +117,8 @@ def get_ext_from_content_type(content_type: str) -> str:
 
 async def _download_external_file(url: str, cookies: dict = None) -> tuple[bytes, str]:
     """Download external file using asynchronous HTTP client"""
+    import aiohttp
+
     async with aiohttp.ClientSession(cookies=cookies, timeout=aiohttp.ClientTimeout(total=30)) as session:
         async with session.get(url) as response:
             response.raise_for_status()
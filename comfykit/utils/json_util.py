@@ -0,0 +1,91 @@
+"""
+JSON utilities - fast codec (orjson when installed) with a stdlib fallback
+
+orjson is an optional dependency (`pip install comfykit[fast]`). Set
+COMFYKIT_JSON_BACKEND=stdlib to force the standard library.
+"""
+
+import json
+import os
+from typing import Any, Callable, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # Optional dependency
+    orjson = None
+
+if os.getenv("COMFYKIT_JSON_BACKEND", "").lower() == "stdlib":
+    orjson = None
+
+# Name of the active backend ("orjson" or "json")
+BACKEND = "orjson" if orjson is not None else "json"
+
+# Raised by loads() with either backend (orjson.JSONDecodeError subclasses it)
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+    """Parse JSON from text or bytes (bytes are not decoded first with orjson)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    return json.loads(data)
+
+
+def _orjson_dumpb(obj: Any, indent: bool, sort_keys: bool, default: Optional[Callable[[Any], Any]]) -> Optional[bytes]:
+    option = orjson.OPT_NON_STR_KEYS
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    try:
+        return orjson.dumps(obj, default=default, option=option)
+    except orjson.JSONEncodeError:
+        # e.g. integers beyond 64 bits, left to the stdlib
+        return None
+
+
+def _stdlib_dumps(obj: Any, indent: bool, sort_keys: bool, default: Optional[Callable[[Any], Any]]) -> str:
+    if indent:
+        # Meant to be read, keep non-ASCII characters
+        return json.dumps(obj, ensure_ascii=False, indent=2, sort_keys=sort_keys, default=default)
+    # Escaping non-ASCII is the stdlib's fast path
+    return json.dumps(obj, sort_keys=sort_keys, separators=(",", ":"), default=default)
+
+
+def dumpb(obj: Any, indent: bool = False, sort_keys: bool = False, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """Serialize to UTF-8 JSON bytes (compact unless indent), e.g. for request bodies
+
+    Args:
+        obj: Object to serialize
+        indent: Indent with 2 spaces
+        sort_keys: Sort object keys (canonical output)
+        default: Called for objects that are not serializable
+    """
+    if orjson is not None:
+        data = _orjson_dumpb(obj, indent, sort_keys, default)
+        if data is not None:
+            return data
+    return _stdlib_dumps(obj, indent, sort_keys, default).encode("utf-8")
+
+
+def dumps(obj: Any, indent: bool = False, sort_keys: bool = False, default: Optional[Callable[[Any], Any]] = None) -> str:
+    """Serialize to a JSON string (compact unless indent), see dumpb"""
+    if orjson is not None:
+        data = _orjson_dumpb(obj, indent, sort_keys, default)
+        if data is not None:
+            return data.decode("utf-8")
+    return _stdlib_dumps(obj, indent, sort_keys, default)
+
+
+def load_file(path: Union[str, os.PathLike]) -> Any:
+    """Read and parse a JSON file"""
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def dump_file(obj: Any, path: Union[str, os.PathLike], indent: bool = False):
+    """Serialize to a JSON file (UTF-8)"""
+    with open(path, "wb") as f:
+        f.write(dumpb(obj, indent=indent))
@@ -34,3 +34,10 @@ def save_base64_to_file(base64_str, file_path):
     os.makedirs(os.path.dirname(file_path), exist_ok=True)
     with open(file_path, "wb") as f:
         f.write(base64.b64decode(base64_str))
+
+def get_cache_path(*paths: str) -> str:
+    """Get path in the ComfyKit cache folder (COMFYKIT_CACHE_DIR, default ~/.cache/comfykit)"""
+    cache_root = os.getenv("COMFYKIT_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "comfykit")
+    if paths:
+        return os.path.join(cache_root, *paths)
+    return cache_root
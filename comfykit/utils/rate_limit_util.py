@@ -0,0 +1,138 @@
+"""
+Rate limit utilities - token buckets and concurrency slots with wait metrics
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+
+class WaitStats:
+    """Counts acquisitions and the time spent waiting for them"""
+
+    def __init__(self):
+        self.acquired = 0
+        self.waited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float):
+        self.acquired += 1
+        if wait > 0:
+            self.waited += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "acquired": self.acquired,
+            "waited": self.waited,
+            "total_wait": self.total_wait,
+            "max_wait": self.max_wait,
+            "avg_wait": self.total_wait / self.acquired if self.acquired else 0.0,
+        }
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, bursts of up to `burst`
+
+    Callers reserve a token and sleep until it is available, so waiters are
+    served in order without a background task.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        """Initialize token bucket
+
+        Args:
+            rate: Tokens added per second (<= 0: unlimited)
+            burst: Bucket capacity (default: max(1, rate))
+        """
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.burst
+        self._updated_at = time.monotonic()
+        self.stats = WaitStats()
+
+    async def acquire(self) -> float:
+        """Take one token, waiting for it if needed
+
+        Returns:
+            Seconds waited
+        """
+        if self.rate <= 0:
+            self.stats.record(0.0)
+            return 0.0
+
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+        # Reserve the token now (may go negative), later callers queue behind
+        self._tokens -= 1
+        wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        self.stats.record(wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class ConcurrencyLimiter:
+    """Limits how many holders run at once, the others queue in FIFO order"""
+
+    def __init__(self, limit: Optional[int] = None):
+        """Initialize concurrency limiter
+
+        Args:
+            limit: Maximum number of concurrent holders (None or <= 0: unlimited)
+        """
+        self.limit = limit if limit and limit > 0 else None
+        self.in_use = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.stats = WaitStats()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> float:
+        """Take a slot, waiting for one if all are in use
+
+        Returns:
+            Seconds waited
+        """
+        if self.limit is not None and (self.in_use >= self.limit or self._waiters):
+            start = time.monotonic()
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append(future)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future in self._waiters:
+                    self._waiters.remove(future)
+                elif not future.cancelled():
+                    # The slot was handed over just before the cancellation, pass it on
+                    self.release()
+                raise
+            wait = time.monotonic() - start
+        else:
+            self.in_use += 1
+            wait = 0.0
+        self.stats.record(wait)
+        return wait
+
+    def release(self):
+        """Give a slot back, handing it to the next waiter if any"""
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                # in_use stays the same, the slot changes hands
+                future.set_result(None)
+                return
+        self.in_use -= 1
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.release()
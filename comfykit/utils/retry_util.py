@@ -0,0 +1,303 @@
+"""
+Retry utilities - error classification, jittered backoff, retry budgets and circuit breakers
+"""
+
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+
+import aiohttp
+
+from comfykit.logger import logger
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying: the server is overloaded or temporarily unavailable
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+# Statuses meaning the request was surely not processed (safe to resend non-idempotent requests)
+UNPROCESSED_STATUSES = {429, 503}
+
+
+class HttpStatusError(Exception):
+    """Unexpected HTTP status of a response"""
+
+    def __init__(self, status: int, message: str, retryable: Optional[bool] = None):
+        """Initialize HTTP status error
+
+        Args:
+            status: HTTP status code
+            message: Error message
+            retryable: Override the classification by status (e.g. retry a 401 after refreshing credentials)
+        """
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+
+
+class ApiError(Exception):
+    """Error reported in the body of a successful HTTP response (e.g. a non-zero API code)"""
+
+    def __init__(self, code: Any, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.code = code
+        self.retryable = retryable
+
+
+class CircuitOpenError(Exception):
+    """Request rejected without being sent because its endpoint keeps failing"""
+
+
+def charged_circuit(error: BaseException) -> Optional[str]:
+    """Key of the circuit an error (or an error it wraps) was already charged to, if any"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        key = getattr(error, "circuit_key", None)
+        if key is not None:
+            return key
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def is_retryable(error: BaseException, idempotent: bool = True) -> bool:
+    """Classify an error as transient (retry) or fatal (fail right away)
+
+    Args:
+        error: Raised exception
+        idempotent: Whether the request can safely be sent twice. If not, only
+                    errors where the server surely did not process it are retried.
+    """
+    if isinstance(error, (HttpStatusError, ApiError)) and error.retryable is not None:
+        return error.retryable
+    if isinstance(error, HttpStatusError):
+        return error.status in (RETRYABLE_STATUSES if idempotent else UNPROCESSED_STATUSES)
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status in (RETRYABLE_STATUSES if idempotent else UNPROCESSED_STATUSES)
+    if isinstance(error, aiohttp.ClientConnectorError):
+        # Connection could not be established, nothing was sent
+        return True
+    if isinstance(error, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError)):
+        # Connection dropped or timed out mid-request, the server may have processed it
+        return idempotent
+    return False
+
+
+class RetryBudget:
+    """Caps retries to a fraction of the requests
+
+    Every request deposits `ratio` tokens, every retry withdraws one. When many
+    requests fail at once the budget runs dry and failures are returned instead
+    of multiplying the load on a struggling server.
+    """
+
+    def __init__(self, ratio: float = 0.2, max_tokens: float = 10.0):
+        """Initialize retry budget
+
+        Args:
+            ratio: Retries allowed per request on average
+            max_tokens: Retries that can be spent in a burst
+        """
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+
+    def deposit(self):
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """Take a retry token, False if the budget is exhausted"""
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+class CircuitBreaker:
+    """Stops sending requests to an endpoint after consecutive transient failures
+
+    After `failure_threshold` failures the circuit opens and requests fail
+    immediately for `reset_timeout` seconds. Then one trial request is let
+    through (half-open): success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_running:
+            self._trial_running = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_running = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """End a request that says nothing about the endpoint's health
+
+        Used for rejected requests (4xx, invalid prompt) and cancelled or
+        timed-out attempts: the failure count and state are unchanged, but a
+        half-open trial slot is freed so the next request can be the trial.
+        """
+        self._trial_running = False
+
+
+class RetryPolicy:
+    """Runs requests with classified retries, decorrelated jitter backoff,
+    a shared retry budget and a circuit breaker per key (endpoint)
+    """
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 0.5, max_delay: float = 30.0,
+                 budget: Optional[RetryBudget] = None, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 classify: Callable[..., bool] = is_retryable):
+        """Initialize retry policy
+
+        Args:
+            max_attempts: Attempts per call, including the first one
+            base_delay: Minimum delay before a retry (seconds)
+            max_delay: Maximum delay before a retry (seconds)
+            budget: Retry budget shared by all calls (default: a new RetryBudget)
+            failure_threshold: Consecutive transient failures opening a key's circuit
+            reset_timeout: Seconds an open circuit rejects requests before a trial
+            classify: Function (error, idempotent) -> whether to retry
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget or RetryBudget()
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.classify = classify
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get_breaker(self, key: str) -> CircuitBreaker:
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = self._breakers[key] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        return breaker
+
+    def next_delay(self, previous_delay: float) -> float:
+        """Decorrelated jitter: random between the base delay and 3x the previous delay"""
+        return min(self.max_delay, random.uniform(self.base_delay, max(self.base_delay, previous_delay * 3)))
+
+    @asynccontextmanager
+    async def circuit(self, key: str, idempotent: bool = True) -> AsyncIterator[None]:
+        """Run one attempt (the body of the with block) against a key's circuit breaker, without retrying
+
+        Lets a call touching several endpoints charge each failure to the
+        endpoint that caused it: when circuits are nested, a failure is only
+        charged to the innermost one.
+
+        Raises:
+            CircuitOpenError: If the key's circuit is open
+        """
+        breaker = self.get_breaker(key)
+        if not breaker.allow():
+            raise CircuitOpenError(f"{key} is failing, requests are paused for up to {self.reset_timeout:.0f}s")
+        try:
+            yield
+        except Exception as e:
+            if not self.charge(key, e, idempotent):
+                # The endpoint answered, it's the request that is wrong (or another
+                # endpoint failed): neither a failure nor a proof of health
+                breaker.release()
+            raise
+        except BaseException:
+            # Cancelled (e.g. by a timeout) while the attempt was running
+            breaker.release()
+            raise
+        breaker.record_success()
+
+    def charge(self, key: str, error: BaseException, idempotent: bool = True) -> bool:
+        """Record an error as a failure of a key's endpoint
+
+        Errors that are not transient, or were already charged to another
+        circuit (e.g. wrapped by the request they broke), are not charged.
+
+        Returns:
+            Whether the error was charged
+        """
+        if charged_circuit(error) is not None or not self.classify(error, idempotent):
+            return False
+        self.get_breaker(key).record_failure()
+        error.circuit_key = key
+        return True
+
+    async def stream(self, key: str, chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+        """Relay a body read from a key's endpoint, charging read errors to its circuit
+
+        For a response body streamed into a request to another endpoint: when the
+        source connection drops or stalls mid-body, the failure is charged to the
+        source, and the request it breaks is not charged to the other circuit.
+        """
+        try:
+            async for chunk in chunks:
+                yield chunk
+        except Exception as e:
+            self.charge(key, e)
+            raise
+
+    async def call(self, func: Callable[[], Awaitable[T]], key: Optional[str] = "default", idempotent: bool = True) -> T:
+        """Run func, retrying transient failures
+
+        Args:
+            func: Coroutine function performing one attempt
+            key: Circuit breaker key, usually the endpoint. None if func guards
+                 its requests itself (see circuit)
+            idempotent: Whether the request can safely be sent twice (see is_retryable)
+
+        Raises:
+            The last error, or CircuitOpenError if the key's circuit is open
+        """
+        self.budget.deposit()
+        delay = self.base_delay
+        attempt = 1
+        while True:
+            try:
+                if key is None:
+                    return await func()
+                async with self.circuit(key, idempotent):
+                    return await func()
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                retryable = self.classify(e, idempotent)
+                if not retryable or attempt >= self.max_attempts:
+                    if retryable:
+                        logger.error(f"Request failed after {attempt} attempts: {e}")
+                    raise
+                if not self.budget.withdraw():
+                    logger.warning(f"Retry budget exhausted, not retrying: {e}")
+                    raise
+
+                delay = self.next_delay(delay)
+                logger.warning(f"Request failed (attempt {attempt}/{self.max_attempts}): {e}. Retrying in {delay:.1f}s...")
+                await asyncio.sleep(delay)
+                attempt += 1
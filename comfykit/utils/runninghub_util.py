@@ -4,13 +4,13 @@ RunningHub utility functions - centralized logic for RunningHub workflow handlin
 
 import asyncio
 import concurrent.futures
-import json
 import os
 import tempfile
 from pathlib import Path
 from typing import Any, Dict, Optional
 
 from comfykit.logger import logger
+from comfykit.utils import json_util
 from comfykit.utils.os_util import get_data_path
 from comfykit.utils.workflow_source_util import (
     create_workflow_source_file,
@@ -131,8 +131,8 @@ async def fetch_runninghub_workflow_metadata(workflow_file: str | Path, tool_nam
             workflow_json = await client.get_workflow_json(workflow_id)
 
             # Create temporary file with the actual workflow
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False, encoding='utf-8') as f:
-                json.dump(workflow_json, f, ensure_ascii=False, indent=2)
+            with tempfile.NamedTemporaryFile(mode='wb', suffix='.json', delete=False) as f:
+                f.write(json_util.dumpb(workflow_json, indent=True))
                 temp_file_path = f.name
 
             try:
@@ -2,12 +2,13 @@
 Workflow source utility functions - centralized logic for workflow source type detection and routing
 """
 
-import json
 import os
 from pathlib import Path
 from typing import Any, Dict, Optional
 
+from comfykit.comfyui.workflow_cache import get_workflow_cache
 from comfykit.logger import logger
+from comfykit.utils import json_util
 
 
 def get_workflow_source(workflow_file: str | Path) -> Optional[str]:
@@ -24,8 +25,7 @@ def get_workflow_source(workflow_file: str | Path) -> Optional[str]:
         if not os.path.exists(workflow_file):
             return None
 
-        with open(workflow_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = get_workflow_cache().get_workflow_data(workflow_file)
 
         return data.get("_source")
     except Exception:
@@ -58,8 +58,7 @@ def has_workflow_source(workflow_file: str | Path) -> bool:
         if not os.path.exists(workflow_file):
             return False
 
-        with open(workflow_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = get_workflow_cache().get_workflow_data(workflow_file)
 
         return "_source" in data
     except Exception:
@@ -80,8 +79,7 @@ def get_workflow_source_data(workflow_file: str | Path) -> Optional[Dict[str, An
         if not os.path.exists(workflow_file):
             return None
 
-        with open(workflow_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = get_workflow_cache().get_workflow_data(workflow_file)
 
         # Only return data if it has _source field
         if "_source" not in data:
@@ -142,8 +140,7 @@ def create_workflow_source_file(source: str, source_data: Dict[str, Any], output
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
     # Save the workflow file
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(workflow_data, f, ensure_ascii=False, indent=2)
+    json_util.dump_file(workflow_data, output_path, indent=True)
 
     logger.info(f"Created workflow source file: {output_path} (source: {source})")
     return output_path
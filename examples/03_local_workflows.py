@@ -123,7 +123,7 @@ async def example_result_handling():
     """Example 6: Handle execution results"""
     print("\n=== Example 6: Result Handling ===")
     
-    kit = ComfyKit()
+    kit = ComfyKit(keep_outputs=True)  # Keep raw outputs in result.outputs
     
     result = await kit.execute(
         "workflows/t2i_by_local_flux.json",
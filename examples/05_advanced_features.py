@@ -23,17 +23,18 @@ async def example_batch_execution():
     
     print(f"Executing {len(prompts)} workflows...")
     
-    tasks = [
-        kit.execute(
-            "workflows/t2i_by_local_flux.json",
-            {"prompt": prompt}
-        )
-        for prompt in prompts
-    ]
-    
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    # Workflow is parsed once, at most 2 executions run at the same time,
+    # results are yielded as soon as each one completes
+    results = []
+    async for result in kit.execute_many(
+        "workflows/t2i_by_local_flux.json",
+        {"prompt": prompts},
+        concurrency=2,
+    ):
+        print(f"  [{result.index}] {prompts[result.index]}: {result.status}")
+        results.append(result)
     
-    success = sum(1 for r in results if not isinstance(r, Exception))
+    success = sum(1 for r in results if r.status == "completed")
     print(f"✓ Completed: {success}/{len(prompts)}")
     
     # Verify
@@ -179,7 +180,7 @@ async def main():
         print("\n" + "="*60)
         print("✨ All advanced examples completed!")
         print("\n📝 Key Takeaways:")
-        print("  1. Batch execution with asyncio.gather()")
+        print("  1. Batch execution with execute_many()")
         print("  2. Graceful error handling")
         print("  3. Flexible authentication options")
         print("  4. Multiple executor types available")
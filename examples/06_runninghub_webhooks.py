@@ -0,0 +1,131 @@
+"""
+RunningHub Webhooks Example - Complete Cloud Tasks by Callback
+
+Instead of polling task status, RunningHub can call a webhook when a task ends.
+ComfyKit embeds a small receiver that resolves the waiting executions as soon
+as the callback arrives (polling only stays on as a slow safety net).
+
+This example runs fully locally: it starts a fake RunningHub server that
+finishes tasks after a short delay and posts the callback, like the real API.
+"""
+
+import asyncio
+import itertools
+import json
+
+import aiohttp
+from aiohttp import web
+
+from comfykit import ComfyKit
+
+FAKE_RUNNINGHUB_PORT = 8390
+WEBHOOK_PORT = 8391
+
+# Workflow returned by the fake getJsonApiFormat endpoint
+FAKE_WORKFLOW = {
+    "6": {"class_type": "CLIPTextEncode", "inputs": {"text": ""}, "_meta": {"title": "$prompt.text!"}},
+    "9": {"class_type": "SaveImage", "inputs": {"images": ["6", 0]}, "_meta": {"title": "$output.images"}},
+}
+
+
+class FakeRunningHub:
+    """Minimal RunningHub API: create tasks, finish them and post callbacks"""
+
+    def __init__(self, task_seconds: float = 1.0):
+        self.task_seconds = task_seconds
+        self.task_ids = itertools.count(1000)
+        self.polls = 0
+        self.callbacks = 0
+        self.app = web.Application()
+        self.app.router.add_post("/api/openapi/getJsonApiFormat", self.get_workflow)
+        self.app.router.add_post("/task/openapi/create", self.create_task)
+        self.app.router.add_post("/task/openapi/status", self.poll)
+        self.app.router.add_post("/task/openapi/outputs", self.poll)
+        self._runner = None
+
+    async def get_workflow(self, request):
+        return web.json_response({"code": 0, "data": {"prompt": json.dumps(FAKE_WORKFLOW)}})
+
+    async def create_task(self, request):
+        data = await request.json()
+        task_id = str(next(self.task_ids))
+        if data.get("webhookUrl"):
+            asyncio.create_task(self.finish_task(data["webhookUrl"], task_id))
+        return web.json_response({"code": 0, "data": {"taskId": task_id, "taskStatus": "QUEUED"}})
+
+    async def poll(self, request):
+        # Only the safety net should get here
+        self.polls += 1
+        return web.json_response({"code": 804, "msg": "APIKEY_TASK_IS_RUNNING", "data": None})
+
+    async def finish_task(self, webhook_url: str, task_id: str):
+        await asyncio.sleep(self.task_seconds)
+        outputs = [{"fileUrl": f"https://cdn.example.com/{task_id}.png", "fileType": "png", "nodeId": "9"}]
+        payload = {
+            "event": "TASK_END",
+            "taskId": task_id,
+            "eventData": json.dumps({"code": 0, "msg": "success", "data": outputs}),
+        }
+        async with aiohttp.ClientSession() as session:
+            async with session.post(webhook_url, json=payload) as response:
+                assert response.status == 200
+                self.callbacks += 1
+
+    async def start(self, port: int):
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "127.0.0.1", port).start()
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+
+async def example_webhook_completion():
+    """Example 1: Tasks completed by webhook callbacks"""
+    print("\n=== Example 1: Webhook Completion ===")
+
+    fake = FakeRunningHub(task_seconds=1.0)
+    await fake.start(FAKE_RUNNINGHUB_PORT)
+
+    try:
+        # In production, runninghub_webhook_url is the public URL RunningHub can
+        # reach (e.g. https://hooks.example.com/runninghub), forwarded to the port
+        async with ComfyKit(
+            runninghub_url=f"http://127.0.0.1:{FAKE_RUNNINGHUB_PORT}",
+            runninghub_api_key="fake-key",
+            runninghub_webhook_url=f"http://127.0.0.1:{WEBHOOK_PORT}/runninghub/webhook",
+        ) as kit:
+            prompts = ["a cat", "a dog", "a bird", "a fish"]
+            results = await asyncio.gather(*(
+                kit.execute("1234567890", {"prompt": prompt}) for prompt in prompts
+            ))
+
+        for prompt, result in zip(prompts, results):
+            print(f"✓ {prompt}: {result.status} {result.images}")
+
+        print(f"✓ Callbacks received: {fake.callbacks}")
+        print(f"✓ Status polls: {fake.polls}")
+
+        # Verify (acts as test)
+        assert all(result.status == "completed" for result in results)
+        assert fake.callbacks == len(prompts)
+        assert fake.polls == 0, "Webhook tasks should not be polled before the safety net interval"
+    finally:
+        await fake.stop()
+
+    return True
+
+
+async def main():
+    """Run all webhook examples"""
+    print("🚀 RunningHub Webhook Examples\n")
+    print("="*60)
+
+    await example_webhook_completion()
+
+    print("\n" + "="*60)
+    print("✨ Webhook examples completed!")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -17,7 +17,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 EXAMPLES_DIR = Path(__file__).parent
 EXAMPLE_FILES = sorted([
     f for f in EXAMPLES_DIR.glob("*.py")
-    if f.name.startswith(("01_", "02_", "03_", "04_", "05_"))
+    if f.name.startswith(("01_", "02_", "03_", "04_", "05_", "06_"))
 ])
 
 
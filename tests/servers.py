@@ -0,0 +1,25 @@
+"""Local aiohttp servers standing in for ComfyUI, RunningHub and media sources"""
+
+from aiohttp import web
+
+
+async def start_server(routes) -> tuple:
+    """Serve routes on a free local port, return the runner and base URL"""
+    app = web.Application()
+    for method, path, handler in routes:
+        app.router.add_route(method, path, handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def broken_source(request: web.Request) -> web.StreamResponse:
+    """Send headers and part of the body, then drop the connection"""
+    response = web.StreamResponse(headers={"Content-Length": str(1024 * 1024)})
+    await response.prepare(request)
+    await response.write(b"x" * 65536)
+    request.transport.close()
+    return response
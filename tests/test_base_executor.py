@@ -0,0 +1,68 @@
+import asyncio
+from urllib.parse import urlparse
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from comfykit.comfyui.http_executor import HttpExecutor
+from tests.servers import broken_source, start_server
+
+
+def test_executor_is_reusable_across_event_loops():
+    executor = HttpExecutor("http://127.0.0.1:8188", max_concurrent_uploads=1)
+    sources = [f"http://example.com/{index}.png" for index in range(3)]
+
+    async def upload(source: str) -> str:
+        # Yield so uploads contend for the shared upload semaphore
+        await asyncio.sleep(0.001)
+        return source.rsplit("/", 1)[1]
+
+    async def fake_load_cookies():
+        await asyncio.sleep(0.001)
+        return {"session": "abc"}
+
+    executor.cookies = "session=abc"
+    executor._load_comfyui_cookies = fake_load_cookies
+
+    async def main():
+        uploads = await executor._resolve_uploads(sources, upload)
+        # Concurrent callers contend for the cookies refresh lock
+        cookies = await asyncio.gather(*(executor._parse_comfyui_cookies() for _ in range(3)))
+        executor._resolved_cookies = None
+        return uploads, cookies
+
+    for _ in range(2):
+        uploads, cookies = asyncio.run(main())
+        assert uploads == {source: source.rsplit("/", 1)[1] for source in sources}
+        assert cookies == [{"session": "abc"}] * 3
+
+
+async def comfyui_upload(request: web.Request) -> web.Response:
+    reader = await request.multipart()
+    async for part in reader:
+        await part.read()
+    return web.json_response({"name": "uploaded.png"})
+
+
+def test_source_dropped_mid_body_is_charged_to_the_source():
+    async def main():
+        runner, base_url = await start_server([
+            ("GET", "/media/cat.png", broken_source),
+            ("POST", "/upload/image", comfyui_upload),
+        ])
+        executor = HttpExecutor(base_url, retry_count=0)
+        try:
+            with pytest.raises(aiohttp.ClientError):
+                await executor._upload_media_from_source(f"{base_url}/media/cat.png")
+        finally:
+            await executor.close()
+            await runner.cleanup()
+        return executor.retry_policy, base_url
+
+    policy, base_url = asyncio.run(main())
+    source = policy.get_breaker(f"download:{urlparse(base_url).netloc}")
+    upload = policy.get_breaker("/upload/image")
+    assert source.failures == 1
+    assert upload.failures == 0
+    assert upload.state == "closed"
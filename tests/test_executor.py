@@ -0,0 +1,46 @@
+import asyncio
+
+from comfykit import ComfyKit
+from comfykit.comfyui.models import ExecuteResult
+
+
+def run_batch(concurrency, prepare=None, items=20):
+    kit = ComfyKit()
+    started = []
+    consumed = []
+    max_unconsumed = 0
+
+    async def execute(item):
+        nonlocal max_unconsumed
+        started.append(item["i"])
+        max_unconsumed = max(max_unconsumed, len(started) - len(consumed))
+        return ExecuteResult(status="completed")
+
+    async def main():
+        async for result in kit._run_many(({"i": i} for i in range(items)), concurrency, execute, prepare):
+            consumed.append(result.index)
+            # Slow consumer
+            await asyncio.sleep(0.005)
+
+    asyncio.run(main())
+    return started, consumed, max_unconsumed
+
+
+def test_run_many_yields_every_result():
+    started, consumed, _ = run_batch(concurrency=3)
+    assert sorted(consumed) == list(range(20))
+
+
+def test_run_many_bounds_results_waiting_for_a_slow_consumer():
+    _, _, max_unconsumed = run_batch(concurrency=3)
+    # Executions finish instantly, only the consumer frees slots
+    assert max_unconsumed <= 3 + 1
+
+
+def test_run_many_bounds_prepared_items_for_a_slow_consumer():
+    async def prepare(item_params):
+        return item_params
+
+    _, consumed, max_unconsumed = run_batch(concurrency=2, prepare=prepare)
+    assert sorted(consumed) == list(range(20))
+    assert max_unconsumed <= 2 * 2 + 1
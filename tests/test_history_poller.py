@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+
+from comfykit.comfyui.history_poller import HistoryPoller, PromptNotFoundError
+
+
+class FakeExecutor:
+    """Answers the poller's requests from in-memory queue and history"""
+
+    def __init__(self):
+        self.running = []
+        self.history = {}
+        self.lookups = []
+
+    async def _get_queue(self):
+        return {"queue_running": [[0, pid] for pid in self.running], "queue_pending": []}
+
+    async def _get_history(self, max_items=None):
+        return dict(self.history)
+
+    async def _get_prompt_history(self, prompt_id):
+        self.lookups.append(prompt_id)
+        return self.history.get(prompt_id)
+
+
+def test_resolves_finished_prompt():
+    executor = FakeExecutor()
+    executor.history["p1"] = {"outputs": {}}
+    poller = HistoryPoller(executor, min_interval=0.01, max_interval=0.05)
+
+    assert asyncio.run(poller.wait_for("p1", timeout=1)) == {"outputs": {}}
+    assert executor.lookups == []
+
+
+def test_missing_prompt_lookups_back_off_and_fail():
+    executor = FakeExecutor()
+    poller = HistoryPoller(executor, min_interval=0.01, max_interval=0.04, max_misses=4)
+
+    with pytest.raises(PromptNotFoundError):
+        asyncio.run(poller.wait_for("lost", timeout=5))
+    assert executor.lookups == ["lost"] * 4
+    # Lookups are backed off, most ticks only check /queue and /history
+    ticks = (poller.request_count - len(executor.lookups)) // 2
+    assert ticks > len(executor.lookups)
+
+
+def test_missing_prompt_lookups_are_capped_per_tick():
+    executor = FakeExecutor()
+    poller = HistoryPoller(executor, min_interval=0.01, max_interval=0.04, max_lookups_per_tick=2, max_misses=100)
+    prompt_ids = [f"lost-{i}" for i in range(5)]
+
+    async def main():
+        # Track the prompts without starting the polling loop, ticks are run by hand
+        loop = asyncio.get_running_loop()
+        for pid in prompt_ids:
+            poller._waiters[pid] = loop.create_future()
+        await poller._tick()
+        assert len(executor.lookups) == 2
+        await poller._tick()
+        assert len(executor.lookups) == 4
+        # Looked-up prompts are backed off, the rest comes next
+        await poller._tick()
+        assert sorted(set(executor.lookups)) == prompt_ids
+        await poller.close()
+
+    asyncio.run(main())
+
+
+def test_missing_prompt_found_later():
+    executor = FakeExecutor()
+    poller = HistoryPoller(executor, min_interval=0.01, max_interval=0.04, max_misses=50)
+
+    async def main():
+        task = asyncio.ensure_future(poller.wait_for("late", timeout=5))
+        await asyncio.sleep(0.05)
+        executor.history["late"] = {"outputs": {"9": {}}}
+        return await task
+
+    assert asyncio.run(main()) == {"outputs": {"9": {}}}
+    assert not poller._misses
+
+
+class QueueDownExecutor(FakeExecutor):
+    """/queue fails and the recent history batch is full of other clients' prompts"""
+
+    async def _get_queue(self):
+        return None
+
+    async def _get_history(self, max_items=None):
+        return {f"other-{i}": {"outputs": {}} for i in range(max_items)}
+
+
+def test_prompt_missing_from_batch_is_looked_up_while_queue_is_down():
+    executor = QueueDownExecutor()
+    poller = HistoryPoller(executor, min_interval=0.01, max_interval=0.02, max_lookups_per_tick=1, max_misses=2)
+
+    async def main():
+        task = asyncio.ensure_future(poller.wait_for("busy", timeout=5))
+        # Still running: lookups keep missing, without failing the execution
+        await asyncio.sleep(0.2)
+        assert not task.done()
+        executor.history["busy"] = {"outputs": {"9": {}}}
+        return await task
+
+    assert asyncio.run(main()) == {"outputs": {"9": {}}}
+    assert len(executor.lookups) > 2
+    assert not poller._misses
+
+
+def test_lookups_are_capped_per_tick_while_queue_is_down():
+    executor = QueueDownExecutor()
+    poller = HistoryPoller(executor, min_interval=0.01, max_interval=0.04, max_lookups_per_tick=2)
+    prompt_ids = [f"busy-{i}" for i in range(3)]
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        for pid in prompt_ids:
+            poller._waiters[pid] = loop.create_future()
+        assert await poller._tick() == poller.max_interval
+        assert len(executor.lookups) == 2
+        # Looked-up prompts wait max_interval, the third one is next
+        await poller._tick()
+        assert sorted(executor.lookups) == prompt_ids
+        await poller.close()
+
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+import copy
+import pickle
+
+from comfykit.comfyui.models import ExecuteResult
+
+
+def make_result(**kwargs) -> ExecuteResult:
+    return ExecuteResult(
+        status="completed",
+        images_by_var={"image": ["http://x/a.png", "http://x/b.png"], "mask": ["http://x/m.png"]},
+        texts_by_var={"caption": ["a cat"]},
+        **kwargs,
+    )
+
+
+def test_flat_lists_follow_grouped_outputs():
+    result = make_result()
+    assert result.images == ["http://x/a.png", "http://x/b.png", "http://x/m.png"]
+    assert result.texts == ["a cat"]
+    assert result.videos == []
+    assert result.audios == []
+
+
+def test_flat_list_mutations_stick():
+    result = make_result()
+    result.images.append("http://x/c.png")
+    result.texts.extend(["a dog"])
+    result.videos.append("http://x/v.mp4")
+    assert result.images[-1] == "http://x/c.png"
+    assert result.texts == ["a cat", "a dog"]
+    assert result.videos == ["http://x/v.mp4"]
+    # Grouped outputs are left alone
+    assert result.images_by_var["image"] == ["http://x/a.png", "http://x/b.png"]
+    assert result.model_dump()["images"][-1] == "http://x/c.png"
+
+
+def test_assigned_flat_list():
+    result = make_result()
+    result.images = ["http://x/only.png"]
+    assert result.images == ["http://x/only.png"]
+    result.images.append("http://x/more.png")
+    assert result.images == ["http://x/only.png", "http://x/more.png"]
+
+
+def test_assigning_grouped_outputs_rebuilds_flat_list():
+    result = ExecuteResult(status="completed")
+    assert result.images == []
+    result.images_by_var = {"image": ["http://x/a.png"]}
+    assert result.images == ["http://x/a.png"]
+
+
+def test_flat_lists_accepted_by_constructor():
+    result = ExecuteResult(status="completed", images=["http://x/a.png"], texts=["hello"])
+    assert result.images == ["http://x/a.png"]
+    assert result.texts == ["hello"]
+    assert result.images_by_var == {}
+
+
+def test_model_dump_round_trip():
+    result = make_result(prompt_id="p1")
+    result.images.append("http://x/extra.png")
+    data = result.model_dump()
+    assert data["images"] == ["http://x/a.png", "http://x/b.png", "http://x/m.png", "http://x/extra.png"]
+    assert data["texts"] == ["a cat"]
+
+    restored = ExecuteResult.model_validate(data)
+    assert restored.model_dump() == data
+    assert restored.images == result.images
+
+    restored = ExecuteResult.model_validate_json(result.model_dump_json())
+    assert restored.model_dump() == data
+
+
+def test_copies_do_not_share_assigned_flat_lists():
+    result = make_result()
+    for clone in (result.model_copy(), copy.copy(result), copy.deepcopy(result), pickle.loads(pickle.dumps(result))):
+        clone.images = ["http://x/clone.png"]
+        assert result.images == ["http://x/a.png", "http://x/b.png", "http://x/m.png"]
+
+
+def test_json_schema_lists_flat_outputs():
+    for mode in ("validation", "serialization"):
+        properties = ExecuteResult.model_json_schema(mode=mode)["properties"]
+        for name in ("images", "audios", "videos", "texts", "images_by_var"):
+            assert name in properties, (mode, name)
+        assert properties["images"]["type"] == "array"
+        assert properties["images"]["items"] == {"type": "string"}
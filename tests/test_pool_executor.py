@@ -0,0 +1,127 @@
+import asyncio
+import time
+
+from comfykit.comfyui.base_executor import PreparedPrompt
+from comfykit.comfyui.models import ExecuteResult
+from comfykit.comfyui.pool_executor import ComfyUIPoolExecutor
+
+
+class StubExecutor:
+    """Member executor answering /queue from memory"""
+
+    def __init__(self, base_url: str, queue_depth: int = 0):
+        self.base_url = base_url
+        self.queue_depth = queue_depth
+        self.failing = False
+        self.samples = 0
+        self.prepare_delay = 0.0
+        self.queue_delay = 0.0
+
+    async def _get_queue(self):
+        self.samples += 1
+        await asyncio.sleep(self.queue_delay)
+        if self.failing:
+            return None
+        return {"queue_running": [[0, f"r{i}"] for i in range(min(self.queue_depth, 1))],
+                "queue_pending": [[i, f"p{i}"] for i in range(max(self.queue_depth - 1, 0))]}
+
+    async def prepare_workflow(self, workflow_file, params=None):
+        await asyncio.sleep(self.prepare_delay)
+        return PreparedPrompt(workflow_data={}, output_id_2_var={})
+
+    async def execute_prepared(self, prepared):
+        return ExecuteResult(status="completed", prompt_id="p")
+
+    async def close(self):
+        pass
+
+
+def make_pool(*queue_depths, **kwargs) -> ComfyUIPoolExecutor:
+    urls = [f"http://server{index}:8188" for index in range(len(queue_depths))]
+    pool = ComfyUIPoolExecutor(urls, **kwargs)
+    for member, depth in zip(pool.members, queue_depths):
+        member.executor = StubExecutor(member.base_url, depth)
+    return pool
+
+
+def test_routes_to_the_shortest_queue():
+    pool = make_pool(5, 0, 3)
+
+    async def main():
+        return [(await pool._select_member()).base_url for _ in range(3)]
+
+    # Routed executions count until the next sample
+    assert asyncio.run(main()) == ["http://server1:8188"] * 3
+    assert [member.load for member in pool.members] == [5, 3, 3]
+
+
+def test_latency_breaks_ties():
+    pool = make_pool(0, 0)
+    pool.members[0].latency = 0.2
+    pool.members[1].latency = 0.05
+
+    async def main():
+        return (await pool._select_member()).base_url
+
+    # Fresh samples keep the latencies as set (no resample within sample_interval)
+    for member in pool.members:
+        member.sampled_at = float("inf")
+    assert asyncio.run(main()) == "http://server1:8188"
+
+
+def test_executions_still_preparing_count_after_a_resample():
+    pool = make_pool(0, 0, sample_interval=0.0)
+    for member in pool.members:
+        member.executor.prepare_delay = 0.2
+    # server0 answers /queue faster, it wins ties
+    pool.members[1].executor.queue_delay = 0.005
+
+    async def main():
+        # Every selection resamples, executions routed earlier are still
+        # preparing (uploading), so /queue does not show them
+        tasks = []
+        for _ in range(6):
+            tasks.append(asyncio.create_task(pool.prepare_workflow("workflow.json")))
+            await asyncio.sleep(0.02)
+        prepared = await asyncio.gather(*tasks)
+        return [item.server_url for item in prepared]
+
+    servers = asyncio.run(main())
+    assert servers.count("http://server0:8188") == 3
+    assert servers.count("http://server1:8188") == 3
+
+
+def test_failing_server_is_ejected_then_probed_again():
+    pool = make_pool(0, 5, sample_interval=0.0, max_failures=2, eject_duration=0.05)
+    failing = pool.members[0]
+    failing.executor.failing = True
+
+    async def main():
+        routed = [(await pool._select_member()).base_url for _ in range(3)]
+        assert not pool._is_healthy(failing, time.monotonic())
+        samples = failing.executor.samples
+        # Ejected: not sampled while the ejection lasts
+        await pool._select_member()
+        assert failing.executor.samples == samples
+        # Recovered: probed after eject_duration and used again
+        failing.executor.failing = False
+        await asyncio.sleep(0.06)
+        routed.append((await pool._select_member()).base_url)
+        return routed
+
+    routed = asyncio.run(main())
+    assert routed[:3] == ["http://server1:8188"] * 3
+    assert routed[-1] == "http://server0:8188"
+    assert failing.consecutive_failures == 0
+
+
+def test_results_record_the_serving_server():
+    pool = make_pool(2, 0)
+
+    async def main():
+        return await pool.execute_workflow("workflow.json")
+
+    result = asyncio.run(main())
+    assert result.status == "completed"
+    assert result.server_url == "http://server1:8188"
+    assert all(member.in_flight == 0 for member in pool.members)
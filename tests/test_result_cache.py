@@ -0,0 +1,87 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from comfykit.comfyui import result_cache
+from comfykit.comfyui.models import ExecuteResult
+from comfykit.comfyui.result_cache import ResultCache
+
+
+@pytest.fixture
+def scans(monkeypatch):
+    """Count scans of the disk tier"""
+    calls = []
+    evict_disk = ResultCache._evict_disk
+
+    def counting_evict_disk(self):
+        calls.append(time.monotonic())
+        evict_disk(self)
+
+    monkeypatch.setattr(ResultCache, "_evict_disk", counting_evict_disk)
+    return calls
+
+
+def make_result(index: int) -> ExecuteResult:
+    return ExecuteResult(status="completed", prompt_id=f"p{index}",
+                         images_by_var={"image": [f"http://x/view?filename={index}_{'x' * 200}.png"]})
+
+
+def disk_size(cache: ResultCache) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(cache.disk_dir))
+
+
+def test_disk_tier_is_scanned_once_below_the_limit(tmp_path, scans):
+    cache = ResultCache(disk_dir=str(tmp_path), max_disk_bytes=1024 * 1024)
+
+    async def main():
+        for index in range(20):
+            await cache.put(f"key{index}", make_result(index))
+
+    asyncio.run(main())
+    assert len(scans) == 1
+    assert cache._disk_bytes == disk_size(cache)
+
+
+def test_disk_tier_is_evicted_beyond_the_limit(tmp_path, scans):
+    cache = ResultCache(disk_dir=str(tmp_path), max_disk_bytes=4000, max_entries=1)
+
+    async def main():
+        for index in range(40):
+            await cache.put(f"key{index}", make_result(index))
+            # Keep modification times ordered on coarse clocks
+            os.utime(cache._entry_path(f"key{index}"), (index, index))
+
+    asyncio.run(main())
+    assert disk_size(cache) <= 4000
+    # Not every put scans once the cache is full
+    assert 1 < len(scans) < 40
+    assert os.path.exists(cache._entry_path("key39"))
+    assert not os.path.exists(cache._entry_path("key0"))
+
+
+def test_tracked_size_follows_invalidation(tmp_path, scans):
+    cache = ResultCache(disk_dir=str(tmp_path), max_disk_bytes=1024 * 1024)
+
+    async def main():
+        for index in range(3):
+            await cache.put(f"key{index}", make_result(index))
+
+    asyncio.run(main())
+    cache.invalidate("key1")
+    assert cache._disk_bytes == disk_size(cache)
+    cache.invalidate()
+    assert cache._disk_bytes == 0
+
+
+def test_disk_tier_is_rescanned_periodically(tmp_path, scans, monkeypatch):
+    monkeypatch.setattr(result_cache, "DISK_RESCAN_INTERVAL", 0.0)
+    cache = ResultCache(disk_dir=str(tmp_path), max_disk_bytes=1024 * 1024)
+
+    async def main():
+        for index in range(3):
+            await cache.put(f"key{index}", make_result(index))
+
+    asyncio.run(main())
+    assert len(scans) == 3
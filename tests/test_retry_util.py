@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+from comfykit.utils.retry_util import CircuitBreaker, CircuitOpenError, HttpStatusError, RetryPolicy
+
+
+def open_breaker(policy: RetryPolicy, key: str) -> CircuitBreaker:
+    """Open a key's circuit and move it to half-open"""
+    breaker = policy.get_breaker(key)
+    for _ in range(policy.failure_threshold):
+        breaker.record_failure()
+    breaker.opened_at -= policy.reset_timeout
+    assert breaker.state == "half_open"
+    return breaker
+
+
+def test_cancelled_half_open_trial_frees_the_trial_slot():
+    policy = RetryPolicy(max_attempts=1, failure_threshold=2, reset_timeout=10)
+    breaker = open_breaker(policy, "/prompt")
+
+    async def main():
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.sleep(3600)
+
+        task = asyncio.ensure_future(policy.call(hang, key="/prompt"))
+        await started.wait()
+        assert breaker._trial_running
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+
+def test_timed_out_half_open_trial_frees_the_trial_slot():
+    policy = RetryPolicy(max_attempts=1, failure_threshold=2, reset_timeout=10)
+    breaker = open_breaker(policy, "/prompt")
+
+    async def hang():
+        await asyncio.sleep(3600)
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(policy.call(hang, key="/prompt"), 0.01)
+
+    asyncio.run(main())
+    assert breaker.allow()
+
+
+def test_non_retryable_error_is_neutral():
+    policy = RetryPolicy(max_attempts=3, failure_threshold=2, reset_timeout=10)
+    breaker = policy.get_breaker("/prompt")
+    breaker.record_failure()
+
+    async def reject():
+        raise HttpStatusError(400, "invalid prompt")
+
+    with pytest.raises(HttpStatusError):
+        asyncio.run(policy.call(reject, key="/prompt"))
+    # Not reset by the 400, not counted either
+    assert breaker.failures == 1
+    assert breaker.state == "closed"
+
+
+def test_non_retryable_error_keeps_half_open_circuit_half_open():
+    policy = RetryPolicy(max_attempts=1, failure_threshold=2, reset_timeout=10)
+    breaker = open_breaker(policy, "/prompt")
+
+    async def reject():
+        raise HttpStatusError(404, "not found")
+
+    with pytest.raises(HttpStatusError):
+        asyncio.run(policy.call(reject, key="/prompt"))
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+
+def test_success_closes_half_open_circuit():
+    policy = RetryPolicy(max_attempts=1, failure_threshold=2, reset_timeout=10)
+    breaker = open_breaker(policy, "/prompt")
+
+    async def ok():
+        return "ok"
+
+    assert asyncio.run(policy.call(ok, key="/prompt")) == "ok"
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+
+
+def test_circuit_charges_the_failing_endpoint_only():
+    policy = RetryPolicy(max_attempts=3, base_delay=0, max_delay=0, failure_threshold=2)
+
+    async def relay():
+        async with policy.circuit("download:example.com"):
+            raise HttpStatusError(502, "source unavailable")
+        async with policy.circuit("/upload/image"):
+            return "uploaded"
+
+    # Two failures open the source's circuit, the third attempt is rejected
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(policy.call(relay, key=None))
+    assert policy.get_breaker("download:example.com").state == "open"
+    assert policy.get_breaker("/upload/image").state == "closed"
+    assert policy.get_breaker("/upload/image").failures == 0
+
+
+def test_nested_circuits_charge_the_innermost_one():
+    policy = RetryPolicy(max_attempts=1, failure_threshold=1)
+
+    async def upload():
+        async with policy.circuit("download:example.com"):
+            raise HttpStatusError(503, "source unavailable")
+
+    with pytest.raises(HttpStatusError):
+        asyncio.run(policy.call(upload, key="/task/openapi/upload"))
+    assert policy.get_breaker("download:example.com").state == "open"
+    assert policy.get_breaker("/task/openapi/upload").state == "closed"
@@ -0,0 +1,39 @@
+import asyncio
+from urllib.parse import urlparse
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from comfykit.comfyui.runninghub_client import RunningHubClient
+from tests.servers import broken_source, start_server
+
+
+async def runninghub_upload(request: web.Request) -> web.Response:
+    reader = await request.multipart()
+    async for part in reader:
+        await part.read()
+    return web.json_response({"code": 0, "data": {"fileName": "api/cat.png"}})
+
+
+def test_source_dropped_mid_body_is_charged_to_the_source():
+    async def main():
+        runner, base_url = await start_server([
+            ("GET", "/media/cat.png", broken_source),
+            ("POST", "/task/openapi/upload", runninghub_upload),
+        ])
+        client = RunningHubClient(api_key="key", base_url=base_url, retry_count=0)
+        try:
+            with pytest.raises(aiohttp.ClientError):
+                await client.upload_url(f"{base_url}/media/cat.png")
+        finally:
+            await client.close()
+            await runner.cleanup()
+        return client.retry_policy, base_url
+
+    policy, base_url = asyncio.run(main())
+    source = policy.get_breaker(f"download:{urlparse(base_url).netloc}")
+    upload = policy.get_breaker("/task/openapi/upload")
+    assert source.failures == 1
+    assert upload.failures == 0
+    assert upload.state == "closed"
@@ -0,0 +1,35 @@
+import asyncio
+
+from comfykit.comfyui.models import ExecuteResult
+from comfykit.comfyui.runninghub_executor import RunningHubExecutor
+
+WORKFLOW = {
+    "1": {"class_type": "CLIPTextEncode", "_meta": {"title": "$prompt.text!"}, "inputs": {"text": ""}},
+}
+
+
+def test_execute_by_id_leaves_the_cached_metadata_untouched():
+    async def main():
+        executor = RunningHubExecutor(base_url="http://runninghub.test", api_key="key")
+        executor.invalidate_workflow("42")
+
+        async def get_workflow_json(workflow_id):
+            return WORKFLOW
+
+        async def run_task(workflow_id, node_info_list, output_id_2_var):
+            return ExecuteResult(status="completed")
+
+        executor.client.get_workflow_json = get_workflow_json
+        executor._run_task = run_task
+        try:
+            result = await executor.execute_by_id("42", {"prompt": "a cat"})
+            cached = await executor._get_workflow_definition("42")
+        finally:
+            executor.invalidate_workflow("42")
+            await executor.close()
+        return result, cached
+
+    result, cached = asyncio.run(main())
+    assert result.status == "completed"
+    assert cached.metadata.workflow_id is None
+    assert not cached.metadata.is_runninghub
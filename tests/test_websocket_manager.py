@@ -0,0 +1,250 @@
+import asyncio
+import json
+
+from aiohttp import web
+
+from comfykit.comfyui import websocket_manager
+from comfykit.comfyui.base_executor import PreparedPrompt
+from comfykit.comfyui.websocket_executor import WebSocketExecutor
+from comfykit.comfyui.websocket_manager import (
+    PREVIEW_MESSAGE_TYPE,
+    RECONNECTED_MESSAGE_TYPE,
+    WebSocketConnectionManager,
+)
+from tests.servers import start_server
+
+
+def text(message_type, **data):
+    """Text frame as serialized by ComfyUI"""
+    return json.dumps({"type": message_type, "data": data})
+
+
+def preview(image=b"jpeg-bytes"):
+    """BINARY_PREVIEW_IMAGE frame with a JPEG payload"""
+    return (1).to_bytes(4, "big") + (1).to_bytes(4, "big") + image
+
+
+STATUS = text("status", status={"exec_info": {"queue_remaining": 1}}, sid="abc")
+
+# Frames of prompt "a" as recorded from ComfyUI, with a status broadcast and a preview mixed in
+FRAMES_A = [
+    STATUS,
+    text("execution_start", prompt_id="a", timestamp=1),
+    text("execution_cached", nodes=["1", "2"], prompt_id="a", timestamp=2),
+    text("executing", node="3", display_node="3", prompt_id="a"),
+    text("progress", value=1, max=2, prompt_id="a", node="3"),
+    preview(),
+    text("progress", value=2, max=2, prompt_id="a", node="3"),
+    text("executed", node="9", display_node="9",
+         output={"images": [{"filename": "a.png", "subfolder": "", "type": "output"}]}, prompt_id="a"),
+    text("executing", node=None, display_node=None, prompt_id="a"),
+    text("execution_success", prompt_id="a", timestamp=3),
+]
+
+
+def feed(manager, frames):
+    """Deliver frames the way the reader loop does"""
+    for frame in frames:
+        if isinstance(frame, bytes):
+            if manager._preview_subscribers:
+                manager._dispatch_binary(frame)
+        else:
+            manager._dispatch(frame)
+
+
+def drain(queue):
+    messages = []
+    while not queue.empty():
+        messages.append(queue.get_nowait())
+    return messages
+
+
+def types(messages):
+    return [message["type"] for message in messages]
+
+
+def test_messages_are_demultiplexed_by_prompt_id():
+    manager = WebSocketConnectionManager("ws://comfyui.test/ws")
+    queue_a = manager.subscribe("a")
+    queue_b = manager.subscribe("b")
+
+    feed(manager, [
+        text("execution_start", prompt_id="a"),
+        text("execution_start", prompt_id="b"),
+        STATUS,
+        text("executed", node="9", output={"text": ["b"]}, prompt_id="b"),
+        text("execution_success", prompt_id="a"),
+    ])
+
+    a = drain(queue_a)
+    b = drain(queue_b)
+    assert types(a) == ["execution_start", "execution_success"]
+    assert types(b) == ["execution_start", "executed"]
+    assert all(message["data"]["prompt_id"] == "b" for message in b)
+    assert not manager._orphans
+
+
+def test_late_subscribe_replays_buffered_messages_in_order():
+    for prefilter in (True, False):
+        manager = WebSocketConnectionManager("ws://comfyui.test/ws", prefilter=prefilter)
+        # ComfyUI starts executing before /prompt returned the prompt_id
+        feed(manager, FRAMES_A[:5])
+        assert "a" in manager._orphans
+
+        queue = manager.subscribe("a")
+        feed(manager, FRAMES_A[5:])
+
+        assert types(drain(queue)) == [
+            "execution_start", "execution_cached", "executing", "progress",
+            "progress", "executed", "executing", "execution_success",
+        ]
+        assert "a" not in manager._orphans
+
+
+def test_prefilter_delivers_the_same_events():
+    def record(prefilter):
+        manager = WebSocketConnectionManager("ws://comfyui.test/ws", prefilter=prefilter)
+        other = [text("executing", node="5", prompt_id="other"), text("executed", node="5", output={}, prompt_id="other")]
+        feed(manager, other + FRAMES_A[:4])
+        queue = manager.subscribe("a", previews=True)
+        feed(manager, FRAMES_A[4:])
+        return drain(queue), manager
+
+    filtered, filtered_manager = record(True)
+    decoded, decoded_manager = record(False)
+    assert filtered == decoded
+    assert types(filtered).count(PREVIEW_MESSAGE_TYPE) == 1
+    assert filtered_manager._executing_prompt_id == decoded_manager._executing_prompt_id is None
+    # Both kept the other prompt's messages, raw or decoded
+    assert len(filtered_manager._orphans["other"][1]) == len(decoded_manager._orphans["other"][1]) == 2
+
+
+def test_executing_frames_of_unsubscribed_prompts_are_tracked_on_subscribe():
+    manager = WebSocketConnectionManager("ws://comfyui.test/ws", prefilter=True)
+    feed(manager, [text("executing", node="3", prompt_id="a")])
+    # Buffered raw, not decoded yet
+    assert manager._orphans["a"][1] == [text("executing", node="3", prompt_id="a")]
+    assert manager._executing_prompt_id is None
+
+    queue = manager.subscribe("a", previews=True)
+    assert manager._executing_prompt_id == "a"
+
+    feed(manager, [preview(b"latent")])
+    messages = drain(queue)
+    assert types(messages) == ["executing", PREVIEW_MESSAGE_TYPE]
+    assert messages[1]["data"]["prompt_id"] == "a"
+    assert bytes(messages[1]["data"]["image"]) == b"latent"
+    assert messages[1]["data"]["mime_type"] == "image/jpeg"
+
+
+def test_unclaimed_orphans_expire(monkeypatch):
+    class Clock:
+        now = 1000.0
+
+        @classmethod
+        def monotonic(cls):
+            return cls.now
+
+    monkeypatch.setattr(websocket_manager, "time", Clock)
+    for prefilter in (True, False):
+        manager = WebSocketConnectionManager("ws://comfyui.test/ws", orphan_ttl=60.0, prefilter=prefilter)
+        feed(manager, [text("execution_start", prompt_id="gone")])
+        Clock.now += 30
+        feed(manager, [text("execution_start", prompt_id="kept")])
+        Clock.now += 31
+        # The next buffered message evicts buffers older than orphan_ttl
+        feed(manager, [text("execution_start", prompt_id="new")])
+
+        assert list(manager._orphans) == ["kept", "new"]
+        assert drain(manager.subscribe("gone")) == []
+        assert types(drain(manager.subscribe("kept"))) == ["execution_start"]
+
+
+def test_reconnect_notifies_subscribers():
+    connections = []
+
+    async def main():
+        dropped = asyncio.Event()
+
+        async def ws_handler(request):
+            ws = web.WebSocketResponse()
+            await ws.prepare(request)
+            connections.append(request.query["clientId"])
+            if len(connections) == 1:
+                await ws.send_str(text("execution_start", prompt_id="a"))
+                await dropped.wait()
+                await ws.close()
+            else:
+                await ws.send_str(text("execution_success", prompt_id="a"))
+                await ws.receive()
+            return ws
+
+        runner, base_url = await start_server([("GET", "/ws", ws_handler)])
+        manager = WebSocketConnectionManager(base_url.replace("http", "ws") + "/ws", reconnect_delay=0.01)
+        try:
+            queue = manager.subscribe("a")
+            await manager.ensure_connected()
+            first = await asyncio.wait_for(queue.get(), 5)
+            dropped.set()
+            second = await asyncio.wait_for(queue.get(), 5)
+            third = await asyncio.wait_for(queue.get(), 5)
+        finally:
+            await manager.close()
+            await runner.cleanup()
+        return [first, second, third], manager.client_id
+
+    messages, client_id = asyncio.run(main())
+    assert types(messages) == ["execution_start", RECONNECTED_MESSAGE_TYPE, "execution_success"]
+    # The same client_id is kept, ComfyUI keeps routing the prompt to it
+    assert connections == [client_id, client_id]
+
+
+def test_execution_finished_while_disconnected_is_read_from_history():
+    async def main():
+        submitted = asyncio.Event()
+        connections = []
+
+        async def ws_handler(request):
+            ws = web.WebSocketResponse()
+            await ws.prepare(request)
+            connections.append(request.query["clientId"])
+            if len(connections) == 1:
+                # Drop the socket once the prompt is queued, its messages are lost
+                await submitted.wait()
+                await ws.close()
+            else:
+                await ws.receive()
+            return ws
+
+        async def prompt(request):
+            submitted.set()
+            return web.json_response({"prompt_id": "a", "number": 1})
+
+        async def history(request):
+            assert request.match_info["prompt_id"] == "a"
+            return web.json_response({"a": {
+                "status": {"status_str": "success", "completed": True},
+                "outputs": {"9": {"images": [{"filename": "a.png", "subfolder": "", "type": "output"}]}},
+            }})
+
+        runner, base_url = await start_server([
+            ("GET", "/ws", ws_handler),
+            ("POST", "/prompt", prompt),
+            ("GET", "/history/{prompt_id}", history),
+        ])
+        executor = WebSocketExecutor(base_url)
+        executor._get_ws_manager().reconnect_delay = 0.01
+        try:
+            prepared = PreparedPrompt(workflow_data={}, output_id_2_var={})
+            result = await asyncio.wait_for(executor.execute_prepared(prepared), 10)
+        finally:
+            await executor.close()
+            await runner.cleanup()
+        return result, len(connections)
+
+    result, connections = asyncio.run(main())
+    assert connections == 2
+    assert result.status == "completed"
+    assert result.prompt_id == "a"
+    assert [image.rsplit("filename=", 1)[1].split("&")[0] for image in result.images] == ["a.png"]
+